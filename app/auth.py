@@ -4,17 +4,22 @@ from datetime import datetime, timedelta
 
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from jose import jwt, JWTError
-from passlib.context import CryptContext
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app.config import JWT_SECRET, JWT_ALGORITHM, JWT_EXPIRE_HOURS
-from app.database import get_db
-from app import models
+from app.database import get_async_db, get_db
+from app import models, refresh_tokens, schemas
+from app.passwords import PoolSaturado, password_pool
+from app.principal_cache import resolve_principal
+from app.startup import lazy_import
 
-router = APIRouter(prefix="/auth", tags=["auth"])
+# jose (+ cryptography) se carga en el primer uso (ver app/startup.py)
+jose = lazy_import("jose")
+jwt = lazy_import("jose.jwt")
 
-pwd = CryptContext(schemes=["bcrypt"], deprecated="auto")
+router = APIRouter(prefix="/auth", tags=["auth"])
 
 DISABLE_AUTH = os.getenv("DISABLE_AUTH", "false").lower() == "true"
 
@@ -34,6 +39,7 @@ def create_access_token(
     entidad_perm: Optional[str] = None,
     entidad: Optional[str] = None,
     entidad_auditor: Optional[bool] = None,
+    token_version: Optional[int] = None,
 ) -> str:
     payload = {
         "sub": sub,            # email
@@ -44,6 +50,8 @@ def create_access_token(
         "entidad_auditor": bool(entidad_auditor),
         "exp": datetime.utcnow() + timedelta(hours=JWT_EXPIRE_HOURS),
     }
+    if token_version is not None:
+        payload["tv"] = token_version  # users.token_version al emitir
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 def get_current_user(
@@ -66,13 +74,14 @@ def get_current_user(
         role_in_token: str | None = payload.get("role")
         if email is None or uid is None or role_in_token is None:
             raise cred_exc
-    except JWTError:
+        if payload.get("typ") == refresh_tokens.REFRESH_TYP:
+            raise cred_exc
+    except jose.JWTError:
         raise cred_exc
 
-    user = None
-    if uid is not None:
-        user = db.query(models.User).get(uid)
-    if not user:
+    user = resolve_principal(db, payload)
+    if not user and "tv" not in payload:
+        # tokens sin token_version (emitidos antes): se acepta también el email
         user = db.query(models.User).filter_by(email=email).first()
 
     if not user:
@@ -90,25 +99,44 @@ def require_roles(*roles: str):
         return user
     return checker
 
-@router.post("/token")
-def login(form: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(models.User).filter_by(email=form.username).first()
-    if not user or not pwd.verify(form.password, user.hashed_password):
-        raise HTTPException(status_code=400, detail="Credenciales inválidas")
-
-    role_val = _enum_val(user.role)
-    entidad_perm_val = _enum_val(getattr(user, "entidad_perm", None))
-    entidad_auditor_val = bool(getattr(user, "entidad_auditor", False))
-
-    token = create_access_token(
+def _access_token_for(user: models.User) -> str:
+    return create_access_token(
         sub=user.email,
-        role=role_val,
+        role=_enum_val(user.role),
         user_id=user.id,
-        entidad=getattr(user, "entidad", None),  
-        entidad_perm=entidad_perm_val,  
-        entidad_auditor=entidad_auditor_val,
+        entidad=getattr(user, "entidad", None),
+        entidad_perm=_enum_val(getattr(user, "entidad_perm", None)),
+        entidad_auditor=bool(getattr(user, "entidad_auditor", False)),
+        token_version=user.token_version or 0,
     )
-    return {"access_token": token, "token_type": "bearer"}
+
+@router.post("/token")
+async def login(form: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    user = (await db.execute(select(models.User).filter_by(email=form.username))).scalars().first()
+    # bcrypt corre en el pool de procesos (app/passwords.py), no en el threadpool de anyio
+    if not user or not await password_pool.verify(form.password, user.hashed_password):
+        raise HTTPException(status_code=400, detail="Credenciales inválidas")
+
+    # Rehash transparente si el hash guardado tiene otro costo (BCRYPT_ROUNDS)
+    if password_pool.needs_rehash(user.hashed_password):
+        try:
+            user.hashed_password = await password_pool.hash(form.password)
+            password_pool.rehashes += 1
+        except PoolSaturado:
+            pass  # se reintenta en el próximo login
+
+    refresh, _ = refresh_tokens.emitir(db, user)
+    await db.commit()  # refresh token + hash recalculado (si hubo)
+    return {"access_token": _access_token_for(user), "token_type": "bearer", "refresh_token": refresh}
+
+@router.post("/refresh", response_model=schemas.TokenResponse)
+async def refresh(payload: schemas.RefreshRequest, db: AsyncSession = Depends(get_async_db)):
+    """Nuevo access token + refresh token rotado, sin volver a pasar por bcrypt."""
+    try:
+        user, nuevo = await refresh_tokens.rotar(db, payload.refresh_token)
+    except refresh_tokens.RefreshInvalido:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Refresh token inválido")
+    return {"access_token": _access_token_for(user), "token_type": "bearer", "refresh_token": nuevo}
 
 @router.get("/me")
 def me(current: models.User = Depends(get_current_user)):
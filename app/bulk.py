@@ -0,0 +1,105 @@
+"""
+Motor de carga masiva para los endpoints POST /reports, /pqrds y /habilidades.
+
+En lugar de un objeto ORM por fila (flush uno a uno), las filas se insertan con
+Core dentro de la transacción de la sesión:
+  - PostgreSQL + psycopg: un solo COPY ... FROM STDIN (las filas viajan en
+    streaming, sin parámetros ligados; BULK_BATCH_SIZE no aplica)
+  - resto (SQLite incluido): insert() executemany en lotes de BULK_BATCH_SIZE,
+    para no pasar el límite de parámetros por sentencia
+El commit lo hace el handler, así que la carga sigue siendo todo-o-nada.
+
+upsert_counts mantiene tablas de contadores (pqrd_resumen, indicador_entidad):
+suma `total` a las claves existentes e inserta las nuevas.
+"""
+import os
+import time
+from typing import Iterable, List, Optional, Sequence
+
+from sqlalchemy import Table, insert, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "5000"))
+
+
+def _batches(rows: List[dict], size: int) -> Iterable[List[dict]]:
+    for i in range(0, len(rows), size):
+        yield rows[i:i + size]
+
+
+def _copy_rows(conn, table: Table, columns: List[str], rows: List[dict]) -> None:
+    preparer = conn.dialect.identifier_preparer
+    cols = ", ".join(preparer.quote(c) for c in columns)
+    sql = f"COPY {preparer.format_table(table)} ({cols}) FROM STDIN"
+    raw = conn.connection.driver_connection
+    with raw.cursor() as cur:
+        with cur.copy(sql) as copy:
+            for row in rows:
+                copy.write_row(tuple(row.get(c) for c in columns))
+
+
+def bulk_insert(
+    db: Session,
+    table: Table,
+    rows: List[dict],
+    batch_size: Optional[int] = None,
+) -> dict:
+    """
+    Inserta `rows` (dicts con las mismas claves) en `table` usando la conexión de `db`.
+    `batch_size` (por defecto BULK_BATCH_SIZE) solo parte la ruta executemany.
+    Devuelve métricas: filas insertadas, método, segundos y filas por segundo.
+    """
+    start = time.perf_counter()
+    conn = db.connection()
+    method = "none"
+
+    if rows:
+        columns = list(rows[0].keys())
+        if conn.dialect.name == "postgresql" and conn.dialect.driver == "psycopg":
+            _copy_rows(conn, table, columns, rows)
+            method = "copy"
+        else:
+            stmt = insert(table)
+            for batch in _batches(rows, batch_size or BULK_BATCH_SIZE):
+                conn.execute(stmt, batch)
+            method = "executemany"
+
+    elapsed = time.perf_counter() - start
+    return {
+        "insertados": len(rows),
+        "metodo": method,
+        "segundos": round(elapsed, 4),
+        "filas_por_segundo": round(len(rows) / elapsed) if elapsed > 0 and rows else 0,
+    }
+
+
+def upsert_counts(conn: Connection, table: Table, keys: Sequence[str], rows: List[dict], column: str = "total") -> None:
+    """
+    Suma `row[column]` (puede ser negativo) a la fila con las mismas `keys`, o la
+    inserta si no existe. ON CONFLICT en PostgreSQL/SQLite; UPDATE + INSERT en el resto.
+    """
+    if not rows:
+        return
+    dialect = conn.dialect.name
+    if dialect in ("postgresql", "sqlite"):
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        stmt = dialect_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={column: table.c[column] + stmt.excluded[column]},
+        )
+        conn.execute(stmt, rows)
+        return
+
+    for row in rows:
+        res = conn.execute(
+            update(table)
+            .where(*[table.c[k] == row[k] for k in keys])
+            .values({column: table.c[column] + row[column]})
+        )
+        if res.rowcount == 0:
+            conn.execute(insert(table), row)
@@ -5,6 +5,8 @@ load_dotenv()
 JWT_SECRET = os.getenv("JWT_SECRET", "dev-super-secret")  # cambia en prod
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRE_HOURS = int(os.getenv("JWT_EXPIRE_HOURS", "8"))
+# Vida del refresh token (POST /auth/refresh); cada uso lo rota
+REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "14"))
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
 # normaliza lista de CORS a nivel de módulo (usada por main.py)
@@ -27,4 +29,22 @@ class Settings:
         # asegúrate que sea lista de strings sin espacios
         self.CORS_ORIGINS = [o.strip() for o in CORS_ORIGINS] 
         
-settings = Settings()
\ No newline at end of file
+settings = Settings()
+
+# ── Caché de principales autenticados (get_current_user) ──
+# TTL en segundos; 0 desactiva la caché.
+PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("PRINCIPAL_CACHE_TTL_SECONDS", "30"))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", "1024"))
+
+# ── Modo sin estado (opt-in): el principal sale de los claims del JWT ──
+# Solo se consulta users.token_version (caché propia, TTL en segundos) para
+# respetar revocaciones; los tokens sin claim "tv" siguen el camino con BD.
+AUTH_STATELESS = os.getenv("AUTH_STATELESS", "false").lower() == "true"
+TOKEN_VERSION_CACHE_TTL_SECONDS = float(os.getenv("TOKEN_VERSION_CACHE_TTL_SECONDS", "30"))
+
+# ── Hash de contraseñas (app/passwords.py) ──
+# Costo bcrypt de los hashes nuevos; los guardados con otro costo se recalculan en el login.
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+# Procesos del pool (0 = min(4, CPUs)) y máximo de operaciones pendientes antes de responder 503.
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "0"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "64"))
@@ -1,23 +1,167 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
-from sqlalchemy.pool import NullPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 import os
+import threading
+import time
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
 
+# Estrategia de pool para motores no-SQLite:
+#   null      -> NullPool: conexión nueva por request (comportamiento histórico, serverless + Neon Free)
+#   queue     -> QueuePool dimensionado con recycle/overflow/timeout
+#   pgbouncer -> QueuePool detrás de PgBouncer en modo transacción (sin prepared statements)
+DB_POOL_MODE = os.getenv("DB_POOL_MODE", "null").strip().lower()
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "300"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+
+class _PoolStats:
+    """Contadores en proceso del pool (checkouts, conexiones nuevas y espera)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checked_out = 0
+        self.checkouts = 0
+        self.connects = 0
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self.wait_count += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+
+    def on_connect(self, *_):
+        with self._lock:
+            self.connects += 1
+
+    def on_checkout(self, *_):
+        with self._lock:
+            self.checked_out += 1
+            self.checkouts += 1
+
+    def on_checkin(self, *_):
+        with self._lock:
+            self.checked_out = max(self.checked_out - 1, 0)
+
+
+_pool_stats = _PoolStats()
+
+
+def _timed_pool(poolclass):
+    """Subclase del pool que mide el tiempo de espera (o de conexión, con NullPool) por checkout."""
+
+    class _TimedPool(poolclass):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            finally:
+                _pool_stats.record_wait(time.perf_counter() - start)
+
+    _TimedPool.__name__ = poolclass.__name__
+    return _TimedPool
+
+
+def _engine_kwargs(url, *, asyncio: bool = False) -> dict:
+    """`url` es la URL con la que se crea el engine (la async para el engine async)."""
+    if DB_POOL_MODE == "null":
+        return {
+            "poolclass": NullPool if asyncio else _timed_pool(NullPool),   # <- clave para serverless + Neon Free
+            "pool_pre_ping": True,
+        }
+
+    if DB_POOL_MODE not in ("queue", "pgbouncer"):
+        raise ValueError(f"DB_POOL_MODE inválido: {DB_POOL_MODE!r} (use null, queue o pgbouncer)")
+
+    kwargs = {
+        "poolclass": AsyncAdaptedQueuePool if asyncio else _timed_pool(QueuePool),
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_pre_ping": True,
+    }
+    if DB_POOL_MODE == "pgbouncer":
+        # En modo transacción cada statement puede caer en otro backend:
+        # nada de prepared statements del lado servidor
+        if make_url(url).get_driver_name() == "psycopg":
+            kwargs["connect_args"] = {"prepare_threshold": None}
+    return kwargs
+
+
 if DATABASE_URL.startswith("sqlite"):
     engine = create_engine(
         DATABASE_URL,
         connect_args={"check_same_thread": False}
     )
 else:
-    engine = create_engine(
-        DATABASE_URL,
-        poolclass=NullPool,          # <- clave para serverless + Neon Free
-        pool_pre_ping=True,
+    engine = create_engine(DATABASE_URL, **_engine_kwargs(DATABASE_URL))
+
+event.listen(engine, "connect", _pool_stats.on_connect)
+event.listen(engine, "checkout", _pool_stats.on_checkout)
+event.listen(engine, "checkin", _pool_stats.on_checkin)
+
+
+def pool_stats() -> dict:
+    """Estado del pool del engine principal para dimensionarlo por despliegue."""
+    pool = engine.pool
+    s = _pool_stats
+    data = {
+        "mode": "sqlite" if engine.dialect.name == "sqlite" else DB_POOL_MODE,
+        "pool_class": type(pool).__name__,
+        "checked_out": s.checked_out,
+        "idle": 0,
+        "overflow": 0,
+        "total_checkouts": s.checkouts,
+        "new_connections": s.connects,
+        "wait_count": s.wait_count,
+        "wait_avg_ms": round(s.wait_total / s.wait_count * 1000, 3) if s.wait_count else None,
+        "wait_max_ms": round(s.wait_max * 1000, 3) if s.wait_count else None,
+    }
+    if isinstance(pool, QueuePool):
+        data.update(
+            size=pool.size(),
+            checked_out=pool.checkedout(),
+            idle=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=DB_MAX_OVERFLOW,
+            timeout=pool.timeout(),
+        )
+    return data
+
+
+def _async_url(url: str):
+    """Misma BD con driver asíncrono: aiosqlite para SQLite, psycopg (modo async) para PostgreSQL."""
+    u = make_url(url)
+    if u.get_backend_name() == "sqlite":
+        return u.set(drivername="sqlite+aiosqlite")
+    if u.get_backend_name() == "postgresql":
+        return u.set(drivername="postgresql+psycopg")
+    return u
+
+
+ASYNC_DATABASE_URL = _async_url(DATABASE_URL)
+
+if DATABASE_URL.startswith("sqlite"):
+    async_engine = create_async_engine(ASYNC_DATABASE_URL)
+else:
+    # El driver se detecta sobre la URL async: con postgresql+psycopg2 en
+    # DATABASE_URL el engine async igual usa psycopg y necesita prepare_threshold
+    async_engine = create_async_engine(
+        ASYNC_DATABASE_URL, **_engine_kwargs(ASYNC_DATABASE_URL, asyncio=True)
     )
 
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
 
 class Base(DeclarativeBase):
     pass
@@ -28,3 +172,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    """Sesión asíncrona para handlers `async def` (no bloquea el event loop)."""
+    async with AsyncSessionLocal() as db:
+        yield db
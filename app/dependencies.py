@@ -1,12 +1,16 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
 from sqlalchemy.orm import Session
 from typing import Iterable
 
 from app.config import SECRET_KEY, ALGORITHM
 from app.database import get_db
 from app import models
+from app.principal_cache import resolve_principal
+from app.startup import lazy_import
+
+jose = lazy_import("jose")
+jwt = lazy_import("jose.jwt")
 
 # Evita import circular con app.auth:
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/token")
@@ -23,12 +27,12 @@ def get_current_user(
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         uid = payload.get("uid")
-        if uid is None:
+        if uid is None or payload.get("typ") == "refresh":
             raise credentials_exception
-    except JWTError:
+    except jose.JWTError:
         raise credentials_exception
 
-    user = db.query(models.User).get(uid)
+    user = resolve_principal(db, payload)
     if not user:
         raise credentials_exception
     return user
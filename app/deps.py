@@ -1,10 +1,15 @@
-from passlib.context import CryptContext
+import importlib
 from sqlalchemy.orm import Session
 from sqlalchemy import text
+from app.config import BCRYPT_ROUNDS
 from app.models import User
+from app.startup import Lazy
 import bcrypt, os
 
-pwd = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd = Lazy(
+    "CryptContext",
+    lambda: importlib.import_module("passlib.context").CryptContext(schemes=["bcrypt"], deprecated="auto"),
+)
 
 # Valor permitido por el esquema Pydantic (evita el error)
 VALID_ADMIN_PERM = os.getenv("ADMIN_ENTIDAD_PERM", "captura_reportes")
@@ -13,7 +18,7 @@ connect_kwargs = {"prepare_threshold": None}  # PgBouncer friendly
 
 # ========== HASH PASSWORD ==========
 def hash_pw(pw: str) -> str:
-    return bcrypt.hashpw(pw.encode(), bcrypt.gensalt()).decode()
+    return bcrypt.hashpw(pw.encode(), bcrypt.gensalt(BCRYPT_ROUNDS)).decode()
 
 def seed_users(db: Session):
 
@@ -0,0 +1,86 @@
+"""
+Exportación en streaming (NDJSON / CSV) de tablas grandes.
+
+Las filas se leen del servidor por lotes (yield_per -> stream_results) y se
+escriben en un StreamingResponse a medida que llegan, así que la memoria del
+worker no crece con el tamaño de la tabla.
+"""
+import csv
+import io
+import json
+import os
+from typing import Iterator, Mapping, Optional
+
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Table, select
+from sqlalchemy.orm import Session
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def export_format(request: Request, format: Optional[str]) -> Optional[str]:
+    """
+    Formato de exportación pedido por `?format=` o, si no viene, por el header Accept.
+    None significa la respuesta JSON de siempre.
+    """
+    if format:
+        return None if format == "json" else format
+    accept = request.headers.get("accept", "").lower()
+    if "application/x-ndjson" in accept or "application/ndjson" in accept:
+        return "ndjson"
+    if "text/csv" in accept:
+        return "csv"
+    return None
+
+
+def _iter_partitions(bind, table: Table) -> Iterator[list]:
+    # Conexión propia: la sesión de get_db se cierra antes de que termine el streaming
+    with bind.connect() as conn:
+        result = conn.execution_options(yield_per=EXPORT_BATCH_SIZE).execute(
+            select(table).order_by(*table.primary_key.columns)
+        )
+        for partition in result.partitions():
+            yield partition
+
+
+def _ndjson(bind, table: Table) -> Iterator[str]:
+    for partition in _iter_partitions(bind, table):
+        yield "".join(
+            json.dumps(dict(row._mapping), default=str, ensure_ascii=False) + "\n"
+            for row in partition
+        )
+
+
+def _csv(bind, table: Table) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([c.name for c in table.columns])
+    for partition in _iter_partitions(bind, table):
+        writer.writerows(partition)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def streaming_export(
+    db: Session,
+    table: Table,
+    fmt: str,
+    filename: str,
+    headers: Optional[Mapping[str, str]] = None,
+) -> StreamingResponse:
+    bind = db.get_bind()
+    body = _ndjson(bind, table) if fmt == "ndjson" else _csv(bind, table)
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[fmt],
+        headers={**(headers or {}), "Content-Disposition": f'attachment; filename="{filename}.{fmt}"'},
+    )
@@ -0,0 +1,114 @@
+"""
+Utilidades HTTP de validación condicional (ETag / Last-Modified) y rangos de bytes.
+"""
+from email.utils import formatdate, parsedate_to_datetime
+from typing import List, Optional, Tuple
+
+from fastapi import Request
+
+
+class RangeNotSatisfiable(Exception):
+    """El header Range es válido pero ningún rango cae dentro del recurso."""
+
+
+def http_date(timestamp: float) -> str:
+    return formatdate(timestamp, usegmt=True)
+
+
+def _etag_list(header: str) -> List[str]:
+    return [t.strip() for t in header.split(",") if t.strip()]
+
+
+def _opaque(tag: str) -> str:
+    return tag[2:] if tag.startswith("W/") else tag
+
+
+def etag_matches(header: Optional[str], etag: str) -> bool:
+    """Comparación débil (RFC 9110 §13.1.2), la que aplica a If-None-Match."""
+    if not header:
+        return False
+    tags = _etag_list(header)
+    return "*" in tags or _opaque(etag) in {_opaque(t) for t in tags}
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[float] = None) -> bool:
+    """
+    True si la petición condicional permite responder 304.
+    If-None-Match tiene prioridad; If-Modified-Since solo se evalúa si no viene.
+    """
+    inm = request.headers.get("if-none-match")
+    if inm is not None:
+        return etag_matches(inm, etag)
+    ims = request.headers.get("if-modified-since")
+    if ims and last_modified is not None:
+        try:
+            return int(last_modified) <= parsedate_to_datetime(ims).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def if_range_allows(request: Request, etag: str, last_modified: Optional[float] = None) -> bool:
+    """If-Range: el rango solo se honra si el validador coincide (ETag fuerte o fecha exacta)."""
+    header = request.headers.get("if-range")
+    if not header:
+        return True
+    header = header.strip()
+    if header.startswith('"') or header.startswith("W/"):
+        return not header.startswith("W/") and header == etag
+    if last_modified is None:
+        return False
+    try:
+        return int(last_modified) == int(parsedate_to_datetime(header).timestamp())
+    except (TypeError, ValueError):
+        return False
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Interpreta `Range: bytes=...` y devuelve rangos (inicio, fin) inclusivos, ordenados
+    y fusionados. None si no hay header o es sintácticamente inválido (se sirve completo);
+    RangeNotSatisfiable si ninguno de los rangos es satisfacible.
+    """
+    if not header:
+        return None
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec.strip():
+        return None
+
+    ranges: List[Tuple[int, int]] = []
+    for part in spec.split(","):
+        start_s, sep, end_s = part.strip().partition("-")
+        if not sep:
+            return None
+        start_s, end_s = start_s.strip(), end_s.strip()
+        try:
+            if start_s == "":
+                # sufijo: últimos N bytes
+                length = int(end_s)
+                if length <= 0:
+                    continue
+                start, end = max(size - length, 0), size - 1
+            else:
+                start = int(start_s)
+                end = int(end_s) if end_s else size - 1
+                if end_s and end < start:
+                    return None
+                end = min(end, size - 1)
+        except ValueError:
+            return None
+        if start < size and start <= end:
+            ranges.append((start, end))
+
+    if not ranges:
+        raise RangeNotSatisfiable()
+
+    ranges.sort()
+    merged = [ranges[0]]
+    for start, end in ranges[1:]:
+        last_start, last_end = merged[-1]
+        if start <= last_end + 1:
+            merged[-1] = (last_start, max(last_end, end))
+        else:
+            merged.append((start, end))
+    return merged
@@ -0,0 +1,94 @@
+"""
+Conjunto de indicadores con seguimiento por entidad (tabla indicador_entidad).
+
+/seguimiento/indicadores_usados antes hacía join seguimiento -> plan_accion con
+trim/lower y DISTINCT en cada llamada. Ahora crear/actualizar/eliminar
+seguimiento y eliminar_plan ajustan un contador por (entidad_key, indicador)
+en su misma transacción, y la lectura es un lookup por clave primaria.
+
+Reconstrucción completa (backfill o reparación):
+    python tools/rebuild_indicadores.py
+"""
+from collections import Counter
+from typing import List, Optional
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app import models
+from app.bulk import upsert_counts
+from app.table_versions import INDICADORES, bump
+
+_tabla = models.IndicadorEntidad.__table__
+_KEYS = ("entidad_key", "indicador")
+
+
+def normalizar(indicador: Optional[str]) -> str:
+    return (indicador or "").strip()
+
+
+def _plan_key(plan: models.PlanAccion) -> str:
+    return plan.nombre_entidad_key or models.entidad_key(plan.nombre_entidad)
+
+
+def ajustar(db: Session, plan: models.PlanAccion, deltas: Counter) -> None:
+    """Suma `deltas` ({indicador: +n/-n}) a la entidad del plan; borra los que quedan en 0."""
+    entidad = _plan_key(plan)
+    rows = [
+        {"entidad_key": entidad, "indicador": ind, "total": n}
+        for ind, n in deltas.items()
+        if ind and n
+    ]
+    if not rows:
+        return
+    conn = db.connection()
+    upsert_counts(conn, _tabla, _KEYS, rows)
+    bump(db, INDICADORES)
+    if any(r["total"] < 0 for r in rows):
+        conn.execute(delete(_tabla).where(_tabla.c.entidad_key == entidad, _tabla.c.total <= 0))
+
+
+def cambio(db: Session, plan: models.PlanAccion, antes: Optional[str], despues: Optional[str]) -> None:
+    """Un seguimiento del plan pasó del indicador `antes` a `despues` (None = no existía / se borró)."""
+    antes, despues = normalizar(antes), normalizar(despues)
+    if antes == despues:
+        return
+    deltas: Counter = Counter()
+    if antes:
+        deltas[antes] -= 1
+    if despues:
+        deltas[despues] += 1
+    ajustar(db, plan, deltas)
+
+
+def listar(db: Session, entidad_key: Optional[str] = None) -> List[str]:
+    """Indicadores de una entidad, o de todas si `entidad_key` es None."""
+    if entidad_key is None:
+        stmt = select(_tabla.c.indicador).distinct()
+    else:
+        stmt = select(_tabla.c.indicador).where(_tabla.c.entidad_key == entidad_key)
+    return list(db.execute(stmt.order_by(_tabla.c.indicador)).scalars())
+
+
+def reconstruir(conn: Connection) -> int:
+    """Recalcula la tabla completa desde seguimiento + plan_accion. Devuelve las filas escritas."""
+    seg = models.Seguimiento.__table__
+    plan = models.PlanAccion.__table__
+    grupos = conn.execute(
+        select(plan.c.nombre_entidad, seg.c.indicador, func.count())
+        .join(plan, seg.c.plan_id == plan.c.id)
+        .where(seg.c.indicador.isnot(None))
+        .group_by(plan.c.nombre_entidad, seg.c.indicador)
+    ).all()
+    # Normalización en Python: la misma que usa el ORM (entidad_key / strip)
+    conteos: Counter = Counter()
+    for nombre, indicador, n in grupos:
+        indicador = normalizar(indicador)
+        if indicador:
+            conteos[(models.entidad_key(nombre), indicador)] += n
+    conn.execute(delete(_tabla))
+    upsert_counts(conn, _tabla, _KEYS, [
+        {"entidad_key": k, "indicador": i, "total": n} for (k, i), n in conteos.items()
+    ])
+    return len(conteos)
@@ -0,0 +1,340 @@
+"""
+Migraciones de esquema versionadas.
+
+Reemplaza los parches que corrían en cada arranque (create_all + _ensure_*).
+Cada paso tiene un número de versión, es idempotente y queda registrado en la
+tabla `schema_version`. Con el esquema al día, el arranque cuesta una sola
+consulta (SELECT MAX(version)).
+
+Los pasos pendientes corren en una única transacción; en PostgreSQL se toma
+un advisory lock de transacción (compatible con PgBouncer en modo
+transacción) para que instancias concurrentes no compitan: la segunda espera,
+relee la versión y no repite nada. En SQLite (dev) no hay lock.
+
+Reglas para pasos nuevos:
+  - agregar al final de MIGRATIONS con el siguiente número; nunca renumerar
+  - el paso 1 hace create_all, pero solo corre en BD nuevas: una tabla nueva
+    necesita su propio paso (`Modelo.__table__.create(conn, checkfirst=True)`)
+  - cada paso debe poder re-ejecutarse sin error
+
+Uso manual: python -m app.migrations
+"""
+from datetime import datetime
+from typing import Callable, List, Tuple
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+
+from app import models, plan_search
+from app.database import Base
+
+# Clave arbitraria y estable para pg_advisory_xact_lock
+ADVISORY_LOCK_KEY = 780_431_552
+
+
+def _is_postgres(conn: Connection) -> bool:
+    return conn.dialect.name in ("postgresql", "postgres")
+
+
+def _columns(conn: Connection, table: str) -> set:
+    insp = inspect(conn)
+    if not insp.has_table(table):
+        return set()
+    return {c["name"] for c in insp.get_columns(table)}
+
+
+# ───────────────────────────── pasos ─────────────────────────────
+
+def _baseline(conn: Connection):
+    """Crea las tablas que falten (BD nueva o tablas previas a las migraciones)."""
+    Base.metadata.create_all(bind=conn)
+
+
+def _seguimiento_updated_by_id(conn: Connection):
+    """Añade updated_by_id si falta (incluye la tabla plural heredada)."""
+    for table in ("seguimiento", "seguimientos"):
+        cols = _columns(conn, table)
+        if cols and "updated_by_id" not in cols:
+            conn.execute(text(f'ALTER TABLE "{table}" ADD COLUMN updated_by_id INTEGER'))
+            return
+
+
+def _users_fk_set_null(conn: Connection):
+    """
+    Ajusta las FKs que apuntan a users para permitir ON DELETE SET NULL en PostgreSQL.
+    Evita que el borrado de un usuario falle por plan_accion.created_by o seguimiento.updated_by_id.
+    """
+    if not _is_postgres(conn):
+        return
+
+    targets = []
+    if _columns(conn, "plan_accion"):
+        targets.append(("plan_accion", "created_by", "plan_accion_created_by_fkey"))
+    for seg_table in ("seguimiento", "seguimientos"):
+        if _columns(conn, seg_table):
+            targets.append((seg_table, "updated_by_id", "seguimiento_updated_by_id_fkey"))
+            break
+
+    for table, column, fk_name in targets:
+        conn.execute(text(f'ALTER TABLE "{table}" ALTER COLUMN {column} DROP NOT NULL'))
+        conn.execute(text(f"""
+            DO $$ DECLARE constr_name text;
+            BEGIN
+                SELECT tc.constraint_name INTO constr_name
+                FROM information_schema.table_constraints tc
+                JOIN information_schema.constraint_column_usage ccu
+                  ON tc.constraint_name = ccu.constraint_name
+                WHERE tc.table_schema='public'
+                  AND tc.table_name='{table}'
+                  AND ccu.column_name='{column}'
+                  AND tc.constraint_type='FOREIGN KEY'
+                LIMIT 1;
+                IF constr_name IS NOT NULL THEN
+                    EXECUTE format('ALTER TABLE %I DROP CONSTRAINT %I', '{table}', constr_name);
+                END IF;
+            END$$;
+        """))
+        conn.execute(text(f"""
+            DO $$
+            BEGIN
+                IF NOT EXISTS (
+                    SELECT 1
+                    FROM information_schema.table_constraints
+                    WHERE table_schema='public'
+                      AND table_name='{table}'
+                      AND constraint_name='{fk_name}'
+                ) THEN
+                    ALTER TABLE "{table}"
+                    ADD CONSTRAINT {fk_name}
+                    FOREIGN KEY ({column}) REFERENCES "users"(id) ON DELETE SET NULL;
+                END IF;
+            END$$;
+        """))
+
+
+def _users_entidad_perm(conn: Connection):
+    """Añade users.entidad_perm y la inicializa a 'captura_reportes' para las entidades."""
+    if "entidad_perm" in _columns(conn, "users"):
+        return
+    conn.execute(text('ALTER TABLE "users" ADD COLUMN entidad_perm VARCHAR(32)'))
+    conn.execute(text("""
+        UPDATE "users"
+        SET entidad_perm = 'captura_reportes'
+        WHERE role = 'entidad' AND (entidad_perm IS NULL OR entidad_perm = '')
+    """))
+
+
+def _users_entidad_auditor(conn: Connection):
+    """Añade users.entidad_auditor si falta."""
+    if "entidad_auditor" in _columns(conn, "users"):
+        return
+    false = "FALSE" if _is_postgres(conn) else "0"
+    conn.execute(text(f'ALTER TABLE "users" ADD COLUMN entidad_auditor BOOLEAN DEFAULT {false}'))
+    conn.execute(text(f"""
+        UPDATE "users"
+        SET entidad_auditor = {false}
+        WHERE entidad_auditor IS NULL
+    """))
+
+
+def _normalize_legacy_roles(conn: Connection):
+    """Normaliza el rol legacy 'entidad_evaluador' a entidad + entidad_auditor."""
+    if _is_postgres(conn):
+        conn.execute(text("""
+            UPDATE "users"
+            SET role = 'entidad',
+                entidad_auditor = TRUE
+            WHERE role::text = 'entidad_evaluador'
+        """))
+    else:
+        conn.execute(text("""
+            UPDATE users
+            SET role = 'entidad',
+                entidad_auditor = 1
+            WHERE role = 'entidad_evaluador'
+        """))
+
+
+def _plan_accion_entidad_key(conn: Connection):
+    """
+    Añade plan_accion.nombre_entidad_key (+ índice) y rellena las filas existentes.
+    El backfill se hace en Python para usar exactamente la misma normalización que el ORM.
+    """
+    cols = _columns(conn, "plan_accion")
+    if not cols:
+        return
+    if "nombre_entidad_key" not in cols:
+        conn.execute(text("ALTER TABLE plan_accion ADD COLUMN nombre_entidad_key VARCHAR(255)"))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_plan_accion_nombre_entidad_key "
+        "ON plan_accion (nombre_entidad_key)"
+    ))
+    pendientes = conn.execute(text("""
+        SELECT id, nombre_entidad
+        FROM plan_accion
+        WHERE nombre_entidad_key IS NULL
+    """)).fetchall()
+    if pendientes:
+        conn.execute(
+            text("UPDATE plan_accion SET nombre_entidad_key = :k WHERE id = :id"),
+            [{"id": r[0], "k": models.entidad_key(r[1])} for r in pendientes],
+        )
+
+
+def _uploaded_files_digests(conn: Connection):
+    """Añade uploaded_files.sha256 y blob_sha256 (+ índices); las filas previas quedan en NULL."""
+    models.EvidenceBlob.__table__.create(conn, checkfirst=True)
+    cols = _columns(conn, "uploaded_files")
+    if not cols:
+        return
+    if "sha256" not in cols:
+        conn.execute(text("ALTER TABLE uploaded_files ADD COLUMN sha256 VARCHAR(64)"))
+    if "blob_sha256" not in cols:
+        conn.execute(text(
+            "ALTER TABLE uploaded_files ADD COLUMN blob_sha256 VARCHAR(64) "
+            "REFERENCES evidence_blobs (sha256)"
+        ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_uploaded_files_sha256 ON uploaded_files (sha256)"
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_uploaded_files_blob_sha256 ON uploaded_files (blob_sha256)"
+    ))
+
+
+def _pqrd_resumen(conn: Connection):
+    """Crea pqrd_resumen y la llena a partir de las PQRDs existentes."""
+    from app.pqrd_stats import reconstruir
+
+    models.PQRDResumen.__table__.create(conn, checkfirst=True)
+    reconstruir(conn)
+
+
+def _habilidades_periodo_index(conn: Connection):
+    """Índice compuesto (anio, mes, id_entidad) en habilidades."""
+    if not _columns(conn, "habilidades"):
+        return
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_habilidades_anio_mes_entidad "
+        "ON habilidades (anio, mes, id_entidad)"
+    ))
+
+
+def _pqrds_label_index(conn: Connection):
+    """Índice en pqrds.label (búsqueda por label)."""
+    if not _columns(conn, "pqrds"):
+        return
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_pqrds_label ON pqrds (label)"))
+
+
+def _indicador_entidad(conn: Connection):
+    """Crea indicador_entidad y la llena desde los seguimientos existentes."""
+    from app.indicadores import reconstruir
+
+    models.IndicadorEntidad.__table__.create(conn, checkfirst=True)
+    reconstruir(conn)
+
+
+def _table_versions(conn: Connection):
+    """Crea table_versions (contadores para los ETag de los GET)."""
+    models.TableVersion.__table__.create(conn, checkfirst=True)
+
+
+def _plan_accion_fts(conn: Connection):
+    """Búsqueda de texto completo en planes: tsvector + GIN (PostgreSQL) o FTS5 (SQLite)."""
+    # requiere las columnas indexadas (un esquema parcial queda sin FTS)
+    if {c for c, _, _ in plan_search.FTS_COLUMNS} <= _columns(conn, "plan_accion"):
+        plan_search.install(conn)
+
+
+def _refresh_tokens(conn: Connection):
+    """Crea refresh_tokens (POST /auth/refresh)."""
+    models.RefreshToken.__table__.create(conn, checkfirst=True)
+
+
+def _users_token_version(conn: Connection):
+    """Añade users.token_version (revocación de access tokens)."""
+    if "token_version" in _columns(conn, "users"):
+        return
+    conn.execute(text('ALTER TABLE "users" ADD COLUMN token_version INTEGER NOT NULL DEFAULT 0'))
+
+
+MIGRATIONS: List[Tuple[int, str, Callable[[Connection], None]]] = [
+    (1, "baseline", _baseline),
+    (2, "seguimiento_updated_by_id", _seguimiento_updated_by_id),
+    (3, "users_fk_set_null", _users_fk_set_null),
+    (4, "users_entidad_perm", _users_entidad_perm),
+    (5, "users_entidad_auditor", _users_entidad_auditor),
+    (6, "normalize_legacy_roles", _normalize_legacy_roles),
+    (7, "plan_accion_entidad_key", _plan_accion_entidad_key),
+    (8, "uploaded_files_digests", _uploaded_files_digests),
+    (9, "pqrd_resumen", _pqrd_resumen),
+    (10, "habilidades_periodo_index", _habilidades_periodo_index),
+    (11, "pqrds_label_index", _pqrds_label_index),
+    (12, "indicador_entidad", _indicador_entidad),
+    (13, "table_versions", _table_versions),
+    (14, "plan_accion_fts", _plan_accion_fts),
+    (15, "refresh_tokens", _refresh_tokens),
+    (16, "users_token_version", _users_token_version),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# ───────────────────────────── runner ─────────────────────────────
+
+def current_version(engine: Engine) -> int:
+    """Versión aplicada del esquema (0 si la tabla schema_version aún no existe)."""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+    except Exception:
+        return 0
+
+
+def run_migrations(engine: Engine) -> List[str]:
+    """
+    Aplica los pasos pendientes y devuelve sus nombres ([] si el esquema ya estaba al día).
+    Un fallo se registra como [WARN] y deshace la tanda completa: el servicio arranca
+    igual (como con los parches anteriores) y el próximo arranque lo reintenta.
+    """
+    if current_version(engine) >= LATEST_VERSION:
+        return []
+
+    applied: List[str] = []
+    step_name = "schema_version"
+    try:
+        with engine.begin() as conn:
+            if _is_postgres(conn):
+                conn.execute(text("SELECT pg_advisory_xact_lock(:k)"), {"k": ADVISORY_LOCK_KEY})
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    name VARCHAR(100) NOT NULL,
+                    applied_at TIMESTAMP NOT NULL
+                )
+            """))
+            # Releer bajo el lock: otra instancia pudo haber migrado mientras esperábamos
+            version = conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+            for number, name, step in MIGRATIONS:
+                if number <= version:
+                    continue
+                step_name = name
+                step(conn)
+                conn.execute(
+                    text("INSERT INTO schema_version (version, name, applied_at) VALUES (:v, :n, :t)"),
+                    {"v": number, "n": name, "t": datetime.utcnow()},
+                )
+                applied.append(name)
+    except Exception as e:
+        print(f"[WARN] run_migrations falló en '{step_name}': {e}")
+        return []
+    return applied
+
+
+if __name__ == "__main__":
+    from app.database import engine
+
+    print(f"schema_version actual: {current_version(engine)}")
+    pasos = run_migrations(engine)
+    print(f"aplicadas: {', '.join(pasos) if pasos else 'ninguna'}; versión: {current_version(engine)}")
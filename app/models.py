@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Text, Date, Enum, ForeignKey, DateTime, Boolean, select
-from sqlalchemy.orm import relationship, column_property
+from sqlalchemy import Column, Integer, String, Text, Date, Enum, ForeignKey, DateTime, Boolean, Index, select
+from sqlalchemy.orm import relationship, column_property, validates
 from sqlalchemy.ext.hybrid import hybrid_property
 from datetime import datetime
 from app.database import Base
@@ -7,6 +7,11 @@ import enum
 import uuid
 
 
+def entidad_key(nombre: str | None) -> str:
+    """Clave normalizada (trim + minúsculas) usada para filtrar por entidad."""
+    return (nombre or "").strip().lower()
+
+
 class UserRole(str, enum.Enum):
     admin = "admin"
     entidad = "entidad"
@@ -22,12 +27,16 @@ class User(Base):
     entidad_perm = Column(String(32), nullable=True)
     entidad_auditor = Column(Boolean, nullable=False, default=False)
     entidad = Column(String, nullable=False) 
+    # claim "tv" de los access tokens; subirla invalida los tokens emitidos antes
+    token_version = Column(Integer, nullable=False, default=0, server_default="0")
 
 class PlanAccion(Base):
     __tablename__ = "plan_accion"
     id = Column(Integer, primary_key=True, index=True)
     num_plan_mejora = Column(String(50), nullable=False, default=lambda: str(uuid.uuid4())[:8])
     nombre_entidad = Column(String(255), nullable=False)
+    # se mantiene sincronizada con nombre_entidad (ver _sync_entidad_key)
+    nombre_entidad_key = Column(String(255), nullable=True, index=True)
     insumo_mejora = Column(String(255), nullable=True)
     tipo_accion_mejora = Column(String(255), nullable=True)
     accion_mejora_planteada = Column(Text, nullable=True)
@@ -51,8 +60,14 @@ class PlanAccion(Base):
         "Seguimiento",
         back_populates="plan",
         cascade="all, delete-orphan",
+        order_by="Seguimiento.id",
     )
 
+    @validates("nombre_entidad")
+    def _sync_entidad_key(self, key, value):
+        self.nombre_entidad_key = entidad_key(value)
+        return value
+
 class Seguimiento(Base):
     __tablename__ = "seguimiento"
     id = Column(Integer, primary_key=True)
@@ -88,6 +103,34 @@ class Seguimiento(Base):
         return self.updated_by.entidad if self.updated_by else None
 
 
+# Indicadores con seguimiento por entidad (lo mantiene app/indicadores.py)
+class IndicadorEntidad(Base):
+    __tablename__ = "indicador_entidad"
+    entidad_key = Column(String(255), primary_key=True)  # = plan_accion.nombre_entidad_key
+    indicador = Column(String, primary_key=True)  # sin espacios alrededor
+    total = Column(Integer, nullable=False, default=0)  # seguimientos que lo usan
+
+
+# Versión por tabla: la sube cada escritura de los routers (ver app/table_versions.py)
+class TableVersion(Base):
+    __tablename__ = "table_versions"
+    name = Column(String(64), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+
+
+# Refresh tokens rotativos (POST /auth/refresh, ver app/refresh_tokens.py)
+class RefreshToken(Base):
+    __tablename__ = "refresh_tokens"
+    id = Column(Integer, primary_key=True)
+    jti = Column(String(64), unique=True, index=True, nullable=False)
+    family = Column(String(64), index=True, nullable=False)  # jti del primer token del login
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+    revoked_at = Column(DateTime, nullable=True)
+    replaced_by = Column(String(64), nullable=True)  # jti que lo reemplazó al rotar
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
 # Modelo para archivos subidos
 class UploadedFile(Base):
     __tablename__ = "uploaded_files"
@@ -98,12 +141,25 @@ class UploadedFile(Base):
     file_path = Column(String(1000), nullable=False)  # ruta relativa
     content_type = Column(String(100), nullable=False)
     file_size = Column(Integer, nullable=False)  # en bytes
+    sha256 = Column(String(64), nullable=True, index=True)  # digest calculado al subir
+    # solo en modo EVIDENCE_STORAGE=cas: blob compartido al que apunta stored_filename
+    blob_sha256 = Column(String(64), ForeignKey("evidence_blobs.sha256"), nullable=True, index=True)
     uploaded_by_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True)
     uploaded_by = relationship("User", foreign_keys=[uploaded_by_id])
     created_at = Column(DateTime, default=datetime.utcnow, index=True)
     description = Column(Text, nullable=True)  # descripción opcional
 
 
+# Blob de evidencia direccionado por contenido (EVIDENCE_STORAGE=cas)
+class EvidenceBlob(Base):
+    __tablename__ = "evidence_blobs"
+    sha256 = Column(String(64), primary_key=True)
+    stored_filename = Column(String(500), nullable=False)  # relativo al directorio de evidencias
+    file_size = Column(Integer, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
 # Creación de clase Reporte para almacenar datos de automatización de reportes
 class Reporte(Base):
     __tablename__ = "reportes"
@@ -118,16 +174,27 @@ class Reporte(Base):
 class PQRD(Base):
     __tablename__ = "pqrds"
     id = Column(Integer, primary_key=True, index=True)
-    label = Column(String(255), nullable=False)
+    label = Column(String(255), nullable=False, index=True)
     tipo_gestion = Column(String(255), nullable=False)
     dependencia = Column(String(255), nullable=False)
     entidad = Column(String(255), nullable=False)
     fecha_ingreso = Column(Date, nullable=False)
     periodo = Column(String(50), nullable=True)
 
+# Conteos de PQRDs por entidad/tipo/dependencia/mes (lo mantiene app/pqrd_stats.py)
+class PQRDResumen(Base):
+    __tablename__ = "pqrd_resumen"
+    entidad = Column(String(255), primary_key=True)
+    tipo_gestion = Column(String(255), primary_key=True)
+    dependencia = Column(String(255), primary_key=True)
+    mes = Column(String(7), primary_key=True)  # "YYYY-MM" de fecha_ingreso
+    total = Column(Integer, nullable=False, default=0)
+
 # Clase de habilidades
 class Habilidad(Base):
     __tablename__ = "habilidades"
+    # Filtros de eliminar_habilidad y series por periodo/entidad
+    __table_args__ = (Index("ix_habilidades_anio_mes_entidad", "anio", "mes", "id_entidad"),)
     id = Column(Integer, primary_key=True, index=True)
     anio = Column(Integer, nullable=False)
     mes = Column(Integer, nullable=False)
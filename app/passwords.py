@@ -0,0 +1,193 @@
+"""
+Hash y verificación bcrypt en un pool de procesos propio.
+
+Antes /auth/token llamaba pwd.verify (passlib) en el threadpool compartido de
+anyio: en los picos de login de la mañana bcrypt ocupaba los 40 hilos y dejaba
+sin hilo al resto de endpoints síncronos. Ahora:
+
+  - bcrypt corre en un ProcessPoolExecutor de PASSWORD_HASH_WORKERS procesos
+    (paralelismo real, sin GIL); login es `async def` y espera el resultado
+    sin ocupar el event loop ni el threadpool
+  - la cola está acotada (PASSWORD_HASH_MAX_PENDING): al llenarse se rechaza
+    con PoolSaturado (-> 503 + Retry-After) en vez de acumular esperas
+  - el costo es BCRYPT_ROUNDS; si un hash guardado tiene otro costo, el login
+    exitoso lo recalcula y lo guarda (rehash transparente)
+
+Los procesos se crean en el primer uso (no en el arranque) con "spawn". Las
+métricas (cola, ms por hash) están en /stats/hashing.
+"""
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
+from app.config import BCRYPT_ROUNDS, PASSWORD_HASH_MAX_PENDING, PASSWORD_HASH_WORKERS
+
+# bcrypt solo usa los primeros 72 bytes (passlib trunca igual)
+BCRYPT_MAX_BYTES = 72
+_PREFIJOS = ("2a", "2b", "2y")
+
+
+class PoolSaturado(RuntimeError):
+    """La cola del pool de hash está llena."""
+
+
+# ── Trabajo en los procesos hijos (nivel de módulo: se envían por nombre) ──
+
+def _secret(password: str) -> bytes:
+    return password.encode("utf-8")[:BCRYPT_MAX_BYTES]
+
+
+def _hash_worker(password: str, rounds: int) -> tuple:
+    import bcrypt
+
+    start = time.perf_counter()
+    hashed = bcrypt.hashpw(_secret(password), bcrypt.gensalt(rounds)).decode()
+    return hashed, time.perf_counter() - start
+
+
+def _verify_worker(password: str, hashed: str) -> tuple:
+    import bcrypt
+
+    start = time.perf_counter()
+    try:
+        ok = bcrypt.checkpw(_secret(password), hashed.encode())
+    except ValueError:  # hash vacío o con formato inválido
+        ok = False
+    return ok, time.perf_counter() - start
+
+
+def costo(hashed: Optional[str]) -> Optional[int]:
+    """Costo (log2 de rondas) de un hash bcrypt, o None si no es bcrypt."""
+    partes = (hashed or "").split("$")
+    if len(partes) < 4 or partes[1] not in _PREFIJOS:
+        return None
+    try:
+        return int(partes[2])
+    except ValueError:
+        return None
+
+
+class _Serie:
+    __slots__ = ("n", "ms_total", "ms_max", "espera_ms_total")
+
+    def __init__(self):
+        self.n = 0
+        self.ms_total = 0.0
+        self.ms_max = 0.0
+        self.espera_ms_total = 0.0
+
+    def stats(self) -> dict:
+        return {
+            "n": self.n,
+            "ms_promedio": round(self.ms_total / self.n, 2) if self.n else 0.0,
+            "ms_max": round(self.ms_max, 2),
+            "espera_ms_promedio": round(self.espera_ms_total / self.n, 2) if self.n else 0.0,
+        }
+
+
+class PasswordPool:
+    """Pool de procesos acotado para bcrypt, con métricas por operación."""
+
+    def __init__(self, workers: int = 0, max_pending: int = 64, rounds: int = 12):
+        self.workers = workers or min(4, os.cpu_count() or 1)
+        self.max_pending = max_pending
+        self.rounds = rounds
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._pending_max = 0
+        self._series = {"hash": _Serie(), "verify": _Serie()}
+        self.rechazadas = 0
+        self.errores = 0
+        self.rehashes = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    def _submit(self, op: str, fn, *args) -> Future:
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.rechazadas += 1
+                raise PoolSaturado(f"{self._pending} operaciones de hash pendientes")
+            executor = self._get_executor()
+            self._pending += 1
+            self._pending_max = max(self._pending_max, self._pending)
+        enviado = time.perf_counter()
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            with self._lock:
+                self._pending -= 1
+                self._executor = None  # el siguiente envío crea un pool nuevo
+            raise
+        future.add_done_callback(lambda f: self._done(op, f, enviado))
+        return future
+
+    def _done(self, op: str, future: Future, enviado: float) -> None:
+        total_ms = (time.perf_counter() - enviado) * 1000
+        with self._lock:
+            self._pending -= 1
+            error = future.cancelled() or future.exception() is not None
+            if error:
+                self.errores += 1
+                if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+                    self._executor = None
+                return
+            cpu_ms = future.result()[1] * 1000
+            serie = self._series[op]
+            serie.n += 1
+            serie.ms_total += cpu_ms
+            serie.ms_max = max(serie.ms_max, cpu_ms)
+            serie.espera_ms_total += max(0.0, total_ms - cpu_ms)
+
+    async def verify(self, password: str, hashed: Optional[str]) -> bool:
+        if not hashed:
+            return False
+        ok, _ = await asyncio.wrap_future(self._submit("verify", _verify_worker, password, hashed))
+        return ok
+
+    async def hash(self, password: str) -> str:
+        hashed, _ = await asyncio.wrap_future(self._submit("hash", _hash_worker, password, self.rounds))
+        return hashed
+
+    def hash_sync(self, password: str) -> str:
+        """Para handlers síncronos: el hilo espera, pero bcrypt corre en otro proceso."""
+        return self._submit("hash", _hash_worker, password, self.rounds).result()[0]
+
+    def needs_rehash(self, hashed: Optional[str]) -> bool:
+        return costo(hashed) != self.rounds or not (hashed or "").startswith("$2b$")
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "iniciado": self._executor is not None,
+                "bcrypt_rounds": self.rounds,
+                "pendientes": self._pending,
+                "en_cola": max(0, self._pending - self.workers),
+                "pendientes_max": self._pending_max,
+                "max_pendientes": self.max_pending,
+                "rechazadas": self.rechazadas,
+                "errores": self.errores,
+                "rehashes": self.rehashes,
+                "hash": self._series["hash"].stats(),
+                "verify": self._series["verify"].stats(),
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+password_pool = PasswordPool(PASSWORD_HASH_WORKERS, PASSWORD_HASH_MAX_PENDING, BCRYPT_ROUNDS)
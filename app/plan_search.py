@@ -0,0 +1,117 @@
+"""
+Búsqueda de texto completo sobre el contenido de los planes (?search=fts).
+
+Campos indexados (con peso): indicador y criterio (A), accion_mejora_planteada
+(B), descripcion_actividades y observacion_informe_calidad (C).
+
+  - PostgreSQL: columna generada plan_accion.search_tsv (tsvector, 'spanish')
+    con índice GIN; consulta con websearch_to_tsquery y orden por ts_rank_cd.
+  - SQLite: tabla FTS5 plan_accion_fts de contenido externo, sincronizada por
+    triggers; orden por bm25.
+
+Ni la columna ni la tabla FTS están en el modelo ORM: las crean los DDL de
+abajo al crear plan_accion y la migración `plan_accion_fts` en BD existentes.
+"""
+import re
+
+from sqlalchemy import DDL, column, event, func, literal_column, or_, table, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Query
+
+from app import models
+
+# (columna, peso tsvector, peso bm25)
+FTS_COLUMNS = (
+    ("indicador", "A", 3.0),
+    ("criterio", "A", 3.0),
+    ("accion_mejora_planteada", "B", 2.0),
+    ("descripcion_actividades", "C", 1.0),
+    ("observacion_informe_calidad", "C", 1.0),
+)
+TS_CONFIG = "spanish"
+_COLS = ", ".join(c for c, _, _ in FTS_COLUMNS)
+_fts = table("plan_accion_fts", column("rowid"))
+
+# ───────────────────────────── PostgreSQL ─────────────────────────────
+
+_TSV_EXPR = " || ".join(
+    f"setweight(to_tsvector('{TS_CONFIG}'::regconfig, coalesce({c}, '')), '{w}')"
+    for c, w, _ in FTS_COLUMNS
+)
+PG_DDL = (
+    f"ALTER TABLE plan_accion ADD COLUMN IF NOT EXISTS search_tsv tsvector "
+    f"GENERATED ALWAYS AS ({_TSV_EXPR}) STORED",
+    "CREATE INDEX IF NOT EXISTS ix_plan_accion_search_tsv ON plan_accion USING GIN (search_tsv)",
+)
+
+# ───────────────────────────── SQLite ─────────────────────────────
+
+_NEW = ", ".join(f"new.{c}" for c, _, _ in FTS_COLUMNS)
+_OLD = ", ".join(f"old.{c}" for c, _, _ in FTS_COLUMNS)
+SQLITE_DDL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS plan_accion_fts USING fts5("
+    f"{_COLS}, content='plan_accion', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    f"""CREATE TRIGGER IF NOT EXISTS plan_accion_fts_ai AFTER INSERT ON plan_accion BEGIN
+        INSERT INTO plan_accion_fts(rowid, {_COLS}) VALUES (new.id, {_NEW});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS plan_accion_fts_ad AFTER DELETE ON plan_accion BEGIN
+        INSERT INTO plan_accion_fts(plan_accion_fts, rowid, {_COLS}) VALUES ('delete', old.id, {_OLD});
+    END""",
+    # solo reindexa si cambia un campo indexado (no en cambios de estado)
+    f"""CREATE TRIGGER IF NOT EXISTS plan_accion_fts_au AFTER UPDATE OF {_COLS} ON plan_accion BEGIN
+        INSERT INTO plan_accion_fts(plan_accion_fts, rowid, {_COLS}) VALUES ('delete', old.id, {_OLD});
+        INSERT INTO plan_accion_fts(rowid, {_COLS}) VALUES (new.id, {_NEW});
+    END""",
+)
+
+for _stmt in PG_DDL:
+    event.listen(models.PlanAccion.__table__, "after_create", DDL(_stmt).execute_if(dialect="postgresql"))
+for _stmt in SQLITE_DDL:
+    event.listen(models.PlanAccion.__table__, "after_create", DDL(_stmt).execute_if(dialect="sqlite"))
+
+
+def install(conn: Connection) -> None:
+    """Crea columna/índice o tabla FTS + triggers en una BD existente e indexa lo que ya hay."""
+    if conn.dialect.name == "postgresql":
+        # la columna generada se calcula para todas las filas al agregarla
+        for stmt in PG_DDL:
+            conn.execute(text(stmt))
+    elif conn.dialect.name == "sqlite":
+        for stmt in SQLITE_DDL:
+            conn.execute(text(stmt))
+        conn.execute(text("INSERT INTO plan_accion_fts(plan_accion_fts) VALUES ('rebuild')"))
+
+
+def _fts5_query(q: str) -> str:
+    """Texto libre -> términos FTS5 entre comillas (AND implícito), sin operadores del usuario."""
+    terms = re.findall(r"\w+", q, flags=re.UNICODE)
+    return " ".join(f'"{t}"' for t in terms)
+
+
+def apply(query: Query, q: str, dialect: str, ranked: bool = True) -> Query:
+    """
+    Filtra `query` (sobre PlanAccion) por coincidencia de texto completo con `q`.
+    Con `ranked`, ordena por relevancia y luego por id desc.
+    """
+    if dialect == "postgresql":
+        tsquery = func.websearch_to_tsquery(TS_CONFIG, q)
+        tsv = literal_column("plan_accion.search_tsv")
+        query = query.filter(tsv.op("@@")(tsquery))
+        if ranked:
+            query = query.order_by(func.ts_rank_cd(tsv, tsquery).desc())
+    elif dialect == "sqlite":
+        match = _fts5_query(q)
+        if not match:
+            return query.filter(text("0 = 1"))
+        weights = ", ".join(str(w) for _, _, w in FTS_COLUMNS)
+        query = query.join(_fts, _fts.c.rowid == models.PlanAccion.id).filter(
+            literal_column("plan_accion_fts").op("MATCH")(match)
+        )
+        if ranked:
+            # bm25: más negativo = más relevante
+            query = query.order_by(text(f"bm25(plan_accion_fts, {weights})"))
+    else:
+        # sin FTS nativo: ILIKE sobre los mismos campos, sin ranking
+        like = f"%{q}%"
+        query = query.filter(or_(*[getattr(models.PlanAccion, c).ilike(like) for c, _, _ in FTS_COLUMNS]))
+    return query.order_by(models.PlanAccion.id.desc())
@@ -0,0 +1,88 @@
+"""
+Tabla resumen de PQRDs (pqrd_resumen) para los tableros.
+
+Cada carga suma sus conteos por (entidad, tipo_gestion, dependencia, mes) en la
+misma transacción que el insert, y el borrado total la vacía; así /pqrds/stats
+agrega unas pocas filas del resumen en vez de recorrer la tabla pqrds.
+"""
+from collections import Counter
+from datetime import date
+from typing import Iterable, List, Optional
+
+from sqlalchemy import delete, extract, func, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app import models
+from app.bulk import upsert_counts
+
+GROUP_FIELDS = ("entidad", "tipo_gestion", "dependencia")
+PERIODS = ("month", "year", "all")
+
+_resumen = models.PQRDResumen.__table__
+_KEYS = ("entidad", "tipo_gestion", "dependencia", "mes")
+
+
+def _mes(d: Optional[date]) -> str:
+    return f"{d.year:04d}-{d.month:02d}" if d else ""
+
+
+def acumular(db: Session, rows: Iterable[dict]) -> None:
+    """Suma al resumen las PQRDs recién insertadas (dicts con las columnas de pqrds)."""
+    conteos = Counter(
+        (r.get("entidad") or "", r.get("tipo_gestion") or "", r.get("dependencia") or "", _mes(r.get("fecha_ingreso")))
+        for r in rows
+    )
+    upsert_counts(db.connection(), _resumen, _KEYS, [dict(zip(_KEYS, key), total=n) for key, n in conteos.items()])
+
+
+def vaciar(db: Session) -> None:
+    db.execute(delete(_resumen))
+
+
+def reconstruir(conn: Connection) -> int:
+    """Recalcula el resumen completo desde pqrds (migración o reparación manual)."""
+    pqrds = models.PQRD.__table__
+    anio = extract("year", pqrds.c.fecha_ingreso)
+    mes = extract("month", pqrds.c.fecha_ingreso)
+    grupos = conn.execute(
+        select(pqrds.c.entidad, pqrds.c.tipo_gestion, pqrds.c.dependencia, anio, mes, func.count())
+        .group_by(pqrds.c.entidad, pqrds.c.tipo_gestion, pqrds.c.dependencia, anio, mes)
+    ).all()
+    deltas = [
+        {
+            "entidad": e or "",
+            "tipo_gestion": t or "",
+            "dependencia": d or "",
+            "mes": f"{int(a):04d}-{int(m):02d}" if a is not None else "",
+            "total": n,
+        }
+        for e, t, d, a, m, n in grupos
+    ]
+    conn.execute(delete(_resumen))
+    upsert_counts(conn, _resumen, _KEYS, deltas)
+    return len(deltas)
+
+
+def consultar(
+    db: Session,
+    group_by: List[str],
+    period: str = "month",
+    desde: Optional[str] = None,
+    hasta: Optional[str] = None,
+) -> List[dict]:
+    """Totales agrupados por `group_by` (+ mes o año según `period`), desde el resumen."""
+    columnas = [_resumen.c[f] for f in group_by]
+    if period == "month":
+        columnas.append(_resumen.c.mes.label("periodo"))
+    elif period == "year":
+        columnas.append(func.substr(_resumen.c.mes, 1, 4).label("periodo"))
+
+    stmt = select(*columnas, func.coalesce(func.sum(_resumen.c.total), 0).label("total"))
+    if desde:
+        stmt = stmt.where(_resumen.c.mes >= desde)
+    if hasta:
+        stmt = stmt.where(_resumen.c.mes <= hasta)
+    if columnas:
+        stmt = stmt.group_by(*columnas).order_by(*columnas)
+    return [dict(r._mapping) for r in db.execute(stmt)]
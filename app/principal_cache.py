@@ -0,0 +1,161 @@
+"""
+Caché en proceso (TTL + LRU) de los principales autenticados.
+
+get_current_user se ejecuta en cada request autenticado; con NullPool eso es
+una conexión nueva + un SELECT antes de la lógica de negocio. Aquí guardamos
+una foto de las columnas del usuario por uid y devolvemos un models.User
+transitorio (no ligado a ninguna sesión), igual que el usuario invitado de
+DISABLE_AUTH.
+
+Las rutas de app/routers/users.py invalidan la entrada al cambiar rol,
+permisos, entidad_auditor o contraseña, o al borrar el usuario.
+
+Modo sin estado (AUTH_STATELESS=true, opt-in): para tokens con claim "tv" el principal
+se arma con los claims ya verificados y solo se compara users.token_version
+(token_version_cache, un entero por uid). Esas mismas rutas suben la versión,
+así que un token emitido antes del cambio deja de valer en todos los workers
+(a más tardar tras TOKEN_VERSION_CACHE_TTL_SECONDS).
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import (
+    AUTH_STATELESS,
+    PRINCIPAL_CACHE_MAX_ENTRIES,
+    PRINCIPAL_CACHE_TTL_SECONDS,
+    TOKEN_VERSION_CACHE_TTL_SECONDS,
+)
+
+# Columnas que necesitan los handlers; nunca se cachea hashed_password
+PRINCIPAL_FIELDS = ("id", "email", "role", "entidad", "entidad_perm", "entidad_auditor", "token_version")
+
+
+class PrincipalCache:
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._data: "OrderedDict[int, tuple[float, dict]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    def get(self, uid: int) -> Optional[dict]:
+        with self._lock:
+            entry = self._data.get(uid)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[uid]
+                self.misses += 1
+                return None
+            self._data.move_to_end(uid)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, uid: int, snapshot: dict) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._data[uid] = (time.monotonic() + self.ttl_seconds, snapshot)
+            self._data.move_to_end(uid)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def invalidate(self, uid: int) -> None:
+        with self._lock:
+            self._data.pop(uid, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._data),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 4) if total else None,
+            }
+
+
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_MAX_ENTRIES, PRINCIPAL_CACHE_TTL_SECONDS)
+token_version_cache = PrincipalCache(PRINCIPAL_CACHE_MAX_ENTRIES, TOKEN_VERSION_CACHE_TTL_SECONDS)
+
+
+def invalidate_user(uid: int) -> None:
+    """Quita al usuario de ambas cachés de este worker."""
+    principal_cache.invalidate(uid)
+    token_version_cache.invalidate(uid)
+
+
+def load_principal(db: Session, uid: int) -> Optional[models.User]:
+    """Devuelve el principal para `uid` (desde caché o BD) o None si el usuario no existe."""
+    snapshot = principal_cache.get(uid) if principal_cache.enabled else None
+    if snapshot is None:
+        user = db.get(models.User, uid)
+        if not user:
+            return None
+        snapshot = {f: getattr(user, f) for f in PRINCIPAL_FIELDS}
+        principal_cache.put(uid, snapshot)
+    return models.User(**snapshot, hashed_password="")
+
+
+def current_token_version(db: Session, uid: int) -> Optional[int]:
+    """users.token_version de `uid` (caché o un SELECT de una columna); None si no existe."""
+    entry = token_version_cache.get(uid) if token_version_cache.enabled else None
+    if entry is None:
+        version = db.execute(
+            select(models.User.token_version).where(models.User.id == uid)
+        ).scalar_one_or_none()
+        if version is None:
+            return None
+        entry = {"token_version": version}
+        token_version_cache.put(uid, entry)
+    return entry["token_version"]
+
+
+def principal_from_claims(payload: dict) -> models.User:
+    """models.User transitorio con los claims de un access token ya verificado."""
+    return models.User(
+        id=payload["uid"],
+        email=payload.get("sub"),
+        role=models.UserRole(payload["role"]),
+        entidad=payload.get("entidad"),
+        entidad_perm=payload.get("entidad_perm"),
+        entidad_auditor=bool(payload.get("entidad_auditor")),
+        token_version=payload["tv"],
+        hashed_password="",
+    )
+
+
+def resolve_principal(db: Session, payload: dict) -> Optional[models.User]:
+    """
+    Principal de un access token verificado, o None si el usuario no existe
+    (o, en modo sin estado, si el token es de una token_version anterior).
+
+    Sin AUTH_STATELESS se ignora el claim tv: el usuario sale de la BD/caché y
+    un cambio de rol o permisos se ve con el mismo token, como siempre.
+    """
+    uid = payload.get("uid")
+    token_version = payload.get("tv")
+    if AUTH_STATELESS and token_version is not None and payload.get("role"):
+        if current_token_version(db, uid) != token_version:
+            return None
+        return principal_from_claims(payload)
+    return load_principal(db, uid)
@@ -0,0 +1,105 @@
+"""
+Refresh tokens rotativos para POST /auth/refresh.
+
+El login entrega, además del access token, un refresh token de larga vida
+(REFRESH_TOKEN_EXPIRE_DAYS). Renovar el access token cuesta la verificación de
+la firma y un lookup por jti (índice único) con join a users: sin bcrypt.
+
+  - rotación: cada uso revoca el token presentado y entrega uno nuevo de la
+    misma familia (la familia = un login)
+  - reuso: si llega un token ya rotado (copiado o robado), se revoca la
+    familia completa y el cliente debe volver a loguearse
+  - reset_password y delete_user revocan todos los tokens del usuario
+"""
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app import models
+from app.config import JWT_ALGORITHM, JWT_SECRET, REFRESH_TOKEN_EXPIRE_DAYS
+from app.startup import lazy_import
+
+jose = lazy_import("jose")
+jwt = lazy_import("jose.jwt")
+
+# Claim "typ" de los refresh tokens: get_current_user los rechaza como access token
+REFRESH_TYP = "refresh"
+
+_rt = models.RefreshToken
+
+
+class RefreshInvalido(Exception):
+    """Token mal firmado, vencido, desconocido, revocado o reusado."""
+
+
+def emitir(db, user: models.User, family: Optional[str] = None) -> Tuple[str, str]:
+    """Agrega el registro a la sesión (sin commit) y devuelve (token, jti)."""
+    jti = uuid.uuid4().hex
+    expires_at = datetime.utcnow() + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS)
+    db.add(_rt(jti=jti, family=family or jti, user_id=user.id, expires_at=expires_at))
+    payload = {"typ": REFRESH_TYP, "jti": jti, "uid": user.id, "exp": expires_at}
+    return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM), jti
+
+
+async def _revocar_familia(db: AsyncSession, family: str, ahora: datetime) -> None:
+    await db.execute(
+        update(_rt).where(_rt.family == family, _rt.revoked_at.is_(None)).values(revoked_at=ahora)
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+
+async def rotar(db: AsyncSession, token: str) -> Tuple[models.User, str]:
+    """Valida `token`, lo revoca y devuelve (usuario, refresh token nuevo). Hace commit."""
+    try:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+    except jose.JWTError:
+        raise RefreshInvalido("firma o vencimiento")
+    jti = payload.get("jti")
+    if payload.get("typ") != REFRESH_TYP or not jti:
+        raise RefreshInvalido("no es un refresh token")
+
+    row = (await db.execute(
+        select(_rt, models.User).join(models.User, models.User.id == _rt.user_id).where(_rt.jti == jti)
+    )).first()
+    if row is None:
+        raise RefreshInvalido("desconocido")
+    actual, user = row
+
+    ahora = datetime.utcnow()
+    if actual.revoked_at is not None:
+        await _revocar_familia(db, actual.family, ahora)
+        raise RefreshInvalido("reusado")
+    if actual.expires_at <= ahora:
+        raise RefreshInvalido("vencido")
+
+    nuevo, nuevo_jti = emitir(db, user, actual.family)
+    # Condicional: si otra petición ya lo rotó, esto no afecta filas (= reuso)
+    rotado = await db.execute(
+        update(_rt).where(_rt.jti == jti, _rt.revoked_at.is_(None))
+        .values(revoked_at=ahora, replaced_by=nuevo_jti)
+        .execution_options(synchronize_session=False)
+    )
+    if rotado.rowcount != 1:
+        await db.rollback()
+        await _revocar_familia(db, actual.family, ahora)
+        raise RefreshInvalido("reusado")
+    await db.commit()
+    return user, nuevo
+
+
+def revocar_usuario(db: Session, user_id: int) -> None:
+    """Revoca todos los refresh tokens vigentes del usuario (sin commit)."""
+    db.execute(
+        update(_rt).where(_rt.user_id == user_id, _rt.revoked_at.is_(None)).values(revoked_at=datetime.utcnow())
+        .execution_options(synchronize_session=False)
+    )
+
+
+def borrar_usuario(db: Session, user_id: int) -> None:
+    """Borra los tokens del usuario (SQLite no aplica ON DELETE CASCADE sin PRAGMA)."""
+    db.execute(delete(_rt).where(_rt.user_id == user_id).execution_options(synchronize_session=False))
@@ -0,0 +1,91 @@
+"""
+Catálogo en proceso de reportes agrupados por entidad (GET /reports/{nombre_entidad}).
+
+La tabla reportes solo cambia con cargar_reportes y clear_reportes, así que en
+lugar de un ILIKE por request se carga una vez, se agrupa por entidad
+normalizada (models.entidad_key) y se guarda el JSON ya serializado de cada
+entidad: una lectura es un lookup en un dict.
+
+El catálogo recuerda la versión de `reportes` en table_versions con la que se
+construyó. El handler lee esa versión (la misma del ETag) y, si difiere, se
+reconstruye: todos los workers ven una carga hecha en otro en la siguiente
+lectura y el cuerpo nunca es más viejo que el ETag con el que sale.
+"""
+import json
+import threading
+from typing import Dict, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import models
+
+
+def _serializar(registros: list) -> bytes:
+    payload = {
+        "entidad": registros[0].entidad,
+        "indicadores": [
+            {"indicador": r.indicador, "criterio": r.criterio, "accion": r.accion, "insumo": r.insumo}
+            for r in registros
+            if r.indicador is not None and r.criterio is not None
+        ],
+    }
+    return json.dumps(payload, ensure_ascii=False).encode("utf-8")
+
+
+class ReporteCatalog:
+    def __init__(self):
+        self._by_key: Optional[Dict[str, bytes]] = None
+        self._version: Optional[int] = None  # versión de `reportes` al construir
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.builds = 0
+
+    def _build(self, db: Session, version: int) -> Dict[str, bytes]:
+        # Las filas se leen después que la versión: como mínimo igual de nuevas
+        grupos: Dict[str, list] = {}
+        rows = db.execute(select(models.Reporte).order_by(models.Reporte.id)).scalars()
+        for r in rows:
+            grupos.setdefault(models.entidad_key(r.entidad), []).append(r)
+        catalogo = {key: _serializar(registros) for key, registros in grupos.items()}
+        with self._lock:
+            self.builds += 1
+            # una lectura lenta con versión vieja no pisa un catálogo más nuevo
+            if self._version is None or version >= self._version:
+                self._by_key = catalogo
+                self._version = version
+        return catalogo
+
+    def get(self, db: Session, nombre_entidad: str, version: int) -> Optional[bytes]:
+        """JSON serializado de la entidad según la versión `version`, o None si no tiene reportes."""
+        with self._lock:
+            catalogo = self._by_key if self._version == version else None
+            if catalogo is not None:
+                self.hits += 1
+        if catalogo is None:
+            catalogo = self._build(db, version)
+        return catalogo.get(models.entidad_key(nombre_entidad))
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._by_key = None
+            self._version = None
+
+    def clear(self) -> None:
+        self.invalidate()
+        with self._lock:
+            self.hits = 0
+            self.builds = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "cargado": self._by_key is not None,
+                "entidades": len(self._by_key or {}),
+                "version": self._version,
+                "hits": self.hits,
+                "builds": self.builds,
+            }
+
+
+reporte_catalog = ReporteCatalog()
@@ -1,17 +1,30 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, status, Depends
-from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, UploadFile, File, HTTPException, status, Depends, Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Dict
+import anyio
+import hashlib
 import os
-import shutil
+import tempfile
 import uuid
 import pathlib
-from app.database import get_db
-from app.models import UploadedFile, User
+from app.database import get_async_db
+from app.models import EvidenceBlob, UploadedFile, User
 from app.dependencies import get_current_user
+from app.http_cache import (
+    RangeNotSatisfiable,
+    http_date,
+    if_range_allows,
+    is_not_modified,
+    parse_range,
+)
 
 MAX_UPLOAD_MB = int(os.getenv("MAX_UPLOAD_MB", "5"))
 MAX_UPLOAD_BYTES = MAX_UPLOAD_MB * 1024 * 1024
+UPLOAD_CHUNK_BYTES = 1024 * 1024
 
 ALLOWED_MIMES = {
     # Imágenes
@@ -33,22 +46,164 @@ ALLOWED_MIMES = {
 UPLOAD_DIR = os.getenv("UPLOAD_DIR", "uploads")
 EVIDENCE_SUBDIR = os.getenv("EVIDENCE_SUBDIR", "evidence")
 BASE_DIR = pathlib.Path(UPLOAD_DIR) / EVIDENCE_SUBDIR
-BASE_DIR.mkdir(parents=True, exist_ok=True)
+
+# Almacenamiento: "unique" (un archivo por subida, uuid4) o "cas"
+# (direccionado por contenido: un blob por SHA-256 con conteo de referencias)
+EVIDENCE_STORAGE = os.getenv("EVIDENCE_STORAGE", "unique").strip().lower()
+BLOBS_SUBDIR = "blobs"
 
 router = APIRouter(prefix="/files", tags=["files"])
 
 
+def ensure_storage_dirs():
+    """Crea el directorio de evidencias (lo llama el lifespan; importar el módulo no toca disco)."""
+    BASE_DIR.mkdir(parents=True, exist_ok=True)
+
+
+def _open_temp() -> tuple[int, str]:
+    ensure_storage_dirs()
+    return tempfile.mkstemp(dir=BASE_DIR, prefix=".upload-", suffix=".part")
+
+
+async def _stream_to_temp(file: UploadFile) -> tuple[pathlib.Path, int, str]:
+    """
+    Copia el cuerpo a un temporal dentro de BASE_DIR leyendo por bloques.
+    Corta con 413 en cuanto el acumulado supera MAX_UPLOAD_BYTES y calcula el
+    SHA-256 en la misma pasada; hash y escritura corren fuera del event loop.
+    Devuelve (ruta temporal, tamaño, sha256 hex).
+    """
+    fd, tmp_name = await run_in_threadpool(_open_temp)
+    tmp_path = pathlib.Path(tmp_name)
+    out = os.fdopen(fd, "wb")
+    digest = hashlib.sha256()
+    size = 0
+
+    def _write(chunk: bytes):
+        digest.update(chunk)
+        out.write(chunk)
+
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+            size += len(chunk)
+            if size > MAX_UPLOAD_BYTES:
+                raise HTTPException(
+                    status_code=413,
+                    detail=f"El archivo supera el límite de {MAX_UPLOAD_MB} MB."
+                )
+            await run_in_threadpool(_write, chunk)
+        await run_in_threadpool(out.close)
+    except HTTPException:
+        out.close()
+        await run_in_threadpool(tmp_path.unlink, missing_ok=True)
+        raise
+    except Exception as e:
+        out.close()
+        await run_in_threadpool(tmp_path.unlink, missing_ok=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error al guardar el archivo: {str(e)}"
+        )
+    return tmp_path, size, digest.hexdigest()
+
+
+# Concurrencia en modo cas: todo cambio en disco de un blob existente se hace con
+# su fila bloqueada (el UPDATE de ref_count en PostgreSQL, FOR UPDATE explícito al
+# borrar; en SQLite el lock de escritura de la BD) y el lock dura hasta el commit.
+# Al borrar, el blob huérfano se renombra a una lápida antes del commit y la
+# lápida se elimina después: una subida que llega tras el commit ya no ve la
+# fila, publica un blob nuevo en la ruta y nada lo toca.
+
+def _lock_blob(sha256: str):
+    return select(EvidenceBlob.sha256).where(EvidenceBlob.sha256 == sha256).with_for_update()
+
+
+def _to_tombstone(path: pathlib.Path) -> pathlib.Path | None:
+    """Mueve `path` a un nombre único en el mismo directorio; None si no existía."""
+    tombstone = path.with_name(f".{path.name}.{uuid.uuid4().hex}.deleted")
+    try:
+        os.replace(path, tombstone)
+    except FileNotFoundError:
+        return None
+    return tombstone
+
+
+def _discard(path: pathlib.Path) -> None:
+    """Borrado en disco tras el commit (archivo propio o lápida de un blob)."""
+    path.unlink(missing_ok=True)
+
+
+async def _acquire_blob(db: AsyncSession, tmp_path: pathlib.Path, sha256: str, size: int) -> tuple[str, bool]:
+    """
+    Suma una referencia al blob `sha256`, creándolo a partir del temporal si no existe.
+    Deja el cambio pendiente en la sesión (el commit lo hace quien registra el archivo);
+    la fila queda bloqueada hasta ese commit.
+    Devuelve (ruta del blob relativa a BASE_DIR, si el blob es nuevo).
+    """
+    blob_name = f"{BLOBS_SUBDIR}/{sha256[:2]}/{sha256}"
+    blob_path = BASE_DIR / blob_name
+    add_ref = (
+        update(EvidenceBlob)
+        .where(EvidenceBlob.sha256 == sha256)
+        .values(ref_count=EvidenceBlob.ref_count + 1)
+    )
+
+    while True:
+        if (await db.execute(add_ref)).rowcount:
+            # Ya existe (fila bloqueada: ningún borrado puede mover el blob en medio).
+            # La subida repetida no ocupa disco, salvo que el blob se haya perdido
+            if await run_in_threadpool(blob_path.exists):
+                await run_in_threadpool(tmp_path.unlink, missing_ok=True)
+            else:
+                await run_in_threadpool(os.replace, tmp_path, blob_path)
+            return blob_name, False
+
+        # La fila se inserta antes de tocar el disco: solo quien la crea publica el blob
+        db.add(EvidenceBlob(sha256=sha256, stored_filename=blob_name, file_size=size, ref_count=1))
+        try:
+            await db.flush()
+        except IntegrityError:
+            # Otra subida concurrente creó el mismo blob: reintentar sumando la referencia
+            await db.rollback()
+            continue
+        await run_in_threadpool(blob_path.parent.mkdir, parents=True, exist_ok=True)
+        await run_in_threadpool(os.replace, tmp_path, blob_path)
+        return blob_name, True
+
+
+async def _release_blob(db: AsyncSession, sha256: str) -> bool:
+    """
+    Resta una referencia al blob con su fila bloqueada. Con el lock tomado vuelve
+    a contar los uploaded_files que lo usan (el borrado del archivo ya debe estar
+    en flush): si no queda ninguno borra la fila y devuelve True (huérfano).
+    """
+    await db.execute(_lock_blob(sha256))
+    await db.execute(
+        update(EvidenceBlob)
+        .where(EvidenceBlob.sha256 == sha256)
+        .values(ref_count=EvidenceBlob.ref_count - 1)
+    )
+    refs = await db.scalar(
+        select(func.count()).select_from(UploadedFile).where(UploadedFile.blob_sha256 == sha256)
+    )
+    if refs:
+        # ref_count desfasado (p. ej. una baja previa a medias): manda el conteo real
+        await db.execute(update(EvidenceBlob).where(EvidenceBlob.sha256 == sha256).values(ref_count=refs))
+        return False
+    res = await db.execute(delete(EvidenceBlob).where(EvidenceBlob.sha256 == sha256))
+    return bool(res.rowcount)
+
+
 @router.post("/upload/", status_code=status.HTTP_201_CREATED)
 @router.post("/upload", status_code=status.HTTP_201_CREATED)
 async def upload_evidence(
     file: UploadFile = File(...),
     description: str = "",
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
-) -> Dict[str, str | int]:
+) -> Dict[str, str | int | bool]:
     """
     Sube un archivo al servidor. Almacena el archivo en el filesystem 
-    y registra metadatos en PostgreSQL.
+    y registra metadatos en PostgreSQL (sesión async, no bloquea el event loop).
     """
     
     # 1) Validación de tipo MIME
@@ -58,37 +213,33 @@ async def upload_evidence(
             detail="Formatos permitidos: imágenes (JPG, PNG, GIF), PDF, Excel (XLS/XLSX/CSV) y comprimidos (ZIP, RAR, 7Z)",
         )
     
-    # 2) Validar tamaño
-    try:
-        file.file.seek(0, os.SEEK_END)
-        size = file.file.tell()
-        file.file.seek(0)
-    except Exception:
-        size = 0
-        
-    if size and size > MAX_UPLOAD_BYTES:
-        raise HTTPException(
-            status_code=413,
-            detail=f"El archivo supera el límite de {MAX_UPLOAD_MB} MB."
-        )    
-
-    # 3) Sanitizar nombre y generar nombre único
+    # 2) Sanitizar nombre y generar nombre único
     original_name = pathlib.Path(file.filename or "evidence").name.replace("..", ".")
     unique_name = f"{uuid.uuid4().hex}_{original_name}"
     file_id = str(uuid.uuid4())  # ID único para la BD
-    dest_path = BASE_DIR / unique_name
-    
-    # 4) Guardar archivo en filesystem
+
+    # 3) Leer por bloques: límite de tamaño + SHA-256 + escritura a temporal en una sola pasada
     try:
-        with dest_path.open("wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        tmp_path, size, sha256 = await _stream_to_temp(file)
+    finally:
+        await file.close()
+
+    # 4) Publicar el archivo: blob compartido (cas) o rename atómico a un nombre único
+    blob_sha256 = None
+    new_blob = False
+    try:
+        if EVIDENCE_STORAGE == "cas":
+            unique_name, new_blob = await _acquire_blob(db, tmp_path, sha256, size)
+            blob_sha256 = sha256
+        else:
+            await run_in_threadpool(os.replace, tmp_path, BASE_DIR / unique_name)
     except Exception as e:
+        await run_in_threadpool(tmp_path.unlink, missing_ok=True)
         raise HTTPException(
             status_code=500,
             detail=f"Error al guardar el archivo: {str(e)}"
         )
-    finally:
-        await file.close()
+    dest_path = BASE_DIR / unique_name
 
     # 5) Registrar en PostgreSQL
     try:
@@ -101,18 +252,22 @@ async def upload_evidence(
             file_path=relative_path,
             content_type=file.content_type,
             file_size=size,
+            sha256=sha256,
+            blob_sha256=blob_sha256,
             uploaded_by_id=current_user.id,
             description=description,
         )
         db.add(db_file)
-        db.commit()
-        db.refresh(db_file)
+        await db.commit()
     except Exception as e:
-        # Si hay error en BD, eliminar el archivo que acabamos de guardar
-        try:
-            dest_path.unlink()
-        except:
-            pass
+        # Si hay error en BD, eliminar el archivo que acabamos de guardar (nunca un blob compartido).
+        # Un blob nuevo se borra antes del rollback, mientras su fila sigue bloqueada
+        if blob_sha256 is None or new_blob:
+            try:
+                await run_in_threadpool(dest_path.unlink)
+            except:
+                pass
+        await db.rollback()
         raise HTTPException(
             status_code=500,
             detail=f"Error al registrar el archivo en la base de datos: {str(e)}"
@@ -124,21 +279,85 @@ async def upload_evidence(
         "stored_filename": unique_name,
         "content_type": file.content_type,
         "file_size": size,
+        "sha256": sha256,
+        "deduplicated": blob_sha256 is not None and not new_blob,
         "download_url": f"/files/download/{file_id}",
     }
 
 
+async def _iter_file_range(path: pathlib.Path, start: int, end: int):
+    async with await anyio.open_file(path, "rb") as f:
+        await f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = await f.read(min(UPLOAD_CHUNK_BYTES, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def _partial_response(
+    path: pathlib.Path,
+    ranges: list[tuple[int, int]],
+    size: int,
+    content_type: str,
+    headers: dict,
+) -> StreamingResponse:
+    """206 Partial Content: un rango directo o varios como multipart/byteranges."""
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        return StreamingResponse(
+            _iter_file_range(path, start, end),
+            status_code=206,
+            media_type=content_type,
+            headers={
+                **headers,
+                "Content-Range": f"bytes {start}-{end}/{size}",
+                "Content-Length": str(end - start + 1),
+            },
+        )
+
+    boundary = uuid.uuid4().hex
+    part_headers = [
+        (
+            f"--{boundary}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{size}\r\n\r\n"
+        ).encode()
+        for start, end in ranges
+    ]
+    closing = f"--{boundary}--\r\n".encode()
+    length = sum(len(h) + (end - start + 1) + 2 for h, (start, end) in zip(part_headers, ranges)) + len(closing)
+
+    async def _body():
+        for head, (start, end) in zip(part_headers, ranges):
+            yield head
+            async for chunk in _iter_file_range(path, start, end):
+                yield chunk
+            yield b"\r\n"
+        yield closing
+
+    return StreamingResponse(
+        _body(),
+        status_code=206,
+        media_type=f"multipart/byteranges; boundary={boundary}",
+        headers={**headers, "Content-Length": str(length)},
+    )
+
+
 @router.get("/download/{file_id}")
 async def download_file(
     file_id: str,
-    db: Session = Depends(get_db),
-) -> FileResponse:
+    request: Request,
+    db: AsyncSession = Depends(get_async_db),
+) -> Response:
     """
     Descarga un archivo previamente subido usando su file_id.
+    Soporta ETag / Last-Modified (304) y Range (206, uno o varios rangos).
     """
     
     # 1) Buscar en BD
-    db_file = db.query(UploadedFile).filter(UploadedFile.file_id == file_id).first()
+    db_file = await db.scalar(select(UploadedFile).where(UploadedFile.file_id == file_id))
     if not db_file:
         raise HTTPException(
             status_code=404,
@@ -149,24 +368,49 @@ async def download_file(
     file_path = BASE_DIR / db_file.stored_filename
     
     # 3) Verificar que el archivo existe
-    if not file_path.exists():
+    try:
+        st = await run_in_threadpool(file_path.stat)
+    except FileNotFoundError:
         raise HTTPException(
             status_code=404,
             detail="El archivo no existe en el servidor"
         )
+
+    # 4) Validadores: ETag fuerte desde el SHA-256 (o tamaño+mtime en archivos antiguos)
+    etag = f'"{db_file.sha256}"' if db_file.sha256 else f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(st.st_mtime),
+        "Accept-Ranges": "bytes",
+    }
+    if is_not_modified(request, etag, st.st_mtime):
+        return Response(status_code=304, headers=headers)
+
+    # 5) Rangos (se ignoran si If-Range no coincide)
+    if if_range_allows(request, etag, st.st_mtime):
+        try:
+            ranges = parse_range(request.headers.get("range"), st.st_size)
+        except RangeNotSatisfiable:
+            return Response(
+                status_code=416,
+                headers={**headers, "Content-Range": f"bytes */{st.st_size}"},
+            )
+        if ranges:
+            return _partial_response(file_path, ranges, st.st_size, db_file.content_type, headers)
     
-    # 4) Servir el archivo
+    # 6) Servir el archivo completo
     return FileResponse(
         path=file_path,
         media_type=db_file.content_type,
         filename=db_file.original_filename,
+        headers=headers,
     )
 
 
 @router.delete("/delete/{file_id}")
 async def delete_file(
     file_id: str,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     current_user: User = Depends(get_current_user),
 ) -> Dict[str, str]:
     """
@@ -175,7 +419,7 @@ async def delete_file(
     """
     
     # 1) Buscar en BD
-    db_file = db.query(UploadedFile).filter(UploadedFile.file_id == file_id).first()
+    db_file = await db.scalar(select(UploadedFile).where(UploadedFile.file_id == file_id))
     if not db_file:
         raise HTTPException(
             status_code=404,
@@ -189,24 +433,33 @@ async def delete_file(
             detail="No tienes permiso para eliminar este archivo"
         )
     
-    # 3) Eliminar archivo del filesystem
+    # 3) Eliminar registro de BD (y soltar la referencia al blob si es direccionado por contenido)
     file_path = BASE_DIR / db_file.stored_filename
+    blob_sha256 = db_file.blob_sha256
+    tombstone = None
     try:
-        if file_path.exists():
-            file_path.unlink()
+        await db.delete(db_file)
+        await db.flush()
+        remove_from_disk = await _release_blob(db, blob_sha256) if blob_sha256 else True
+        if blob_sha256 and remove_from_disk:
+            # Con la fila del blob aún bloqueada: se saca de su ruta antes del commit
+            tombstone = await run_in_threadpool(_to_tombstone, file_path)
+        await db.commit()
     except Exception as e:
-        # Log pero no fallar si el archivo ya no existe en disco
-        print(f"Advertencia: No se pudo eliminar archivo en disco: {e}")
-    
-    # 4) Eliminar registro de BD
-    try:
-        db.delete(db_file)
-        db.commit()
-    except Exception as e:
-        db.rollback()
+        await db.rollback()
+        if tombstone is not None:
+            await run_in_threadpool(os.replace, tombstone, file_path)
         raise HTTPException(
             status_code=500,
             detail=f"Error al eliminar de la base de datos: {str(e)}"
         )
+
+    # 4) Eliminar del filesystem (un blob solo cuando se fue su última referencia, vía su lápida)
+    if remove_from_disk:
+        try:
+            await run_in_threadpool(_discard, tombstone or file_path)
+        except Exception as e:
+            # Log pero no fallar si el archivo ya no existe en disco
+            print(f"Advertencia: No se pudo eliminar archivo en disco: {e}")
     
     return {"message": "Archivo eliminado exitosamente"}
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Literal, Optional
 from app.database import get_db
-from app import models, schemas
+from app import models, schemas, table_versions as tv
 from app.auth import get_current_user, require_roles
+from app.bulk import bulk_insert
+from app.export import export_format, streaming_export
 
 router = APIRouter(prefix="/habilidades", tags=["habilidades"])
 
@@ -11,13 +14,94 @@ router = APIRouter(prefix="/habilidades", tags=["habilidades"])
 @router.get("")
 @router.get("/")
 def get_all_habilidades(
+    request: Request,
+    response: Response,
+    format: Optional[Literal["json", "ndjson", "csv"]] = Query(
+        None, description="ndjson/csv: exportación en streaming (también vía header Accept)"
+    ),
     db: Session = Depends(get_db),
     user: models.User = Depends(get_current_user),
 ):
+    fmt = export_format(request, format)
+    not_modified = tv.conditional_get(request, response, db, (tv.HABILIDADES,), fmt or "json")
+    if not_modified:
+        return not_modified
+    if fmt:
+        return streaming_export(db, models.Habilidad.__table__, fmt, "habilidades", headers=response.headers)
     habilidades = db.query(models.Habilidad).all()
     return habilidades
 
 
+# Porcentajes se promedian y capacitados se suman al agregar
+_PCT = ("pct_habilidades_tecnicas", "pct_habilidades_socioemocionales")
+_NUM = ("num_capacitados_tecnicas", "num_capacitados_socioemocionales")
+
+
+def _serie(rows) -> List[dict]:
+    serie = []
+    for r in rows:
+        item = dict(r._mapping)
+        for campo in _PCT:
+            if item[campo] is not None:
+                item[campo] = round(float(item[campo]), 2)
+        serie.append(item)
+    return serie
+
+
+@router.get("/series")
+@router.get("/series/")
+def series_habilidades(
+    request: Request,
+    response: Response,
+    desde_anio: Optional[int] = Query(None, ge=1900, le=2999),
+    hasta_anio: Optional[int] = Query(None, ge=1900, le=2999),
+    id_entidad: Optional[int] = Query(None),
+    nivel: Literal["entidad", "global", "ambos"] = Query("ambos"),
+    db: Session = Depends(get_db),
+    user: models.User = Depends(get_current_user),
+):
+    """
+    Series mensuales agregadas en SQL: promedio de pct_habilidades_* y suma de
+    num_capacitados_*, por entidad y/o global.
+    """
+    if desde_anio is not None and hasta_anio is not None and desde_anio > hasta_anio:
+        raise HTTPException(status_code=400, detail="desde_anio no puede ser mayor que hasta_anio")
+    not_modified = tv.conditional_get(request, response, db, (tv.HABILIDADES,))
+    if not_modified:
+        return not_modified
+
+    H = models.Habilidad
+    filtros = []
+    if desde_anio is not None:
+        filtros.append(H.anio >= desde_anio)
+    if hasta_anio is not None:
+        filtros.append(H.anio <= hasta_anio)
+    if id_entidad is not None:
+        filtros.append(H.id_entidad == id_entidad)
+
+    metricas = [func.avg(getattr(H, c)).label(c) for c in _PCT] + \
+               [func.sum(getattr(H, c)).label(c) for c in _NUM]
+
+    resultado = {}
+    if nivel in ("entidad", "ambos"):
+        rows = (
+            db.query(H.id_entidad, func.max(H.entidad).label("entidad"), H.anio, H.mes, *metricas)
+            .filter(*filtros)
+            .group_by(H.id_entidad, H.anio, H.mes)
+            .order_by(H.id_entidad, H.anio, H.mes)
+        )
+        resultado["entidades"] = _serie(rows)
+    if nivel in ("global", "ambos"):
+        rows = (
+            db.query(H.anio, H.mes, func.count(func.distinct(H.id_entidad)).label("entidades"), *metricas)
+            .filter(*filtros)
+            .group_by(H.anio, H.mes)
+            .order_by(H.anio, H.mes)
+        )
+        resultado["global"] = _serie(rows)
+    return resultado
+
+
 @router.post("")
 @router.post("/")
 def cargar_habilidades(
@@ -25,24 +109,23 @@ def cargar_habilidades(
     db: Session = Depends(get_db),
     user: models.User = Depends(get_current_user),
 ):
-    nuevos = []
-
-    for p in payload.habilidades:
-        nuevo = models.Habilidad(
-            anio = p.anio,
-            mes = p.mes,
-            id_entidad = p.id_entidad,
-            entidad = p.entidad,
-            pct_habilidades_tecnicas = p.pct_habilidades_tecnicas,
-            num_capacitados_tecnicas = p.num_capacitados_tecnicas,
-            pct_habilidades_socioemocionales = p.pct_habilidades_socioemocionales,
-            num_capacitados_socioemocionales = p.num_capacitados_socioemocionales
-        )
-        db.add(nuevo)
-        nuevos.append(nuevo)
-
+    rows = [
+        {
+            "anio": p.anio,
+            "mes": p.mes,
+            "id_entidad": p.id_entidad,
+            "entidad": p.entidad,
+            "pct_habilidades_tecnicas": p.pct_habilidades_tecnicas,
+            "num_capacitados_tecnicas": p.num_capacitados_tecnicas,
+            "pct_habilidades_socioemocionales": p.pct_habilidades_socioemocionales,
+            "num_capacitados_socioemocionales": p.num_capacitados_socioemocionales,
+        }
+        for p in payload.habilidades
+    ]
+    resultado = bulk_insert(db, models.Habilidad.__table__, rows)
+    tv.bump(db, tv.HABILIDADES)
     db.commit()
-    return {"insertados": len(nuevos)}
+    return resultado
 
 
 @router.delete("/condicion")
@@ -77,6 +160,7 @@ def eliminar_habilidad(
         )
 
     deleted = query.delete(synchronize_session=False)
+    tv.bump(db, tv.HABILIDADES)
     db.commit()
 
     if deleted == 0:
@@ -95,5 +179,6 @@ def eliminar_todas_habilidades(
     user: models.User = Depends(get_current_user),
 ):
     db.query(models.Habilidad).delete()
+    tv.bump(db, tv.HABILIDADES)
     db.commit()
     return {"message": "Todas las habilidades han sido eliminadas exitosamente"}
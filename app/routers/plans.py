@@ -1,16 +1,22 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy.orm import Session, joinedload
-from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse
+from sqlalchemy import update
+from sqlalchemy.orm import Session, joinedload, selectinload
+from typing import List, Literal, Optional, Union
+import base64
+import json
+from collections import Counter
 from app.database import get_db
-from app import models, schemas
+from app import indicadores, models, plan_search, schemas, table_versions as tv
 from app.auth import get_current_user, require_roles
-from sqlalchemy import func
 
 router = APIRouter(prefix="/seguimiento", tags=["seguimiento"])
 
 @router.get("/indicadores_usados", response_model=List[str])
 @router.get("/indicadores_usados/", response_model=List[str])
 def indicadores_usados(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     user: models.User = Depends(get_current_user),
 ) -> List[str]:
@@ -22,55 +28,113 @@ def indicadores_usados(
     user_role = getattr(user.role, "value", user.role)
     is_entidad_auditor = user_role == "entidad" and bool(getattr(user, "entidad_auditor", False))
 
-    # Base: join Seguimiento -> PlanAccion para filtrar por entidad
-    q = (
-        db.query(models.Seguimiento.indicador)
-        .join(models.PlanAccion, models.Seguimiento.plan_id == models.PlanAccion.id)
-        .filter(
-            models.Seguimiento.indicador.isnot(None),
-            func.trim(models.Seguimiento.indicador) != "",
-        )
-    )
+    not_modified = tv.conditional_get(request, response, db, (tv.INDICADORES,), tv.user_scope(user))
+    if not_modified:
+        return not_modified
 
-    # Si el usuario tiene entidad asociada, filtramos solo sus planes
+    # Lookup en indicador_entidad (mantenida en cada escritura de seguimientos)
+    # Si el usuario tiene entidad asociada, solo los de sus planes
     if user_entidad and not is_entidad_auditor:
-        q = q.filter(
-            func.lower(models.PlanAccion.nombre_entidad) == func.lower(user_entidad)
-        )
-
-    # Distinct para no devolver duplicados
-    rows = q.distinct().all()
-    # rows es una lista de tuplas (indicador,), nos quedamos con el valor
-    return [r[0].strip() for r in rows if r[0]]
+        return indicadores.listar(db, models.entidad_key(user_entidad))
+    return indicadores.listar(db)
 
 # ---------------- PLANES (padre) ----------------
+Embed = Optional[Literal["seguimientos"]]
+EMBED_QUERY = Query(None, description="`seguimientos`: incluye los seguimientos de cada plan (una sola consulta extra)")
+
+
+def _plan_tables(embed: Embed) -> tuple:
+    # con embed la respuesta también depende de seguimiento y de users (updated_by_*)
+    return (tv.PLANES, tv.SEGUIMIENTOS, tv.USUARIOS) if embed else (tv.PLANES,)
+
+
+def _with_seguimientos(query):
+    """Carga los hijos de todos los planes de la página en un solo SELECT ... IN (+ updated_by)."""
+    return query.options(
+        selectinload(models.PlanAccion.seguimientos).joinedload(models.Seguimiento.updated_by)
+    )
+
+
+def _embedded(plans: list) -> list:
+    return [schemas.PlanConSeguimientos.model_validate(p).model_dump(mode="json") for p in plans]
+
+def _encode_cursor(plan_id: int) -> str:
+    """Cursor opaco para paginación keyset sobre (id DESC)."""
+    raw = json.dumps({"id": plan_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _decode_cursor(cursor: str) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        plan_id = json.loads(raw)["id"]
+        if not isinstance(plan_id, int):
+            raise ValueError(plan_id)
+        return plan_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Cursor inválido")
+
 @router.get("")          # <— sin slash
 @router.get("/")         # <— con slash
 def list_planes(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     user: models.User = Depends(get_current_user),
     q: Optional[str] = None,
     skip: int = 0,
     limit: int = 50,
-) -> List[schemas.PlanOut]:
+    cursor: Optional[str] = Query(
+        None,
+        description="Paginación keyset: enviar vacío para la primera página y luego el `next_cursor` recibido",
+    ),
+    embed: Embed = EMBED_QUERY,
+    search: Literal["nombre", "fts"] = Query(
+        "nombre",
+        description="nombre: `q` filtra nombre_entidad (ILIKE); fts: texto completo sobre el contenido, por relevancia",
+    ),
+) -> Union[List[schemas.PlanOut], schemas.PlanPage]:
+    not_modified = tv.conditional_get(
+        request, response, db, _plan_tables(embed), f"{tv.user_scope(user)}|{embed or ''}|{search}"
+    )
+    if not_modified:
+        return not_modified
+
     query = db.query(models.PlanAccion)
     user_role = getattr(user.role, "value", user.role)
     user_entidad = (getattr(user, "entidad", "") or "").strip()
     is_entidad_auditor = user_role == "entidad" and bool(getattr(user, "entidad_auditor", False))
 
     if user_role == "entidad" and user_entidad and not is_entidad_auditor:
-        query = query.filter(
-            func.lower(models.PlanAccion.nombre_entidad) == func.lower(user_entidad)
-        )
-    if q:
-        like = f"%{q}%"
-        query = query.filter(models.PlanAccion.nombre_entidad.ilike(like))
-    return (
-        query.order_by(models.PlanAccion.id.desc())
-        .offset(skip)
-        .limit(min(limit, 200))
-        .all()
-    )
+        query = query.filter(models.PlanAccion.nombre_entidad_key == models.entidad_key(user_entidad))
+    if q and search == "fts":
+        # En modo cursor la página sigue el orden por id (el keyset no admite ranking)
+        query = plan_search.apply(query, q, db.get_bind().dialect.name, ranked=cursor is None)
+    else:
+        if q:
+            like = f"%{q}%"
+            query = query.filter(models.PlanAccion.nombre_entidad.ilike(like))
+        query = query.order_by(models.PlanAccion.id.desc())
+
+    page_size = min(limit, 200)
+    if embed:
+        query = _with_seguimientos(query)
+
+    # Modo cursor: WHERE id < último id visto, sin OFFSET (no recorre filas descartadas)
+    if cursor is not None:
+        if cursor:
+            query = query.filter(models.PlanAccion.id < _decode_cursor(cursor))
+        rows = query.limit(page_size + 1).all()
+        items = rows[:page_size]
+        next_cursor = _encode_cursor(items[-1].id) if items and len(rows) > page_size else None
+        if embed:
+            return JSONResponse({"items": _embedded(items), "next_cursor": next_cursor}, headers=response.headers)
+        return {"items": items, "next_cursor": next_cursor}
+
+    # Modo legado skip/limit
+    rows = query.offset(skip).limit(page_size).all()
+    if embed:
+        return JSONResponse(_embedded(rows), headers=response.headers)
+    return rows
 
 @router.post("")
 @router.post("/")
@@ -86,19 +150,32 @@ def crear_plan(
         data["nombre_entidad"] = (getattr(user, "entidad", "") or "").strip()
         
     plan = models.PlanAccion(**data, created_by=user.id)
-    db.add(plan); db.commit(); db.refresh(plan)
+    db.add(plan)
+    tv.bump(db, tv.PLANES)
+    db.commit(); db.refresh(plan)
     return plan
 
 @router.get("/{plan_id}")
 @router.get("/{plan_id}/")
 def obtener_plan(
     plan_id: int,
+    request: Request,
+    response: Response,
+    embed: Embed = EMBED_QUERY,
     db: Session = Depends(get_db),
     user: models.User = Depends(get_current_user),
 ) -> schemas.PlanOut:
-    plan = db.query(models.PlanAccion).get(plan_id)
+    not_modified = tv.conditional_get(request, response, db, _plan_tables(embed), embed or "")
+    if not_modified:
+        return not_modified
+    query = db.query(models.PlanAccion)
+    if embed:
+        query = _with_seguimientos(query)
+    plan = query.get(plan_id)
     if not plan:
         raise HTTPException(status_code=404, detail="No encontrado")
+    if embed:
+        return JSONResponse(_embedded([plan])[0], headers=response.headers)
     return plan
 
 @router.put("/{plan_id}")
@@ -118,6 +195,7 @@ def actualizar_plan(
         if k == "nombre_entidad":
             continue 
         setattr(plan, k, v)
+    tv.bump(db, tv.PLANES)
     db.commit(); db.refresh(plan)
     return plan
 
@@ -132,6 +210,7 @@ def enviar_revision(
     if not plan:
         raise HTTPException(status_code=404, detail="No encontrado")
     plan.estado = "En revisión"
+    tv.bump(db, tv.PLANES)
     db.commit(); db.refresh(plan)
     return plan
 
@@ -148,6 +227,7 @@ def agregar_observacion(
         raise HTTPException(status_code=404, detail="No encontrado")
     plan.observacion_calidad = (payload.get("observacion") or "").strip()
     plan.estado = "Observado"
+    tv.bump(db, tv.PLANES)
     db.commit(); db.refresh(plan)
     return plan
 
@@ -163,9 +243,55 @@ def cambiar_estado(
     if not plan:
         raise HTTPException(status_code=404, detail="No encontrado")
     plan.estado = estado
+    tv.bump(db, tv.PLANES)
     db.commit(); db.refresh(plan)
     return plan
 
+@router.post("/estado/bulk")
+@router.post("/estado/bulk/")
+def cambiar_estado_bulk(
+    payload: schemas.PlanEstadoBulk,
+    db: Session = Depends(get_db),
+    user: models.User = Depends(require_roles("auditor", "admin")),
+) -> schemas.PlanEstadoBulkResultado:
+    """
+    Cambia el estado (y opcionalmente observacion_calidad) de muchos planes en un
+    solo UPDATE ... RETURNING. Por ids o por entidad; devuelve el resultado por id.
+    """
+    if (payload.ids is None) == (payload.nombre_entidad is None):
+        raise HTTPException(status_code=400, detail="Enviar ids o nombre_entidad (solo uno)")
+
+    tabla = models.PlanAccion.__table__
+    valores = {"estado": payload.estado}
+    if payload.observacion_calidad is not None:
+        valores["observacion_calidad"] = payload.observacion_calidad.strip()
+
+    if payload.ids is not None:
+        ids = list(dict.fromkeys(payload.ids))
+        if not ids:
+            return schemas.PlanEstadoBulkResultado(actualizados=0, resultados=[])
+        filtro = tabla.c.id.in_(ids)
+    else:
+        ids = None
+        filtro = tabla.c.nombre_entidad_key == models.entidad_key(payload.nombre_entidad)
+
+    filas = db.execute(
+        update(tabla).where(filtro).values(**valores).returning(tabla.c.id, tabla.c.estado)
+    ).all()
+    if filas:
+        tv.bump(db, tv.PLANES)
+    db.commit()
+
+    hechos = {fila.id: fila.estado for fila in filas}
+    if ids is None:
+        ids = sorted(hechos)
+    resultados = [
+        schemas.PlanEstadoResultado(id=i, ok=True, estado=hechos[i]) if i in hechos
+        else schemas.PlanEstadoResultado(id=i, ok=False, detail="No encontrado")
+        for i in ids
+    ]
+    return schemas.PlanEstadoBulkResultado(actualizados=len(filas), resultados=resultados)
+
 @router.delete("/{plan_id}")
 @router.delete("/{plan_id}/")
 def eliminar_plan(
@@ -176,7 +302,14 @@ def eliminar_plan(
     plan = db.query(models.PlanAccion).get(plan_id)
     if not plan:
         raise HTTPException(status_code=404, detail="No encontrado")
+    # Descontar los indicadores de sus seguimientos antes de borrarlos
+    usados = Counter(
+        indicadores.normalizar(i)
+        for (i,) in db.query(models.Seguimiento.indicador).filter(models.Seguimiento.plan_id == plan_id)
+    )
+    indicadores.ajustar(db, plan, Counter({i: -n for i, n in usados.items()}))
     db.query(models.Seguimiento).filter(models.Seguimiento.plan_id == plan_id).delete()
+    tv.bump(db, tv.PLANES, tv.SEGUIMIENTOS)
     db.delete(plan); db.commit()
     return {"ok": True}
 
@@ -189,9 +322,15 @@ def _assert_access(plan: models.PlanAccion, user: models.User, *, write: bool =
 @router.get("/{plan_id}/seguimiento/", response_model=List[schemas.SeguimientoOut])
 def listar_seguimientos(
     plan_id: int,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     user: models.User = Depends(get_current_user),
 ) -> List[schemas.SeguimientoOut]:
+    # updated_by_email/entidad salen de users
+    not_modified = tv.conditional_get(request, response, db, (tv.PLANES, tv.SEGUIMIENTOS, tv.USUARIOS))
+    if not_modified:
+        return not_modified
     plan = db.query(models.PlanAccion).get(plan_id)
     if not plan:
         raise HTTPException(status_code=404, detail="Plan no encontrado")
@@ -239,11 +378,103 @@ def crear_seguimiento(
     seg = models.Seguimiento(**data, plan_id=plan.id)
     seg.updated_by_id = user.id
     db.add(seg)
+    indicadores.cambio(db, plan, None, seg.indicador)
+    tv.bump(db, tv.PLANES, tv.SEGUIMIENTOS)
 
     db.commit()
     db.refresh(seg)
     return seg
 
+# Declarada antes de /{seg_id} para que "bulk" no se tome como id
+@router.put("/{plan_id}/seguimiento/bulk", response_model=List[schemas.SeguimientoOut])
+@router.put("/{plan_id}/seguimiento/bulk/", response_model=List[schemas.SeguimientoOut])
+def guardar_seguimientos(
+    plan_id: int,
+    payload: schemas.SeguimientoBulk,
+    db: Session = Depends(get_db),
+    user: models.User = Depends(get_current_user),
+) -> List[schemas.SeguimientoOut]:
+    """
+    Crea, actualiza y elimina seguimientos del plan en una sola transacción.
+    Mismas reglas que crear/actualizar/eliminar seguimiento; el plan se carga una
+    vez y su indicador/criterio quedan con el último valor no vacío del lote.
+    Devuelve todos los seguimientos del plan.
+    """
+    plan = db.query(models.PlanAccion).get(plan_id)
+    if not plan:
+        raise HTTPException(status_code=404, detail="Plan no encontrado")
+    _assert_access(plan, user)
+
+    existentes = {
+        s.id: s
+        for s in db.query(models.Seguimiento).filter(models.Seguimiento.plan_id == plan.id)
+    }
+    ids_guardar = [item.id for item in payload.guardar if item.id is not None]
+    for seg_id in (*ids_guardar, *payload.eliminar):
+        if seg_id not in existentes:
+            raise HTTPException(status_code=404, detail=f"Seguimiento no encontrado: {seg_id}")
+    if set(ids_guardar) & set(payload.eliminar):
+        raise HTTPException(status_code=400, detail="Un seguimiento no puede guardarse y eliminarse a la vez")
+
+    user_role = getattr(user.role, "value", user.role)
+    is_entidad_auditor = user_role == "entidad" and bool(getattr(user, "entidad_auditor", False))
+
+    deltas: Counter = Counter()
+    indicador_plan = criterio_plan = None
+    for item in payload.guardar:
+        data = item.model_dump(exclude_unset=True)
+        data.pop("id", None)
+
+        indicador_val = (data.get("indicador") or "").strip()
+        if indicador_val:
+            indicador_plan = indicador_val
+        criterio_val = (data.pop("criterio", None) or "").strip()
+        if criterio_val:
+            criterio_plan = criterio_val
+
+        if item.id is None:
+            for k in ("fecha_inicio", "fecha_final"):
+                if k in data and not data[k]:
+                    data[k] = None
+            seg = models.Seguimiento(**data, plan_id=plan.id)
+            db.add(seg)
+            indicador_antes = None
+        else:
+            if user_role == "entidad" and not is_entidad_auditor:
+                data.pop("observacion_calidad", None)
+            if "enlace_entidad" in data:
+                plan.enlace_entidad = data["enlace_entidad"]
+            seg = existentes[item.id]
+            indicador_antes = seg.indicador
+            for k, v in data.items():
+                setattr(seg, k, v)
+        seg.updated_by_id = user.id
+
+        deltas[indicadores.normalizar(indicador_antes)] -= 1
+        deltas[indicadores.normalizar(seg.indicador)] += 1
+
+    for seg_id in payload.eliminar:
+        seg = existentes[seg_id]
+        deltas[indicadores.normalizar(seg.indicador)] -= 1
+        db.delete(seg)
+
+    if indicador_plan:
+        plan.indicador = indicador_plan
+    if criterio_plan:
+        plan.criterio = criterio_plan
+
+    indicadores.ajustar(db, plan, deltas)
+    tv.bump(db, tv.PLANES, tv.SEGUIMIENTOS)
+    db.commit()
+
+    return (
+        db.query(models.Seguimiento)
+        .options(joinedload(models.Seguimiento.updated_by))
+        .filter(models.Seguimiento.plan_id == plan.id)
+        .order_by(models.Seguimiento.id.asc())
+        .all()
+    )
+
 @router.put("/{plan_id}/seguimiento/{seg_id}", response_model=schemas.SeguimientoOut)
 @router.put("/{plan_id}/seguimiento/{seg_id}/", response_model=schemas.SeguimientoOut)
 def actualizar_seguimiento(
@@ -284,10 +515,13 @@ def actualizar_seguimiento(
         plan.criterio = criterio_val
 
     # Ahora sí, solo los campos válidos para Seguimiento
+    indicador_antes = seg.indicador
     for k, v in data.items():
         setattr(seg, k, v)
+    indicadores.cambio(db, plan, indicador_antes, seg.indicador)
 
     seg.updated_by_id = user.id
+    tv.bump(db, tv.PLANES, tv.SEGUIMIENTOS)
     db.commit()
     db.refresh(seg)
 
@@ -310,5 +544,7 @@ def eliminar_seguimiento(
     if not seg or seg.plan_id != plan.id:
         raise HTTPException(status_code=404, detail="Seguimiento no encontrado")
 
+    indicadores.cambio(db, plan, seg.indicador, None)
+    tv.bump(db, tv.SEGUIMIENTOS)
     db.delete(seg); db.commit()
     return {"ok": True}
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Literal, Optional
 from app.database import get_db
-from app import models, schemas
+from app import models, schemas, table_versions as tv
 from app.auth import get_current_user, require_roles
+from app import pqrd_stats
+from app.bulk import bulk_insert
+from app.export import export_format, streaming_export
 
 router = APIRouter(prefix="/pqrds", tags=["pqrds"])
 
@@ -11,9 +14,20 @@ router = APIRouter(prefix="/pqrds", tags=["pqrds"])
 @router.get("")
 @router.get("/")
 def get_all_pqrds(
+    request: Request,
+    response: Response,
+    format: Optional[Literal["json", "ndjson", "csv"]] = Query(
+        None, description="ndjson/csv: exportación en streaming (también vía header Accept)"
+    ),
     db: Session = Depends(get_db),
     user: models.User = Depends(get_current_user),
 ):
+    fmt = export_format(request, format)
+    not_modified = tv.conditional_get(request, response, db, (tv.PQRDS,), fmt or "json")
+    if not_modified:
+        return not_modified
+    if fmt:
+        return streaming_export(db, models.PQRD.__table__, fmt, "pqrds", headers=response.headers)
     pqrds = db.query(models.PQRD).all()
     return pqrds
 
@@ -21,20 +35,59 @@ def get_all_pqrds(
 @router.get("/count")
 @router.get("/count/")
 def count_pqrds(
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     user: models.User = Depends(get_current_user),
 ):
+    not_modified = tv.conditional_get(request, response, db, (tv.PQRDS,))
+    if not_modified:
+        return not_modified
     total = db.query(models.PQRD).count()
     return total
 
 
+@router.get("/stats")
+@router.get("/stats/")
+def pqrds_stats(
+    request: Request,
+    response: Response,
+    group_by: str = Query(
+        "", description="Campos separados por coma: entidad, tipo_gestion, dependencia"
+    ),
+    period: Literal["month", "year", "all"] = Query("month", description="Agrupación temporal por fecha_ingreso"),
+    desde: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="Mes inicial YYYY-MM"),
+    hasta: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$", description="Mes final YYYY-MM"),
+    db: Session = Depends(get_db),
+    user: models.User = Depends(get_current_user),
+):
+    """Conteos agregados servidos desde la tabla resumen (no recorre pqrds)."""
+    campos = [c.strip() for c in group_by.split(",") if c.strip()]
+    invalidos = [c for c in campos if c not in pqrd_stats.GROUP_FIELDS]
+    if invalidos:
+        raise HTTPException(
+            status_code=400,
+            detail=f"group_by inválido: {', '.join(invalidos)} (permitidos: {', '.join(pqrd_stats.GROUP_FIELDS)})",
+        )
+    # pqrd_resumen cambia en las mismas escrituras que pqrds
+    not_modified = tv.conditional_get(request, response, db, (tv.PQRDS,))
+    if not_modified:
+        return not_modified
+    return pqrd_stats.consultar(db, list(dict.fromkeys(campos)), period, desde, hasta)
+
+
 @router.get("/by/{label_pqrd}")
 @router.get("/by/{label_pqrd}/")
 def get_pqrd_by_label(
     label_pqrd: str,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     user: models.User = Depends(get_current_user),
 ):
+    not_modified = tv.conditional_get(request, response, db, (tv.PQRDS,))
+    if not_modified:
+        return not_modified
     pqrd = db.query(models.PQRD).filter(models.PQRD.label == label_pqrd).first()
 
     if not pqrd:
@@ -43,6 +96,34 @@ def get_pqrd_by_label(
     return pqrd
 
 
+@router.post("/by_labels", response_model=schemas.PqrdLabelsResultado)
+@router.post("/by_labels/", response_model=schemas.PqrdLabelsResultado)
+def get_pqrds_by_labels(
+    payload: schemas.PqrdLabels,
+    db: Session = Depends(get_db),
+    user: models.User = Depends(get_current_user),
+):
+    """
+    Resuelve muchos labels con una sola consulta IN sobre el índice de label.
+    Como /by/{label}, devuelve la primera PQRD (menor id) de cada label.
+    """
+    labels = list(dict.fromkeys(payload.labels))
+    encontrados = {}
+    if labels:
+        rows = (
+            db.query(models.PQRD)
+            .filter(models.PQRD.label.in_(labels))
+            .order_by(models.PQRD.id)
+            .all()
+        )
+        for pqrd in rows:
+            encontrados.setdefault(pqrd.label, pqrd)
+    return {
+        "encontrados": [encontrados[l] for l in labels if l in encontrados],
+        "faltantes": [l for l in labels if l not in encontrados],
+    }
+
+
 @router.post("")
 @router.post("/")
 def cargar_pqrds(
@@ -50,22 +131,22 @@ def cargar_pqrds(
     db: Session = Depends(get_db),
     user: models.User = Depends(get_current_user),
 ):
-    nuevos = []
-
-    for p in payload.pqrds:
-        nuevo = models.PQRD(
-            label=p.label,
-            tipo_gestion=p.tipo_gestion if p.tipo_gestion else None,
-            dependencia=p.dependencia if p.dependencia else None,
-            entidad=p.entidad if p.entidad else None,
-            fecha_ingreso=p.fecha_ingreso if p.fecha_ingreso else None,
-            periodo=p.periodo if p.periodo else None
-        )
-        db.add(nuevo)
-        nuevos.append(nuevo)
-
+    rows = [
+        {
+            "label": p.label,
+            "tipo_gestion": p.tipo_gestion if p.tipo_gestion else None,
+            "dependencia": p.dependencia if p.dependencia else None,
+            "entidad": p.entidad if p.entidad else None,
+            "fecha_ingreso": p.fecha_ingreso if p.fecha_ingreso else None,
+            "periodo": p.periodo if p.periodo else None,
+        }
+        for p in payload.pqrds
+    ]
+    resultado = bulk_insert(db, models.PQRD.__table__, rows)
+    pqrd_stats.acumular(db, rows)
+    tv.bump(db, tv.PQRDS)
     db.commit()
-    return {"insertados": len(nuevos)}
+    return resultado
 
 
 @router.delete("")
@@ -77,5 +158,7 @@ def delete_all_pqrds(
     require_roles(user, ["admin"])
 
     deleted = db.query(models.PQRD).delete()
+    pqrd_stats.vaciar(db)
+    tv.bump(db, tv.PQRDS)
     db.commit()
     return {"eliminados": deleted}
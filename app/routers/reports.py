@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import List, Literal, Optional
 from app.database import get_db
-from app import models, schemas
+from app import models, schemas, table_versions as tv
 from app.auth import get_current_user, require_roles
+from app.bulk import bulk_insert
+from app.export import export_format, streaming_export
+from app.reporte_catalog import reporte_catalog
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
@@ -11,9 +14,20 @@ router = APIRouter(prefix="/reports", tags=["reports"])
 @router.get("")
 @router.get("/")
 def get_all_reportes(
+    request: Request,
+    response: Response,
+    format: Optional[Literal["json", "ndjson", "csv"]] = Query(
+        None, description="ndjson/csv: exportación en streaming (también vía header Accept)"
+    ),
     db: Session = Depends(get_db),
     user: models.User = Depends(get_current_user),
 ):
+    fmt = export_format(request, format)
+    not_modified = tv.conditional_get(request, response, db, (tv.REPORTES,), fmt or "json")
+    if not_modified:
+        return not_modified
+    if fmt:
+        return streaming_export(db, models.Reporte.__table__, fmt, "reportes", headers=response.headers)
     reportes = db.query(models.Reporte).all()
     return reportes
 
@@ -22,29 +36,24 @@ def get_all_reportes(
 @router.get("/{nombre_entidad}/")
 def get_reportes_por_entidad(
     nombre_entidad: str,
+    request: Request,
+    response: Response,
     db: Session = Depends(get_db),
     user: models.User = Depends(get_current_user),
 ):
-    # Buscar todos los registros para esa entidad (case-insensitive)
-    registros = (
-        db.query(models.Reporte)
-        .filter(models.Reporte.entidad.ilike(nombre_entidad))
-        .all()
-    )
+    # La misma versión sirve para el ETag y para validar el catálogo
+    vs = tv.versions(db, (tv.REPORTES,))
+    not_modified = tv.conditional_get(request, response, db, (tv.REPORTES,), vs=vs)
+    if not_modified:
+        return not_modified
 
-    if not registros:
+    # Lookup en el catálogo en memoria (clave normalizada, JSON ya serializado)
+    body = reporte_catalog.get(db, nombre_entidad, vs[tv.REPORTES])
+
+    if body is None:
         raise HTTPException(status_code=404, detail="No records found for that entity")
 
-    # Convertirlos al formato requerido
-    resultado = {
-        "entidad": registros[0].entidad,
-        "indicadores": [
-            {"indicador": r.indicador, "criterio": r.criterio, "accion": r.accion, "insumo": r.insumo}
-            for r in registros
-            if r.indicador is not None and r.criterio is not None
-        ],
-    }
-    return resultado
+    return Response(content=body, media_type="application/json", headers=response.headers)
 
 @router.post("")
 @router.post("/")
@@ -53,21 +62,20 @@ def cargar_reportes(
     db: Session = Depends(get_db),
     user: models.User = Depends(get_current_user),
 ):
-    nuevos = []
-
-    for r in payload.reportes:
-        nuevo = models.Reporte(
-            entidad=r.entidad,
-            indicador=r.indicador,
-            criterio=r.criterio,
-            accion=r.accion,
-            insumo=r.insumo
-        )
-        db.add(nuevo)
-        nuevos.append(nuevo)
-
+    rows = [
+        {
+            "entidad": r.entidad,
+            "indicador": r.indicador,
+            "criterio": r.criterio,
+            "accion": r.accion,
+            "insumo": r.insumo,
+        }
+        for r in payload.reportes
+    ]
+    resultado = bulk_insert(db, models.Reporte.__table__, rows)
+    tv.bump(db, tv.REPORTES)
     db.commit()
-    return {"insertados": len(nuevos)}
+    return resultado
 
 
 @router.delete("")
@@ -78,6 +86,7 @@ def clear_reportes(
 ):
     # Borrar todos los registros
     deleted = db.query(models.Reporte).delete()
+    tv.bump(db, tv.REPORTES)
 
     # Confirmar cambios
     db.commit()
@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends
+from app import models
+from app.auth import require_roles
+from app.database import pool_stats
+from app.passwords import password_pool
+from app.config import AUTH_STATELESS
+from app.principal_cache import principal_cache, token_version_cache
+from app.reporte_catalog import reporte_catalog
+from app.startup import startup_stats
+
+router = APIRouter(prefix="/stats", tags=["stats"])
+
+# Métricas operativas en proceso (por worker), solo admin
+
+@router.get("/auth_cache")
+@router.get("/auth_cache/")
+def auth_cache_stats(user: models.User = Depends(require_roles("admin"))):
+    """Aciertos/fallos de las cachés de get_current_user (principales y token_version)."""
+    return {
+        **principal_cache.stats(),
+        "stateless": AUTH_STATELESS,
+        "token_version": token_version_cache.stats(),
+    }
+
+
+@router.get("/pool")
+@router.get("/pool/")
+def db_pool_stats(user: models.User = Depends(require_roles("admin"))):
+    """Conexiones en uso/ociosas/overflow y tiempo de espera por checkout del pool."""
+    return pool_stats()
+
+
+@router.get("/reportes_catalog")
+@router.get("/reportes_catalog/")
+def reportes_catalog_stats(user: models.User = Depends(require_roles("admin"))):
+    """Estado del catálogo de reportes por entidad de este worker."""
+    return reporte_catalog.stats()
+
+
+@router.get("/hashing")
+@router.get("/hashing/")
+def hashing_stats(user: models.User = Depends(require_roles("admin"))):
+    """Cola y ms por operación del pool de bcrypt de este worker."""
+    return password_pool.stats()
+
+
+@router.get("/startup")
+@router.get("/startup/")
+def startup_timings(user: models.User = Depends(require_roles("admin"))):
+    """Modo de importación y milisegundos por paso del lifespan de este worker."""
+    return startup_stats()
@@ -4,12 +4,19 @@ from typing import List
 from sqlalchemy.exc import IntegrityError
 
 from app.database import get_db
-from app import models, schemas
+from app import models, refresh_tokens, schemas, table_versions as tv
 from app.dependencies import get_current_user
-from passlib.hash import bcrypt  # si ya usas otra, cámbiala
+from app.principal_cache import invalidate_user
+from app.passwords import password_pool
 
 router = APIRouter(prefix="/users", tags=["users"])
 
+
+def _revocar_tokens(u: models.User) -> None:
+    """Sube token_version: los access tokens emitidos antes dejan de valer."""
+    u.token_version = (u.token_version or 0) + 1
+
+
 @router.patch("/{user_id}/password/", status_code=204)
 @router.patch("/{user_id}/password", status_code=204)
 def reset_password(
@@ -25,8 +32,12 @@ def reset_password(
     if not u:
         raise HTTPException(404, "User not found")
     # Permitimos que el admin cambie la suya o de otros
-    u.hashed_password = bcrypt.hash(payload.new_password)
+    u.hashed_password = password_pool.hash_sync(payload.new_password)
+    # Las sesiones abiertas con la clave anterior no pueden renovarse
+    refresh_tokens.revocar_usuario(db, u.id)
+    _revocar_tokens(u)
     db.commit()
+    invalidate_user(user_id)
     return Response(status_code=204)
 
 @router.delete("/{user_id}/", status_code=204)
@@ -68,7 +79,11 @@ def delete_user(user_id: int, db: Session = Depends(get_db), user=Depends(get_cu
             )
 
     try:
+        refresh_tokens.borrar_usuario(db, u.id)
+        _revocar_tokens(u)  # sin fila ya no hay token_version que coincida
         db.delete(u)
+        # seguimientos muestran email/entidad de updated_by; planes created_by
+        tv.bump(db, tv.USUARIOS, tv.PLANES, tv.SEGUIMIENTOS)
         db.commit()
     except IntegrityError:
         db.rollback()
@@ -76,6 +91,7 @@ def delete_user(user_id: int, db: Session = Depends(get_db), user=Depends(get_cu
             status_code=400,
             detail="No se pudo eliminar porque existen referencias activas a este usuario",
         )
+    invalidate_user(user_id)
     return Response(status_code=204)
 
 def _role_value(r):
@@ -117,7 +133,7 @@ def create_user(payload: schemas.UserCreate, db: Session = Depends(get_db), user
     
     if exists:
         raise HTTPException(400, "Email already exists")
-    hashed = bcrypt.hash(payload.password)
+    hashed = password_pool.hash_sync(payload.password)
 
     perm = payload.entidad_perm if payload.role == "entidad" else None
     entidad_auditor = bool(payload.entidad_auditor) if payload.role == "entidad" else False
@@ -132,12 +148,15 @@ def create_user(payload: schemas.UserCreate, db: Session = Depends(get_db), user
     )
 
     db.add(u)
+    tv.bump(db, tv.USUARIOS)
     try:
         db.commit()
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=400, detail="Email already exists")
     db.refresh(u)
+    # SQLite puede reutilizar ids de usuarios borrados
+    invalidate_user(u.id)
     return u
 
 @router.patch("/{user_id}/role/", response_model=schemas.UserOut)
@@ -168,8 +187,11 @@ def update_user_role(user_id: int, payload: schemas.UserRoleUpdate, db: Session
             u.entidad_perm = "captura_reportes"
         if u.entidad_auditor is None:
             u.entidad_auditor = False
+    _revocar_tokens(u)
+    tv.bump(db, tv.USUARIOS)
     db.commit()
     db.refresh(u)
+    invalidate_user(u.id)
     return u
 
 @router.patch("/{user_id}/perm", response_model=schemas.UserOut)
@@ -182,7 +204,10 @@ def update_entidad_perm(user_id: int, payload: schemas.EntidadPermUpdate,
         raise HTTPException(404, "User not found")
     if (getattr(u, "role", None) == "entidad") or (getattr(u, "role", None).value == "entidad"):
         u.entidad_perm = payload.entidad_perm
+        _revocar_tokens(u)
+        tv.bump(db, tv.USUARIOS)
         db.commit(); db.refresh(u)
+        invalidate_user(u.id)
         return u
     raise HTTPException(400, "Solo aplica para usuarios con rol 'entidad'")
 
@@ -196,6 +221,9 @@ def update_entidad_auditor(user_id: int, payload: schemas.EntidadAuditorUpdate,
         raise HTTPException(404, "User not found")
     if (getattr(u, "role", None) == "entidad") or (getattr(u, "role", None).value == "entidad"):
         u.entidad_auditor = bool(payload.entidad_auditor)
+        _revocar_tokens(u)
+        tv.bump(db, tv.USUARIOS)
         db.commit(); db.refresh(u)
+        invalidate_user(u.id)
         return u
     raise HTTPException(400, "Solo aplica para usuarios con rol 'entidad'")
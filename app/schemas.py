@@ -1,4 +1,4 @@
-from pydantic import BaseModel, ConfigDict, EmailStr, field_validator
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator
 from typing import Optional
 from datetime import date, datetime
 from typing_extensions import Literal
@@ -11,6 +11,10 @@ class UserPasswordReset(BaseModel):
 class TokenResponse(BaseModel):
     access_token: str
     token_type: str = "bearer"
+    refresh_token: Optional[str] = None
+
+class RefreshRequest(BaseModel):
+    refresh_token: str
 
 # ---------------- Plan (padre) ----------------
 class PlanBase(BaseModel):
@@ -43,6 +47,31 @@ class PlanOut(PlanBase):
     created_by: Optional[int] = None
     model_config = ConfigDict(from_attributes=True)
 
+class PlanPage(BaseModel):
+    items: list[PlanOut]
+    next_cursor: Optional[str] = None
+
+# Tope por petición del UPDATE ... WHERE id IN (...): acota los parámetros y cuántas filas
+# quedan bloqueadas en una sola transacción (el RETURNING las devuelve todas)
+PLAN_ESTADO_BULK_MAX = 5000
+
+class PlanEstadoBulk(BaseModel):
+    # ids o nombre_entidad (uno de los dos)
+    ids: Optional[list[int]] = Field(None, max_length=PLAN_ESTADO_BULK_MAX)
+    nombre_entidad: Optional[str] = None
+    estado: str
+    observacion_calidad: Optional[str] = None
+
+class PlanEstadoResultado(BaseModel):
+    id: int
+    ok: bool
+    estado: Optional[str] = None
+    detail: Optional[str] = None
+
+class PlanEstadoBulkResultado(BaseModel):
+    actualizados: int
+    resultados: list[PlanEstadoResultado]
+
 # ---------- Users (Admin only) ----------
 UserRoleInput = Literal["admin", "entidad", "auditor"]
 
@@ -111,6 +140,20 @@ class SeguimientoOut(SeguimientoBase):
     updated_by_entidad: Optional[str] = None  
     model_config = ConfigDict(from_attributes=True)   
 
+# Guardado de la grilla completa (PUT /seguimiento/{plan_id}/seguimiento/bulk)
+SEGUIMIENTO_BULK_MAX = 1000
+
+class SeguimientoBulkItem(SeguimientoBase):
+    id: Optional[int] = None  # sin id = crear
+
+class SeguimientoBulk(BaseModel):
+    guardar: list[SeguimientoBulkItem] = Field(default_factory=list, max_length=SEGUIMIENTO_BULK_MAX)
+    eliminar: list[int] = Field(default_factory=list, max_length=SEGUIMIENTO_BULK_MAX)
+
+# Plan con sus seguimientos anidados (?embed=seguimientos)
+class PlanConSeguimientos(PlanOut):
+    seguimientos: list[SeguimientoOut] = []
+
 
 # ---------------- Reporte (padre) ----------------
 class ReportBase(BaseModel):
@@ -152,6 +195,20 @@ class PqrdUpdate(PqrdBase):
 class PqrdEntradaLista(BaseModel):
     pqrds: list[PqrdCreate]
 
+class PqrdOut(PqrdBase):
+    id: int
+    model_config = ConfigDict(from_attributes=True)
+
+# Tope por petición: mantiene el IN por debajo del límite de parámetros de SQLite/PostgreSQL
+PQRD_LABELS_MAX = 10000
+
+class PqrdLabels(BaseModel):
+    labels: list[str] = Field(..., max_length=PQRD_LABELS_MAX)
+
+class PqrdLabelsResultado(BaseModel):
+    encontrados: list[PqrdOut]
+    faltantes: list[str]
+
 
 # --------------- Habilidades (Padre) ----------------
 class HabilidadBase(BaseModel):
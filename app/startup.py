@@ -0,0 +1,67 @@
+"""
+Arranque en frío: importación diferida de módulos pesados y tiempos del lifespan.
+
+Con LAZY_IMPORTS=true (por defecto) python-jose (+ cryptography) y passlib no se
+importan al cargar app.main sino en el primer uso (primer login / primer token),
+lo que recorta el arranque en frío de Cloud Run. Con LAZY_IMPORTS=false se
+importan en el acto, como antes.
+
+El perfil completo (import por módulo + pasos del lifespan) lo da
+tools/profile_startup.py.
+"""
+import importlib
+import os
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict
+
+LAZY_IMPORTS = os.getenv("LAZY_IMPORTS", "true").lower() == "true"
+
+# Milisegundos por paso del lifespan (se rellena al arrancar; /stats/startup)
+STARTUP_TIMINGS: Dict[str, float] = {}
+
+
+class Lazy:
+    """Proxy que construye el objeto real (módulo, contexto...) en el primer acceso a un atributo."""
+
+    def __init__(self, label: str, factory: Callable[[], Any]):
+        self._label = label
+        self._factory = factory
+        self._target = None
+        if not LAZY_IMPORTS:
+            self._load()
+
+    def _load(self):
+        if self._target is None:
+            self._target = self._factory()
+        return self._target
+
+    @property
+    def loaded(self) -> bool:
+        return self._target is not None
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        estado = "cargado" if self.loaded else "pendiente"
+        return f"<Lazy {self._label} ({estado})>"
+
+
+def lazy_import(name: str) -> Lazy:
+    """`jwt = lazy_import("jose.jwt")` en vez de `from jose import jwt`."""
+    return Lazy(name, lambda: importlib.import_module(name))
+
+
+@contextmanager
+def startup_step(name: str):
+    """Mide un paso del lifespan y lo deja en STARTUP_TIMINGS."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STARTUP_TIMINGS[name] = round((time.perf_counter() - start) * 1000, 2)
+
+
+def startup_stats() -> dict:
+    return {"lazy_imports": LAZY_IMPORTS, "pasos_ms": dict(STARTUP_TIMINGS)}
@@ -0,0 +1,129 @@
+"""
+Contadores de versión por tabla y GET condicional (ETag / If-None-Match).
+
+Cada escritura de los routers llama a bump(db, "tabla", ...) antes del commit.
+Con una Session, bump solo anota las tablas: el UPDATE de table_versions corre
+en una transacción corta propia justo después del commit (misma conexión). Así
+los writers concurrentes no quedan serializados por la fila compartida de cada
+tabla durante toda su transacción (p. ej. las cargas masivas). A cambio, la
+versión sube un instante después de los datos: quien lea en ese hueco guarda
+datos nuevos con el ETag viejo y solo pierde un 304. Si el bump fallara, el
+ETag quedaría viejo hasta la siguiente escritura de esa tabla. Con una
+Connection (herramientas, migraciones) el bump sigue en la transacción del
+llamador. Los GET calculan un ETag débil a partir de las
+versiones de las tablas de las que dependen y del alcance del usuario (rol,
+entidad) y, si coincide con If-None-Match, responden 304 con una sola consulta
+a table_versions, sin tocar las tablas de datos. Al vivir en la BD, el ETag es
+el mismo en todos los workers.
+"""
+import hashlib
+from typing import Dict, Iterable, Optional, Union
+
+import logging
+
+from fastapi import Request, Response
+from sqlalchemy import event, select
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from app import models
+from app.bulk import upsert_counts
+from app.http_cache import is_not_modified
+
+PLANES = "plan_accion"
+SEGUIMIENTOS = "seguimiento"
+USUARIOS = "users"
+REPORTES = "reportes"
+PQRDS = "pqrds"
+HABILIDADES = "habilidades"
+INDICADORES = "indicador_entidad"
+
+_tabla = models.TableVersion.__table__
+_PENDIENTES = "table_versions_pendientes"
+_CONEXION = "table_versions_conexion"
+
+log = logging.getLogger(__name__)
+
+# Revalidar siempre (no-cache) y no compartir entre usuarios (private)
+CACHE_CONTROL = "private, no-cache"
+
+
+def _upsert(conn: Connection, tables: Iterable[str]) -> None:
+    # orden fijo: dos bumps concurrentes toman las filas en el mismo orden
+    upsert_counts(conn, _tabla, ("name",), [{"name": t, "version": 1} for t in sorted(tables)], "version")
+
+
+def bump(db: Union[Session, Connection], *tables: str) -> None:
+    """
+    Session: anota `tables` y las incrementa tras el commit (ver docstring del módulo).
+    Connection: las incrementa dentro de la transacción actual.
+    """
+    if isinstance(db, Session):
+        db.info.setdefault(_PENDIENTES, set()).update(tables)
+    else:
+        _upsert(db, tables)
+
+
+@event.listens_for(Session, "after_begin")
+def _recordar_conexion(session: Session, transaction, connection: Connection) -> None:
+    session.info[_CONEXION] = connection
+
+
+@event.listens_for(Session, "after_commit")
+def _bump_tras_commit(session: Session) -> None:
+    tables = session.info.pop(_PENDIENTES, None)
+    conn = session.info.pop(_CONEXION, None)
+    if not tables or conn is None:
+        return
+    # La conexión de la sesión sigue tomada y sin transacción: sin un checkout extra del pool
+    try:
+        with conn.begin():
+            _upsert(conn, tables)
+    except Exception:
+        log.exception("No se pudo subir la versión de %s", sorted(tables))
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar(session: Session) -> None:
+    session.info.pop(_PENDIENTES, None)
+    session.info.pop(_CONEXION, None)
+
+
+def versions(db: Session, tables: Iterable[str]) -> Dict[str, int]:
+    tables = list(tables)
+    rows = db.execute(select(_tabla.c.name, _tabla.c.version).where(_tabla.c.name.in_(tables))).all()
+    found = dict(rows)
+    return {t: found.get(t, 0) for t in tables}
+
+
+def user_scope(user: models.User) -> str:
+    """Lo que cambia la visibilidad de los datos: rol, entidad y entidad_auditor."""
+    role = getattr(user.role, "value", user.role)
+    return f"{role}|{models.entidad_key(getattr(user, 'entidad', None))}|{int(bool(getattr(user, 'entidad_auditor', False)))}"
+
+
+def etag_for(db: Session, tables: Iterable[str], scope: str = "", vs: Optional[Dict[str, int]] = None) -> str:
+    vs = vs if vs is not None else versions(db, tables)
+    raw = ";".join(f"{t}={v}" for t, v in sorted(vs.items())) + "|" + scope
+    return f'W/"{hashlib.sha1(raw.encode()).hexdigest()[:20]}"'
+
+
+def conditional_get(
+    request: Request,
+    response: Response,
+    db: Session,
+    tables: Iterable[str],
+    scope: str = "",
+    vs: Optional[Dict[str, int]] = None,
+) -> Optional[Response]:
+    """
+    Devuelve un 304 listo si If-None-Match coincide; si no, pone ETag en `response`
+    y devuelve None para que el handler siga con la consulta normal.
+    `vs`: versiones ya leídas (para que el handler use las mismas que el ETag).
+    """
+    etag = etag_for(db, tables, scope, vs)
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if is_not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
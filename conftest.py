@@ -7,30 +7,40 @@ import os
 import pytest
 from datetime import date
 from sqlalchemy import create_engine, StaticPool
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import NullPool
 from fastapi.testclient import TestClient
 
-from app.database import Base, get_db
+from app.database import Base, get_db, get_async_db
 from app.main import app
 from app import models
+from app.principal_cache import principal_cache, token_version_cache
+from app.reporte_catalog import reporte_catalog
 from passlib.context import CryptContext
 
 
 # ──────────────────────────────────────────────────────────────────────────────
-# DATABASE CONFIGURATION - Usar SQLite en memoria para pruebas
+# DATABASE CONFIGURATION - Usar SQLite temporal (un archivo por prueba)
 # ──────────────────────────────────────────────────────────────────────────────
 
 @pytest.fixture(scope="function")
-def test_db():
+def test_db(tmp_path):
     """
-    Crea una base de datos SQLite en memoria para cada prueba.
+    Crea una base de datos SQLite temporal para cada prueba.
     Se ejecuta antes de cada prueba y se limpia después.
+    Es un archivo (no :memory:) para que el engine síncrono y el asíncrono
+    (aiosqlite, usado por los handlers async) vean los mismos datos.
     """
+    db_path = tmp_path / "test.db"
     engine = create_engine(
-        "sqlite:///:memory:",
+        f"sqlite:///{db_path}",
         connect_args={"check_same_thread": False},
         poolclass=StaticPool,
     )
+    # NullPool: TestClient abre un event loop por request y las conexiones
+    # aiosqlite no pueden reutilizarse entre loops
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{db_path}", poolclass=NullPool)
     
     # Crear todas las tablas
     Base.metadata.create_all(bind=engine)
@@ -44,14 +54,26 @@ def test_db():
             yield db
         finally:
             db.close()
+
+    TestingAsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+    async def override_get_async_db():
+        async with TestingAsyncSessionLocal() as db:
+            yield db
     
     # Override la dependencia de BD en la app
     app.dependency_overrides[get_db] = override_get_db
+    app.dependency_overrides[get_async_db] = override_get_async_db
+    # Cada prueba usa una BD nueva (los ids se repiten): vaciar cachés de proceso
+    principal_cache.clear()
+    token_version_cache.clear()
+    reporte_catalog.clear()
     
     yield TestingSessionLocal()
     
     # Limpiar overrides después del test
     app.dependency_overrides.clear()
+    engine.dispose()
 
 
 @pytest.fixture(scope="function")
@@ -0,0 +1,95 @@
+"""
+Pruebas para las cargas masivas de reportes, PQRDs y habilidades.
+"""
+
+import pytest
+from datetime import date
+from fastapi.testclient import TestClient
+from app import models
+from app.bulk import bulk_insert
+
+
+class TestBulkLoads:
+    """Suite de pruebas para POST /reports, /pqrds y /habilidades."""
+
+    def test_cargar_pqrds(self, client: TestClient, test_db, admin_user, admin_token):
+        """
+        Prueba que la carga de PQRDs inserta todas las filas y reporta el rendimiento.
+        """
+        pqrds = [
+            {
+                "label": f"PQRD-{i}",
+                "tipo_gestion": "Petición",
+                "dependencia": "Atención",
+                "entidad": "Secretaría de Salud",
+                "fecha_ingreso": "2024-03-15",
+                "periodo": "",
+            }
+            for i in range(250)
+        ]
+        response = client.post(
+            "/pqrds",
+            json={"pqrds": pqrds},
+            headers={"Authorization": f"Bearer {admin_token}"}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["insertados"] == 250
+        assert data["metodo"] == "executemany"
+        assert "filas_por_segundo" in data
+
+        assert test_db.query(models.PQRD).count() == 250
+        row = test_db.query(models.PQRD).filter_by(label="PQRD-1").one()
+        assert row.fecha_ingreso == date(2024, 3, 15)
+        assert row.periodo is None
+
+    def test_cargar_reportes(self, client: TestClient, test_db, admin_user, admin_token):
+        """
+        Prueba la carga masiva de reportes.
+        """
+        reportes = [
+            {"entidad": "Entidad A", "indicador": f"I{i}", "criterio": "C", "accion": "A", "insumo": None}
+            for i in range(10)
+        ]
+        response = client.post(
+            "/reports",
+            json={"reportes": reportes},
+            headers={"Authorization": f"Bearer {admin_token}"}
+        )
+        assert response.status_code == 200
+        assert response.json()["insertados"] == 10
+        assert test_db.query(models.Reporte).count() == 10
+
+    def test_cargar_habilidades(self, client: TestClient, test_db, admin_user, admin_token):
+        """
+        Prueba la carga masiva de habilidades.
+        """
+        habilidades = [
+            {"anio": 2024, "mes": m, "id_entidad": 7, "entidad": "Entidad 7", "pct_habilidades_tecnicas": 80}
+            for m in range(1, 13)
+        ]
+        response = client.post(
+            "/habilidades",
+            json={"habilidades": habilidades},
+            headers={"Authorization": f"Bearer {admin_token}"}
+        )
+        assert response.status_code == 200
+        assert response.json()["insertados"] == 12
+        assert test_db.query(models.Habilidad).count() == 12
+
+    def test_bulk_insert_batches(self, test_db):
+        """
+        Prueba que bulk_insert parte la carga en lotes sin perder filas.
+        """
+        rows = [{"entidad": "E", "indicador": str(i), "criterio": "C", "accion": "A", "insumo": None} for i in range(23)]
+        resultado = bulk_insert(test_db, models.Reporte.__table__, rows, batch_size=5)
+        test_db.commit()
+        assert resultado["insertados"] == 23
+        assert test_db.query(models.Reporte).count() == 23
+
+    def test_bulk_insert_empty(self, test_db):
+        """
+        Prueba que una carga vacía no falla.
+        """
+        resultado = bulk_insert(test_db, models.Reporte.__table__, [])
+        assert resultado["insertados"] == 0
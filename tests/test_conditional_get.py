@@ -0,0 +1,112 @@
+"""
+Pruebas para los ETag por versión de tabla y las respuestas 304.
+"""
+
+from fastapi.testclient import TestClient
+from app import models
+
+
+class TestConditionalGet:
+    """Suite de pruebas para If-None-Match en los GET de lectura."""
+
+    def test_planes_304_y_cambio_tras_escritura(self, client: TestClient, test_db, admin_user, admin_token):
+        """
+        Prueba que el listado de planes responde 304 hasta que una escritura sube la versión.
+        """
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        first = client.get("/seguimiento", headers=headers)
+        etag = first.headers["etag"]
+        assert first.headers["cache-control"] == "private, no-cache"
+
+        again = client.get("/seguimiento", headers={**headers, "If-None-Match": etag})
+        assert again.status_code == 304
+        assert again.headers["etag"] == etag
+        assert again.content == b""
+
+        client.post("/seguimiento", json={"nombre_entidad": "Alcaldia"}, headers=headers)
+        changed = client.get("/seguimiento", headers={**headers, "If-None-Match": etag})
+        assert changed.status_code == 200
+        assert changed.headers["etag"] != etag
+        assert len(changed.json()) == 1
+
+    def test_etag_depende_del_alcance(self, client: TestClient, test_db, admin_token, entidad_token):
+        """
+        Prueba que usuarios con distinta visibilidad no comparten ETag.
+        """
+        admin = client.get("/seguimiento", headers={"Authorization": f"Bearer {admin_token}"})
+        entidad = client.get(
+            "/seguimiento",
+            headers={"Authorization": f"Bearer {entidad_token}", "If-None-Match": admin.headers["etag"]},
+        )
+        assert entidad.status_code == 200
+        assert entidad.headers["etag"] != admin.headers["etag"]
+
+    def test_seguimientos_dependen_de_usuarios(
+        self, client: TestClient, test_db, admin_user, admin_token, entidad_user, plan_action
+    ):
+        """
+        Prueba que cambiar un usuario invalida el ETag del listado de seguimientos.
+        """
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        url = f"/seguimiento/{plan_action.id}/seguimiento"
+        etag = client.get(url, headers=headers).headers["etag"]
+
+        client.patch(f"/users/{entidad_user.id}/auditor", json={"entidad_auditor": True}, headers=headers)
+        response = client.get(url, headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+
+    def test_pqrds_reportes_habilidades(self, client: TestClient, test_db, admin_user, admin_token):
+        """
+        Prueba ETag/304 en conteo de PQRDs, reportes por entidad, exportación y series.
+        """
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        client.post("/reports", json={"reportes": [
+            {"entidad": "Salud", "indicador": "I1", "criterio": "C", "accion": "A"}
+        ]}, headers=headers)
+
+        for url in ("/pqrds/count", "/reports/Salud", "/reports?format=ndjson", "/habilidades/series"):
+            first = client.get(url, headers=headers)
+            assert first.status_code == 200, url
+            second = client.get(url, headers={**headers, "If-None-Match": first.headers["etag"]})
+            assert second.status_code == 304, url
+
+        # JSON y NDJSON de la misma tabla no comparten ETag
+        assert (
+            client.get("/reports", headers=headers).headers["etag"]
+            != client.get("/reports?format=ndjson", headers=headers).headers["etag"]
+        )
+
+        etag = client.get("/pqrds/count", headers=headers).headers["etag"]
+        client.post("/pqrds", json={"pqrds": [{
+            "label": "P1", "tipo_gestion": "Queja", "dependencia": "D",
+            "entidad": "Salud", "fecha_ingreso": "2024-01-01",
+        }]}, headers=headers)
+        response = client.get("/pqrds/count", headers={**headers, "If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.json() == 1
+
+    def test_versiones_por_tabla(self, client: TestClient, test_db, admin_user, admin_token):
+        """
+        Prueba que cada escritura sube solo las tablas que toca.
+        """
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        client.post("/habilidades", json={"habilidades": [{"anio": 2024, "mes": 1, "id_entidad": 1}]}, headers=headers)
+        client.delete("/habilidades", headers=headers)
+
+        versiones = {v.name: v.version for v in test_db.query(models.TableVersion)}
+        assert versiones == {"habilidades": 2}
+
+    def test_bump_tras_commit(self, test_db):
+        """
+        Prueba que bump no escribe table_versions dentro de la transacción y que un rollback lo descarta.
+        """
+        from app import table_versions as tv
+
+        tv.bump(test_db, tv.PLANES, tv.SEGUIMIENTOS)
+        assert test_db.query(models.TableVersion).count() == 0
+        test_db.rollback()
+
+        tv.bump(test_db, tv.PLANES)
+        test_db.add(models.PlanAccion(nombre_entidad="Salud"))
+        test_db.commit()
+        assert tv.versions(test_db, (tv.PLANES, tv.SEGUIMIENTOS)) == {tv.PLANES: 1, tv.SEGUIMIENTOS: 0}
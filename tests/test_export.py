@@ -0,0 +1,86 @@
+"""
+Pruebas para la exportación en streaming (NDJSON / CSV).
+"""
+
+import csv
+import io
+import json
+import pytest
+from datetime import date
+from fastapi.testclient import TestClient
+from app import models
+from app import export
+
+
+@pytest.fixture
+def pqrds(test_db):
+    """
+    Carga PQRDs de prueba.
+    """
+    for i in range(25):
+        test_db.add(models.PQRD(
+            label=f"PQRD-{i}",
+            tipo_gestion="Queja",
+            dependencia="Atención, ciudadano",
+            entidad="Secretaría de Salud",
+            fecha_ingreso=date(2024, 1 + i % 12, 1),
+        ))
+    test_db.commit()
+
+
+class TestStreamingExport:
+    """Suite de pruebas para los modos de exportación."""
+
+    def test_pqrds_ndjson(self, client: TestClient, test_db, admin_user, admin_token, pqrds, monkeypatch):
+        """
+        Prueba exportar PQRDs en NDJSON por lotes.
+        """
+        monkeypatch.setattr(export, "EXPORT_BATCH_SIZE", 10)
+        response = client.get("/pqrds?format=ndjson", headers={"Authorization": f"Bearer {admin_token}"})
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert len(rows) == 25
+        assert rows[0]["label"] == "PQRD-0"
+        assert rows[0]["fecha_ingreso"] == "2024-01-01"
+
+    def test_pqrds_csv_via_accept(self, client: TestClient, test_db, admin_user, admin_token, pqrds):
+        """
+        Prueba exportar PQRDs en CSV eligiendo el formato por header Accept.
+        """
+        response = client.get(
+            "/pqrds",
+            headers={"Authorization": f"Bearer {admin_token}", "Accept": "text/csv"},
+        )
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        assert 'filename="pqrds.csv"' in response.headers["content-disposition"]
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        assert len(rows) == 25
+        assert rows[3]["dependencia"] == "Atención, ciudadano"
+
+    def test_empty_table_csv_has_header(self, client: TestClient, test_db, admin_user, admin_token):
+        """
+        Prueba que una tabla vacía exporta solo la cabecera.
+        """
+        response = client.get("/habilidades?format=csv", headers={"Authorization": f"Bearer {admin_token}"})
+        assert response.status_code == 200
+        assert response.text.strip().split(",")[0] == "id"
+        assert len(response.text.strip().splitlines()) == 1
+
+    def test_reportes_default_json(self, client: TestClient, test_db, admin_user, admin_token):
+        """
+        Prueba que sin formato se mantiene la respuesta JSON de siempre.
+        """
+        test_db.add(models.Reporte(entidad="E", indicador="I", criterio="C", accion="A"))
+        test_db.commit()
+        response = client.get("/reports", headers={"Authorization": f"Bearer {admin_token}"})
+        assert response.status_code == 200
+        assert isinstance(response.json(), list)
+
+    def test_invalid_format(self, client: TestClient, test_db, admin_user, admin_token):
+        """
+        Prueba que un formato desconocido es rechazado.
+        """
+        response = client.get("/reports?format=xml", headers={"Authorization": f"Bearer {admin_token}"})
+        assert response.status_code == 422
@@ -0,0 +1,265 @@
+"""
+Pruebas para los endpoints de archivos de evidencia.
+"""
+
+import hashlib
+import pytest
+from fastapi.testclient import TestClient
+from app import models
+from app.routers import files
+
+
+@pytest.fixture
+def evidence_dir(tmp_path, monkeypatch):
+    """
+    Redirige el almacenamiento de evidencias a un directorio temporal.
+    """
+    base = tmp_path / "evidence"
+    base.mkdir()
+    monkeypatch.setattr(files, "BASE_DIR", base)
+    return base
+
+
+def _upload(client: TestClient, token: str, content: bytes = b"%PDF-1.4 contenido", name: str = "informe.pdf"):
+    return client.post(
+        "/files/upload",
+        files={"file": (name, content, "application/pdf")},
+        headers={"Authorization": f"Bearer {token}"},
+    )
+
+
+class TestFilesEndpoints:
+    """Suite de pruebas para subida, descarga y borrado de evidencias."""
+
+    def test_upload_and_download(self, client: TestClient, test_db, admin_user, admin_token, evidence_dir):
+        """
+        Prueba subir un archivo y descargarlo con su file_id.
+        """
+        response = _upload(client, admin_token)
+        assert response.status_code == 201
+        data = response.json()
+        assert data["filename"] == "informe.pdf"
+        assert data["file_size"] == len(b"%PDF-1.4 contenido")
+
+        response = client.get(data["download_url"])
+        assert response.status_code == 200
+        assert response.content == b"%PDF-1.4 contenido"
+
+    def test_upload_stores_sha256(self, client: TestClient, test_db, admin_user, admin_token, evidence_dir):
+        """
+        Prueba que la subida calcula y guarda el SHA-256 sin dejar temporales.
+        """
+        content = b"%PDF-1.4 " + b"x" * 3_000_000
+        data = _upload(client, admin_token, content=content).json()
+        expected = hashlib.sha256(content).hexdigest()
+        assert data["sha256"] == expected
+
+        db_file = test_db.query(models.UploadedFile).filter_by(file_id=data["file_id"]).one()
+        assert db_file.sha256 == expected
+        assert [p.name for p in evidence_dir.iterdir()] == [data["stored_filename"]]
+
+    def test_upload_too_large(self, client: TestClient, test_db, admin_user, admin_token, evidence_dir, monkeypatch):
+        """
+        Prueba que se corta con 413 al superar el límite y no queda nada en disco.
+        """
+        monkeypatch.setattr(files, "MAX_UPLOAD_BYTES", 1024)
+        response = _upload(client, admin_token, content=b"x" * 4096)
+        assert response.status_code == 413
+        assert not list(evidence_dir.iterdir())
+        assert test_db.query(models.UploadedFile).count() == 0
+
+    def test_cas_deduplicates_and_refcounts(self, client: TestClient, test_db, admin_user, admin_token, evidence_dir, monkeypatch):
+        """
+        Prueba que en modo cas el mismo contenido se guarda una vez y se borra con la última referencia.
+        """
+        monkeypatch.setattr(files, "EVIDENCE_STORAGE", "cas")
+        first = _upload(client, admin_token, name="a.pdf").json()
+        second = _upload(client, admin_token, name="b.pdf").json()
+        assert first["deduplicated"] is False
+        assert second["deduplicated"] is True
+        assert first["stored_filename"] == second["stored_filename"]
+
+        blobs = [p for p in evidence_dir.rglob("*") if p.is_file()]
+        assert len(blobs) == 1
+        assert test_db.get(models.EvidenceBlob, first["sha256"]).ref_count == 2
+
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        assert client.delete(f"/files/delete/{first['file_id']}", headers=headers).status_code == 200
+        assert blobs[0].exists()
+        assert client.get(second["download_url"]).content == b"%PDF-1.4 contenido"
+
+        assert client.delete(f"/files/delete/{second['file_id']}", headers=headers).status_code == 200
+        assert not blobs[0].exists()
+        test_db.expire_all()
+        assert test_db.get(models.EvidenceBlob, first["sha256"]) is None
+
+    def test_cas_upload_during_delete_keeps_blob(self, client: TestClient, test_db, admin_user, admin_token, evidence_dir, monkeypatch):
+        """
+        Prueba que una subida del mismo contenido entre el commit del borrado y la limpieza en disco conserva su blob.
+        """
+        monkeypatch.setattr(files, "EVIDENCE_STORAGE", "cas")
+        first = _upload(client, admin_token).json()
+        blob = evidence_dir / first["stored_filename"]
+        discard = files._discard
+        nuevas = []
+
+        def upload_then_discard(path):
+            nuevas.append(_upload(client, admin_token).json())
+            discard(path)
+
+        monkeypatch.setattr(files, "_discard", upload_then_discard)
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        assert client.delete(f"/files/delete/{first['file_id']}", headers=headers).status_code == 200
+
+        assert nuevas[0]["deduplicated"] is False
+        assert blob.exists()
+        assert [p for p in evidence_dir.rglob("*") if p.is_file()] == [blob]
+        assert client.get(nuevas[0]["download_url"]).content == b"%PDF-1.4 contenido"
+        test_db.expire_all()
+        assert test_db.get(models.EvidenceBlob, first["sha256"]).ref_count == 1
+
+    def test_upload_rejects_mime(self, client: TestClient, test_db, admin_user, admin_token, evidence_dir):
+        """
+        Prueba que un tipo MIME no permitido es rechazado.
+        """
+        response = client.post(
+            "/files/upload",
+            files={"file": ("script.sh", b"echo hola", "text/x-shellscript")},
+            headers={"Authorization": f"Bearer {admin_token}"},
+        )
+        assert response.status_code == 415
+
+    def test_download_not_found(self, client: TestClient, test_db):
+        """
+        Prueba descargar un archivo inexistente.
+        """
+        response = client.get("/files/download/no-existe")
+        assert response.status_code == 404
+
+    def test_delete_file(self, client: TestClient, test_db, admin_user, admin_token, evidence_dir):
+        """
+        Prueba que el propietario puede eliminar su archivo.
+        """
+        data = _upload(client, admin_token).json()
+        response = client.delete(
+            f"/files/delete/{data['file_id']}",
+            headers={"Authorization": f"Bearer {admin_token}"},
+        )
+        assert response.status_code == 200
+        assert not list(evidence_dir.iterdir())
+        assert client.get(data["download_url"]).status_code == 404
+
+    def test_delete_file_forbidden(self, client: TestClient, test_db, admin_user, admin_token, entidad_token, evidence_dir):
+        """
+        Prueba que otro usuario no admin no puede eliminar el archivo.
+        """
+        data = _upload(client, admin_token).json()
+        response = client.delete(
+            f"/files/delete/{data['file_id']}",
+            headers={"Authorization": f"Bearer {entidad_token}"},
+        )
+        assert response.status_code == 403
+
+
+class TestFilesConditionalAndRanges:
+    """Suite de pruebas para ETag, peticiones condicionales y rangos en descargas."""
+
+    CONTENT = bytes(range(256)) * 40  # 10240 bytes
+
+    @pytest.fixture
+    def uploaded(self, client: TestClient, test_db, admin_user, admin_token, evidence_dir):
+        return _upload(client, admin_token, content=self.CONTENT).json()
+
+    def test_full_download_has_validators(self, client: TestClient, uploaded):
+        """
+        Prueba que la descarga completa expone ETag fuerte, Last-Modified y Accept-Ranges.
+        """
+        response = client.get(uploaded["download_url"])
+        assert response.status_code == 200
+        assert response.headers["etag"] == f'"{uploaded["sha256"]}"'
+        assert response.headers["accept-ranges"] == "bytes"
+        assert "last-modified" in response.headers
+
+    def test_if_none_match_returns_304(self, client: TestClient, uploaded):
+        """
+        Prueba que If-None-Match con el ETag vigente responde 304 sin cuerpo.
+        """
+        etag = client.get(uploaded["download_url"]).headers["etag"]
+        response = client.get(uploaded["download_url"], headers={"If-None-Match": f'W/"otro", {etag}'})
+        assert response.status_code == 304
+        assert response.content == b""
+
+        response = client.get(uploaded["download_url"], headers={"If-None-Match": '"otro"'})
+        assert response.status_code == 200
+
+    def test_if_modified_since_returns_304(self, client: TestClient, uploaded):
+        """
+        Prueba que If-Modified-Since con la fecha vigente responde 304.
+        """
+        last_modified = client.get(uploaded["download_url"]).headers["last-modified"]
+        response = client.get(uploaded["download_url"], headers={"If-Modified-Since": last_modified})
+        assert response.status_code == 304
+
+        response = client.get(uploaded["download_url"], headers={"If-Modified-Since": "Mon, 01 Jan 2001 00:00:00 GMT"})
+        assert response.status_code == 200
+
+    def test_single_range(self, client: TestClient, uploaded):
+        """
+        Prueba una petición de un solo rango.
+        """
+        response = client.get(uploaded["download_url"], headers={"Range": "bytes=100-199"})
+        assert response.status_code == 206
+        assert response.headers["content-range"] == f"bytes 100-199/{len(self.CONTENT)}"
+        assert response.content == self.CONTENT[100:200]
+
+    def test_suffix_and_open_ranges(self, client: TestClient, uploaded):
+        """
+        Prueba rangos de sufijo (últimos N bytes) y abiertos (desde N hasta el final).
+        """
+        response = client.get(uploaded["download_url"], headers={"Range": "bytes=-10"})
+        assert response.status_code == 206
+        assert response.content == self.CONTENT[-10:]
+
+        response = client.get(uploaded["download_url"], headers={"Range": "bytes=10000-"})
+        assert response.status_code == 206
+        assert response.content == self.CONTENT[10000:]
+
+    def test_multi_range(self, client: TestClient, uploaded):
+        """
+        Prueba una petición multi-rango servida como multipart/byteranges.
+        """
+        response = client.get(uploaded["download_url"], headers={"Range": "bytes=0-9, 500-509"})
+        assert response.status_code == 206
+        content_type = response.headers["content-type"]
+        assert content_type.startswith("multipart/byteranges; boundary=")
+        boundary = content_type.split("boundary=")[1]
+        assert int(response.headers["content-length"]) == len(response.content)
+
+        parts = response.content.split(f"--{boundary}".encode())
+        bodies = [p.split(b"\r\n\r\n", 1)[1][:-2] for p in parts if b"Content-Range" in p]
+        assert bodies == [self.CONTENT[0:10], self.CONTENT[500:510]]
+        assert f"bytes 500-509/{len(self.CONTENT)}".encode() in response.content
+
+    def test_unsatisfiable_range(self, client: TestClient, uploaded):
+        """
+        Prueba que un rango fuera del archivo responde 416.
+        """
+        response = client.get(uploaded["download_url"], headers={"Range": "bytes=999999-"})
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{len(self.CONTENT)}"
+
+    def test_if_range_mismatch_serves_full(self, client: TestClient, uploaded):
+        """
+        Prueba que con If-Range desactualizado se ignora el Range y se sirve completo.
+        """
+        response = client.get(
+            uploaded["download_url"],
+            headers={"Range": "bytes=0-9", "If-Range": '"desactualizado"'},
+        )
+        assert response.status_code == 200
+        assert response.content == self.CONTENT
+
+        etag = response.headers["etag"]
+        response = client.get(uploaded["download_url"], headers={"Range": "bytes=0-9", "If-Range": etag})
+        assert response.status_code == 206
+        assert response.content == self.CONTENT[:10]
@@ -0,0 +1,81 @@
+"""
+Pruebas para las series agregadas de habilidades.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import inspect
+from app import models
+
+
+@pytest.fixture
+def habilidades(test_db):
+    """
+    Carga habilidades de dos entidades en 2023 y 2024.
+    """
+    datos = [
+        (2023, 12, 1, "Salud", 50, 10),
+        (2024, 1, 1, "Salud", 60, 20),
+        (2024, 1, 2, "Hacienda", 80, 5),
+        (2024, 2, 1, "Salud", 70, 30),
+    ]
+    for anio, mes, id_entidad, entidad, pct, num in datos:
+        test_db.add(models.Habilidad(
+            anio=anio, mes=mes, id_entidad=id_entidad, entidad=entidad,
+            pct_habilidades_tecnicas=pct, num_capacitados_tecnicas=num,
+        ))
+    test_db.commit()
+
+
+class TestHabilidadesSeries:
+    """Suite de pruebas para GET /habilidades/series."""
+
+    def test_series_global_y_por_entidad(self, client: TestClient, test_db, admin_user, admin_token, habilidades):
+        """
+        Prueba que la serie global promedia porcentajes y suma capacitados por mes.
+        """
+        response = client.get(
+            "/habilidades/series?desde_anio=2024",
+            headers={"Authorization": f"Bearer {admin_token}"}
+        )
+        assert response.status_code == 200
+        data = response.json()
+
+        enero = data["global"][0]
+        assert (enero["anio"], enero["mes"], enero["entidades"]) == (2024, 1, 2)
+        assert enero["pct_habilidades_tecnicas"] == 70.0
+        assert enero["num_capacitados_tecnicas"] == 25
+        assert len(data["global"]) == 2
+
+        salud = [s for s in data["entidades"] if s["id_entidad"] == 1]
+        assert [(s["anio"], s["mes"]) for s in salud] == [(2024, 1), (2024, 2)]
+        assert salud[0]["entidad"] == "Salud"
+
+    def test_series_filtrada(self, client: TestClient, test_db, admin_user, admin_token, habilidades):
+        """
+        Prueba el filtro por entidad y el nivel global.
+        """
+        response = client.get(
+            "/habilidades/series?id_entidad=2&nivel=global",
+            headers={"Authorization": f"Bearer {admin_token}"}
+        )
+        data = response.json()
+        assert "entidades" not in data
+        assert data["global"][0]["pct_habilidades_tecnicas"] == 80.0
+
+    def test_rango_invalido(self, client: TestClient, test_db, admin_user, admin_token):
+        """
+        Prueba que desde_anio > hasta_anio devuelve 400.
+        """
+        response = client.get(
+            "/habilidades/series?desde_anio=2025&hasta_anio=2024",
+            headers={"Authorization": f"Bearer {admin_token}"}
+        )
+        assert response.status_code == 400
+
+    def test_indice_compuesto(self, test_db):
+        """
+        Prueba que la tabla tiene el índice (anio, mes, id_entidad).
+        """
+        indices = inspect(test_db.get_bind()).get_indexes("habilidades")
+        assert any(i["column_names"] == ["anio", "mes", "id_entidad"] for i in indices)
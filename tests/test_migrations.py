@@ -0,0 +1,114 @@
+"""
+Pruebas para las migraciones de esquema versionadas (app/migrations.py).
+"""
+
+from sqlalchemy import create_engine, inspect, text
+
+from app import models
+from app.migrations import LATEST_VERSION, MIGRATIONS, current_version, run_migrations
+
+
+class TestMigrations:
+    """Suite de pruebas para run_migrations."""
+
+    def test_bd_nueva_aplica_todo(self, tmp_path):
+        """
+        Prueba que una BD vacía queda en la última versión con un registro por paso.
+        """
+        engine = create_engine(f"sqlite:///{tmp_path / 'nueva.db'}")
+        aplicadas = run_migrations(engine)
+
+        assert aplicadas == [name for _, name, _ in MIGRATIONS]
+        assert current_version(engine) == LATEST_VERSION
+        assert inspect(engine).has_table("plan_accion")
+        engine.dispose()
+
+    def test_segundo_arranque_no_hace_nada(self, tmp_path):
+        """
+        Prueba que con el esquema al día no se repite ningún paso.
+        """
+        engine = create_engine(f"sqlite:///{tmp_path / 'al_dia.db'}")
+        run_migrations(engine)
+
+        assert run_migrations(engine) == []
+        with engine.connect() as conn:
+            total = conn.execute(text("SELECT COUNT(*) FROM schema_version")).scalar()
+        assert total == len(MIGRATIONS)
+        engine.dispose()
+
+    def test_esquema_heredado(self, tmp_path):
+        """
+        Prueba que una BD previa a las migraciones recibe las columnas faltantes
+        y que los datos existentes se normalizan.
+        """
+        engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+        with engine.begin() as conn:
+            conn.execute(text("""
+                CREATE TABLE users (
+                    id INTEGER PRIMARY KEY,
+                    email VARCHAR(255) UNIQUE NOT NULL,
+                    hashed_password VARCHAR(255) NOT NULL,
+                    role VARCHAR(32) NOT NULL,
+                    entidad VARCHAR(255)
+                )
+            """))
+            conn.execute(text("""
+                CREATE TABLE plan_accion (
+                    id INTEGER PRIMARY KEY,
+                    nombre_entidad VARCHAR(255) NOT NULL,
+                    created_by INTEGER
+                )
+            """))
+            conn.execute(text("""
+                INSERT INTO users (email, hashed_password, role, entidad)
+                VALUES ('eval@test.com', 'x', 'entidad_evaluador', 'Secretaría')
+            """))
+            conn.execute(text(
+                "INSERT INTO plan_accion (nombre_entidad) VALUES ('  Secretaría de Salud ')"
+            ))
+
+        run_migrations(engine)
+
+        insp = inspect(engine)
+        assert {"entidad_perm", "entidad_auditor"} <= {c["name"] for c in insp.get_columns("users")}
+        with engine.connect() as conn:
+            role, auditor = conn.execute(text("SELECT role, entidad_auditor FROM users")).one()
+            key = conn.execute(text("SELECT nombre_entidad_key FROM plan_accion")).scalar()
+        assert role == "entidad"
+        assert auditor == 1
+        assert key == "secretaría de salud"
+        assert current_version(engine) == LATEST_VERSION
+        engine.dispose()
+
+    def test_backfill_entidad_key(self, tmp_path):
+        """
+        Prueba que el paso de nombre_entidad_key rellena todas las filas existentes
+        con la misma normalización que el ORM y que el filtro las encuentra.
+        """
+        engine = create_engine(f"sqlite:///{tmp_path / 'backfill.db'}")
+        with engine.begin() as conn:
+            conn.execute(text("""
+                CREATE TABLE plan_accion (
+                    id INTEGER PRIMARY KEY,
+                    nombre_entidad VARCHAR(255) NOT NULL,
+                    created_by INTEGER
+                )
+            """))
+            conn.execute(text("INSERT INTO plan_accion (nombre_entidad) VALUES (:n)"), [
+                {"n": "SECRETARÍA DE EDUCACIÓN"},
+                {"n": " Secretaría de Educación"},
+                {"n": "Alcaldía"},
+            ])
+
+        run_migrations(engine)
+
+        with engine.connect() as conn:
+            keys = conn.execute(text("SELECT nombre_entidad_key FROM plan_accion ORDER BY id")).scalars().all()
+            ids = conn.execute(
+                text("SELECT id FROM plan_accion WHERE nombre_entidad_key = :k ORDER BY id"),
+                {"k": models.entidad_key("Secretaría de Educación")},
+            ).scalars().all()
+        assert keys == ["secretaría de educación", "secretaría de educación", "alcaldía"]
+        assert ids == [1, 2]
+        assert "ix_plan_accion_nombre_entidad_key" in {i["name"] for i in inspect(engine).get_indexes("plan_accion")}
+        engine.dispose()
@@ -0,0 +1,100 @@
+"""
+Pruebas para el pool de bcrypt (app/passwords.py) y el rehash en el login.
+"""
+
+import asyncio
+
+import bcrypt
+import pytest
+from fastapi.testclient import TestClient
+
+from app import models
+from app.passwords import PasswordPool, PoolSaturado, costo, password_pool
+
+
+def _login(client: TestClient, email: str, password: str):
+    return client.post("/auth/token", data={"username": email, "password": password})
+
+
+class TestPasswordPool:
+    """Suite de pruebas para PasswordPool."""
+
+    def test_hash_y_verify(self):
+        """
+        Prueba hash/verify en procesos hijos, hashes inválidos y métricas.
+        """
+        pool = PasswordPool(workers=1, max_pending=4, rounds=4)
+        try:
+            hashed = pool.hash_sync("secreto123")
+            assert costo(hashed) == 4 and hashed.startswith("$2b$")
+
+            async def verificar():
+                return (
+                    await pool.verify("secreto123", hashed),
+                    await pool.verify("otra", hashed),
+                    await pool.verify("secreto123", "no-es-bcrypt"),
+                    await pool.verify("secreto123", None),
+                )
+
+            assert asyncio.run(verificar()) == (True, False, False, False)
+            stats = pool.stats()
+            assert stats["hash"]["n"] == 1 and stats["verify"]["n"] == 3
+            assert stats["pendientes"] == 0
+        finally:
+            pool.shutdown()
+
+    def test_costo_y_rehash(self):
+        """
+        Prueba la lectura del costo y cuándo se pide rehash.
+        """
+        pool = PasswordPool(workers=1, rounds=10)
+        assert costo(bcrypt.hashpw(b"x", bcrypt.gensalt(4)).decode()) == 4
+        assert costo("$argon2id$v=19$m=65536") is None
+        assert pool.needs_rehash("$2b$12$" + "a" * 53)
+        assert pool.needs_rehash("$2a$10$" + "a" * 53)
+        assert not pool.needs_rehash("$2b$10$" + "a" * 53)
+
+    def test_cola_acotada(self):
+        """
+        Prueba que con la cola llena se rechaza sin encolar.
+        """
+        pool = PasswordPool(workers=1, max_pending=0, rounds=4)
+        with pytest.raises(PoolSaturado):
+            pool.hash_sync("secreto123")
+        assert pool.stats()["rechazadas"] == 1
+        assert not pool.stats()["iniciado"]
+
+
+class TestLoginConPool:
+    """Suite de pruebas para /auth/token sobre el pool de bcrypt."""
+
+    def test_rehash_en_login(self, client: TestClient, test_db, admin_user, monkeypatch):
+        """
+        Prueba que un login exitoso recalcula el hash con el costo configurado.
+        """
+        monkeypatch.setattr(password_pool, "rounds", 5)
+        assert costo(admin_user.hashed_password) == 12
+
+        assert _login(client, "admin@test.com", "admin123").status_code == 200
+        test_db.expire_all()
+        nuevo = test_db.query(models.User).get(admin_user.id).hashed_password
+        assert costo(nuevo) == 5
+
+        # el hash nuevo sigue sirviendo y no se vuelve a recalcular
+        rehashes = password_pool.rehashes
+        assert _login(client, "admin@test.com", "admin123").status_code == 200
+        assert _login(client, "admin@test.com", "mala").status_code == 400
+        assert password_pool.rehashes == rehashes
+
+    def test_saturado_responde_503(self, client: TestClient, test_db, admin_user, admin_token, monkeypatch):
+        """
+        Prueba que con la cola llena el login responde 503 y las métricas lo reflejan.
+        """
+        monkeypatch.setattr(password_pool, "max_pending", 0)
+        response = _login(client, "admin@test.com", "admin123")
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "1"
+
+        stats = client.get("/stats/hashing", headers={"Authorization": f"Bearer {admin_token}"}).json()
+        assert stats["rechazadas"] >= 1
+        assert {"en_cola", "pendientes", "hash", "verify"} <= set(stats)
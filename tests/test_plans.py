@@ -182,6 +182,41 @@ class TestPlansEndpoints:
         data = response.json()
         assert len(data) == 2
 
+    def test_list_plans_cursor_pagination(self, client: TestClient, test_db, admin_user, admin_token):
+        """
+        Prueba la paginación por cursor (keyset) en la lista de planes.
+        """
+        for i in range(5):
+            test_db.add(models.PlanAccion(nombre_entidad=f"Entidad {i}", created_by=admin_user.id))
+        test_db.commit()
+
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        response = client.get("/seguimiento?cursor=&limit=2", headers=headers)
+        assert response.status_code == 200
+        page = response.json()
+        assert len(page["items"]) == 2
+        assert page["next_cursor"]
+
+        vistos = [p["id"] for p in page["items"]]
+        while page["next_cursor"]:
+            response = client.get(f"/seguimiento?cursor={page['next_cursor']}&limit=2", headers=headers)
+            assert response.status_code == 200
+            page = response.json()
+            vistos += [p["id"] for p in page["items"]]
+
+        assert len(vistos) == 5
+        assert vistos == sorted(vistos, reverse=True)
+
+    def test_list_plans_invalid_cursor(self, client: TestClient, test_db, admin_user, admin_token):
+        """
+        Prueba que un cursor malformado es rechazado.
+        """
+        response = client.get(
+            "/seguimiento?cursor=no-es-un-cursor",
+            headers={"Authorization": f"Bearer {admin_token}"}
+        )
+        assert response.status_code == 400
+
     def test_indicadores_usados(self, client: TestClient, test_db, admin_user, admin_token, plan_action, seguimiento):
         """
         Prueba obtener los indicadores ya usados.
@@ -191,4 +226,378 @@ class TestPlansEndpoints:
             headers={"Authorization": f"Bearer {admin_token}"}
         )
         assert response.status_code == 200
-        data = response.json()
\ No newline at end of file
+        data = response.json()
+
+class TestIndicadoresUsados:
+    """Suite de pruebas para la tabla indicador_entidad detrás de /indicadores_usados."""
+
+    def _usados(self, client: TestClient, token: str) -> list:
+        response = client.get(
+            "/seguimiento/indicadores_usados",
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        assert response.status_code == 200
+        return response.json()
+
+    def test_mantenida_en_escrituras(self, client: TestClient, test_db, entidad_user, entidad_token, admin_token):
+        """
+        Prueba que crear, actualizar y eliminar seguimientos (y planes) ajusta los indicadores.
+        """
+        headers = {"Authorization": f"Bearer {entidad_token}"}
+        plan_id = client.post("/seguimiento", json={"nombre_entidad": "x"}, headers=headers).json()["id"]
+        base = f"/seguimiento/{plan_id}/seguimiento"
+
+        s1 = client.post(base, json={"indicador": " Cobertura "}, headers=headers).json()["id"]
+        client.post(base, json={"indicador": "Cobertura"}, headers=headers)
+        s3 = client.post(base, json={"indicador": "Calidad"}, headers=headers).json()["id"]
+        assert self._usados(client, entidad_token) == ["Calidad", "Cobertura"]
+
+        client.put(f"{base}/{s3}", json={"indicador": "Oportunidad"}, headers=headers)
+        assert self._usados(client, entidad_token) == ["Cobertura", "Oportunidad"]
+
+        # Queda otro seguimiento con "Cobertura"
+        client.delete(f"{base}/{s1}", headers=headers)
+        assert self._usados(client, entidad_token) == ["Cobertura", "Oportunidad"]
+
+        client.delete(f"/seguimiento/{plan_id}", headers=headers)
+        assert self._usados(client, entidad_token) == []
+        assert test_db.query(models.IndicadorEntidad).count() == 0
+
+    def test_reconstruir(self, client: TestClient, test_db, entidad_user, entidad_token, plan_action, seguimiento):
+        """
+        Prueba que la reconstrucción recoge seguimientos creados fuera de los endpoints.
+        """
+        from app.indicadores import reconstruir
+
+        assert self._usados(client, entidad_token) == []
+        with test_db.get_bind().begin() as conn:
+            assert reconstruir(conn) == 1
+        assert self._usados(client, entidad_token) == ["Infraestructura"]
+
+
+class TestEntidadKey:
+    """Suite de pruebas para plan_accion.nombre_entidad_key y el filtro por entidad."""
+
+    def test_sincronizada_al_crear_y_actualizar(self, client: TestClient, test_db, admin_user, admin_token):
+        """
+        Prueba que la clave sigue a nombre_entidad al crear y al reasignarlo en el ORM.
+        """
+        plan_id = client.post(
+            "/seguimiento",
+            json={"nombre_entidad": "  SECRETARÍA de Educación "},
+            headers={"Authorization": f"Bearer {admin_token}"}
+        ).json()["id"]
+        plan = test_db.get(models.PlanAccion, plan_id)
+        assert plan.nombre_entidad_key == "secretaría de educación"
+
+        # El PUT ignora nombre_entidad: la clave no cambia
+        client.put(
+            f"/seguimiento/{plan_id}",
+            json={"nombre_entidad": "Otra", "estado": "Pendiente"},
+            headers={"Authorization": f"Bearer {admin_token}"}
+        )
+        test_db.expire_all()
+        assert plan.nombre_entidad_key == "secretaría de educación"
+
+        plan.nombre_entidad = "Secretaría de Salud"
+        test_db.commit()
+        test_db.expire_all()
+        assert plan.nombre_entidad_key == "secretaría de salud"
+
+    def test_filtro_ignora_mayusculas_y_espacios(self, client: TestClient, test_db, admin_user, entidad_user, entidad_token):
+        """
+        Prueba que el usuario de entidad ve sus planes aunque difieran mayúsculas (también
+        las acentuadas) o espacios, pero no los de una entidad con otra ortografía.
+        """
+        for nombre in ("SECRETARÍA DE EDUCACIÓN", " secretaría de educación ", "Secretaria de Educacion", "Otra"):
+            test_db.add(models.PlanAccion(nombre_entidad=nombre, created_by=admin_user.id))
+        test_db.commit()
+
+        response = client.get("/seguimiento", headers={"Authorization": f"Bearer {entidad_token}"})
+        assert response.status_code == 200
+        assert sorted(p["nombre_entidad"] for p in response.json()) == [
+            " secretaría de educación ", "SECRETARÍA DE EDUCACIÓN",
+        ]
+
+
+class TestEmbedSeguimientos:
+    """Suite de pruebas para ?embed=seguimientos en planes."""
+
+    def _crear(self, test_db, admin_user, planes: int):
+        for p in range(planes):
+            plan = models.PlanAccion(nombre_entidad="Alcaldia", created_by=admin_user.id)
+            test_db.add(plan)
+            test_db.flush()
+            for s in range(2):
+                test_db.add(models.Seguimiento(
+                    plan_id=plan.id, indicador=f"I{p}-{s}", updated_by_id=admin_user.id
+                ))
+        test_db.commit()
+
+    def _contar_selects(self, client: TestClient, test_db, url: str, token: str):
+        from sqlalchemy import event
+
+        sentencias = []
+        engine = test_db.get_bind()
+
+        def _on_execute(conn, cursor, statement, *args):
+            if statement.lstrip().upper().startswith("SELECT"):
+                sentencias.append(statement)
+
+        event.listen(engine, "before_cursor_execute", _on_execute)
+        try:
+            response = client.get(url, headers={"Authorization": f"Bearer {token}"})
+        finally:
+            event.remove(engine, "before_cursor_execute", _on_execute)
+        assert response.status_code == 200
+        return response.json(), len(sentencias)
+
+    def test_listado_sin_n_mas_1(self, client: TestClient, test_db, admin_user, admin_token):
+        """
+        Prueba que el número de consultas no crece con la cantidad de planes.
+        """
+        self._crear(test_db, admin_user, 2)
+        # Primer request: carga el principal en la caché de auth
+        client.get("/seguimiento", headers={"Authorization": f"Bearer {admin_token}"})
+        _, pocos = self._contar_selects(client, test_db, "/seguimiento?embed=seguimientos", admin_token)
+        self._crear(test_db, admin_user, 6)
+        data, muchos = self._contar_selects(client, test_db, "/seguimiento?embed=seguimientos", admin_token)
+
+        assert len(data) == 8
+        assert pocos == muchos
+        ultimo = data[0]
+        assert [s["indicador"] for s in ultimo["seguimientos"]] == ["I5-0", "I5-1"]
+        assert ultimo["seguimientos"][0]["updated_by_email"] == "admin@test.com"
+        assert ultimo["seguimientos"][0]["updated_by_entidad"] == "Alcaldia"
+
+    def test_cursor_y_detalle(self, client: TestClient, test_db, admin_user, admin_token):
+        """
+        Prueba embed en modo cursor y en el detalle; sin embed la forma no cambia.
+        """
+        self._crear(test_db, admin_user, 3)
+        headers = {"Authorization": f"Bearer {admin_token}"}
+
+        page = client.get("/seguimiento?cursor=&limit=2&embed=seguimientos", headers=headers).json()
+        assert len(page["items"]) == 2 and page["next_cursor"]
+        assert all(len(p["seguimientos"]) == 2 for p in page["items"])
+
+        plan_id = page["items"][0]["id"]
+        detalle = client.get(f"/seguimiento/{plan_id}?embed=seguimientos", headers=headers).json()
+        assert len(detalle["seguimientos"]) == 2
+
+        simple = client.get(f"/seguimiento/{plan_id}", headers=headers).json()
+        assert "seguimientos" not in simple
+
+        # embed cambia el ETag
+        assert (
+            client.get("/seguimiento", headers=headers).headers["etag"]
+            != client.get("/seguimiento?embed=seguimientos", headers=headers).headers["etag"]
+        )
+
+    def test_embed_invalido(self, client: TestClient, test_db, admin_token):
+        """
+        Prueba que un valor de embed desconocido devuelve 422.
+        """
+        response = client.get("/seguimiento?embed=otra", headers={"Authorization": f"Bearer {admin_token}"})
+        assert response.status_code == 422
+
+
+class TestBusquedaTextoCompleto:
+    """Suite de pruebas para ?search=fts en el listado de planes."""
+
+    def _plan(self, test_db, user, entidad: str, **campos) -> models.PlanAccion:
+        plan = models.PlanAccion(nombre_entidad=entidad, created_by=user.id, **campos)
+        test_db.add(plan)
+        test_db.commit()
+        return plan
+
+    def _buscar(self, client: TestClient, token: str, q: str, **params):
+        response = client.get(
+            "/seguimiento",
+            params={"q": q, "search": "fts", **params},
+            headers={"Authorization": f"Bearer {token}"},
+        )
+        assert response.status_code == 200
+        return response.json()
+
+    def test_relevancia_y_acentos(self, client: TestClient, test_db, admin_user, admin_token):
+        """
+        Prueba que los resultados vienen por relevancia y que se ignoran tildes y mayúsculas.
+        """
+        debil = self._plan(test_db, admin_user, "Alcaldia", descripcion_actividades="revisar la gestión documental")
+        fuerte = self._plan(test_db, admin_user, "Alcaldia", indicador="Gestión documental", criterio="Gestion")
+        self._plan(test_db, admin_user, "Alcaldia", indicador="Contratación")
+
+        data = self._buscar(client, admin_token, "GESTION")
+        assert [p["id"] for p in data] == [fuerte.id, debil.id]
+
+        # sin search=fts, q sigue filtrando por nombre de entidad
+        nombre = client.get("/seguimiento?q=gestion", headers={"Authorization": f"Bearer {admin_token}"})
+        assert nombre.json() == []
+
+    def test_alcance_por_entidad(self, client: TestClient, test_db, admin_user, entidad_user, entidad_token):
+        """
+        Prueba que una entidad solo encuentra sus propios planes.
+        """
+        propio = self._plan(test_db, entidad_user, entidad_user.entidad, indicador="Riesgos")
+        self._plan(test_db, admin_user, "Otra entidad", indicador="Riesgos")
+
+        assert [p["id"] for p in self._buscar(client, entidad_token, "riesgos")] == [propio.id]
+
+    def test_indice_sigue_cambios(self, client: TestClient, test_db, admin_user, admin_token):
+        """
+        Prueba que editar y borrar un plan actualiza el índice.
+        """
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        plan = self._plan(test_db, admin_user, "Alcaldia", indicador="Riesgos")
+
+        client.put(f"/seguimiento/{plan.id}", json={"nombre_entidad": "Alcaldia", "indicador": "Archivo"}, headers=headers)
+        assert self._buscar(client, admin_token, "riesgos") == []
+        assert [p["id"] for p in self._buscar(client, admin_token, "archivo")] == [plan.id]
+
+        client.delete(f"/seguimiento/{plan.id}", headers=headers)
+        assert self._buscar(client, admin_token, "archivo") == []
+
+    def test_cursor_y_consulta_vacia(self, client: TestClient, test_db, admin_user, admin_token):
+        """
+        Prueba la paginación por cursor con fts y que una consulta sin términos no falla.
+        """
+        for _ in range(3):
+            self._plan(test_db, admin_user, "Alcaldia", criterio="Calidad")
+
+        page = self._buscar(client, admin_token, "calidad", cursor="", limit=2)
+        assert len(page["items"]) == 2 and page["next_cursor"]
+        resto = self._buscar(client, admin_token, "calidad", cursor=page["next_cursor"], limit=2)
+        assert len(resto["items"]) == 1
+
+        assert self._buscar(client, admin_token, "¿?") == []
+
+
+class TestEstadoBulk:
+    """Suite de pruebas para POST /seguimiento/estado/bulk."""
+
+    def _planes(self, test_db, user, entidad: str, n: int) -> list:
+        planes = [models.PlanAccion(nombre_entidad=entidad, created_by=user.id) for _ in range(n)]
+        test_db.add_all(planes)
+        test_db.commit()
+        return [p.id for p in planes]
+
+    def test_por_ids(self, client: TestClient, test_db, admin_user, auditor_token):
+        """
+        Prueba el cambio por ids con resultado por id, incluidos los inexistentes.
+        """
+        ids = self._planes(test_db, admin_user, "Salud", 3)
+        response = client.post(
+            "/seguimiento/estado/bulk",
+            json={"ids": [ids[0], 9999, ids[1], ids[0]], "estado": "Observado", "observacion_calidad": "  Revisar  "},
+            headers={"Authorization": f"Bearer {auditor_token}"},
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["actualizados"] == 2
+        assert [(r["id"], r["ok"]) for r in data["resultados"]] == [(ids[0], True), (9999, False), (ids[1], True)]
+        assert data["resultados"][1]["detail"] == "No encontrado"
+
+        test_db.expire_all()
+        planes = {p.id: p for p in test_db.query(models.PlanAccion)}
+        assert planes[ids[0]].estado == "Observado"
+        assert planes[ids[0]].observacion_calidad == "Revisar"
+        assert planes[ids[2]].estado == "Pendiente"
+
+    def test_por_entidad(self, client: TestClient, test_db, admin_user, admin_token):
+        """
+        Prueba el filtro por entidad (normalizado) y que sube la versión de planes.
+        """
+        ids = self._planes(test_db, admin_user, "Secretaría de Salud", 2)
+        self._planes(test_db, admin_user, "Hacienda", 1)
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        etag = client.get("/seguimiento", headers=headers).headers["etag"]
+
+        response = client.post(
+            "/seguimiento/estado/bulk",
+            json={"nombre_entidad": " secretaría de salud ", "estado": "Aprobado"},
+            headers=headers,
+        )
+        data = response.json()
+        assert data["actualizados"] == 2
+        assert [r["id"] for r in data["resultados"]] == ids
+        assert all(r["estado"] == "Aprobado" for r in data["resultados"])
+        assert client.get("/seguimiento", headers={**headers, "If-None-Match": etag}).status_code == 200
+
+    def test_validaciones(self, client: TestClient, test_db, admin_token, entidad_token):
+        """
+        Prueba que se exige ids o entidad (no ambos) y el rol auditor/admin.
+        """
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        assert client.post("/seguimiento/estado/bulk", json={"estado": "Aprobado"}, headers=headers).status_code == 400
+        ambos = {"ids": [1], "nombre_entidad": "Salud", "estado": "Aprobado"}
+        assert client.post("/seguimiento/estado/bulk", json=ambos, headers=headers).status_code == 400
+        vacio = client.post("/seguimiento/estado/bulk", json={"ids": [], "estado": "Aprobado"}, headers=headers)
+        assert vacio.json() == {"actualizados": 0, "resultados": []}
+
+        response = client.post(
+            "/seguimiento/estado/bulk",
+            json={"ids": [1], "estado": "Aprobado"},
+            headers={"Authorization": f"Bearer {entidad_token}"},
+        )
+        assert response.status_code == 403
+
+
+class TestSeguimientosBulk:
+    """Suite de pruebas para PUT /seguimiento/{plan_id}/seguimiento/bulk."""
+
+    def _seg(self, test_db, plan, indicador: str) -> models.Seguimiento:
+        seg = models.Seguimiento(plan_id=plan.id, indicador=indicador)
+        test_db.add(seg)
+        test_db.commit()
+        return seg
+
+    def test_crear_actualizar_eliminar(self, client: TestClient, test_db, entidad_user, entidad_token, plan_action):
+        """
+        Prueba un guardado mixto: resultado completo, plan actualizado una vez e indicadores al día.
+        """
+        headers = {"Authorization": f"Bearer {entidad_token}"}
+        client.post(f"/seguimiento/{plan_action.id}/seguimiento", json={"indicador": "I1"}, headers=headers)
+        client.post(f"/seguimiento/{plan_action.id}/seguimiento", json={"indicador": "I2"}, headers=headers)
+        a, b = [s["id"] for s in client.get(f"/seguimiento/{plan_action.id}/seguimiento", headers=headers).json()]
+
+        response = client.put(f"/seguimiento/{plan_action.id}/seguimiento/bulk", json={
+            "guardar": [
+                {"id": a, "indicador": "I3", "observacion_calidad": "ignorada", "enlace_entidad": "http://x"},
+                {"indicador": "I4", "criterio": "C4"},
+                {"indicador": "I5"},
+            ],
+            "eliminar": [b],
+        }, headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert [s["indicador"] for s in data] == ["I3", "I4", "I5"]
+        assert data[0]["id"] == a and data[0]["observacion_calidad"] is None
+        assert all(s["updated_by_email"] == "entidad@test.com" for s in data)
+
+        test_db.expire_all()
+        plan = test_db.query(models.PlanAccion).get(plan_action.id)
+        assert (plan.indicador, plan.criterio, plan.enlace_entidad) == ("I5", "C4", "http://x")
+
+        usados = client.get("/seguimiento/indicadores_usados", headers=headers).json()
+        assert usados == ["I3", "I4", "I5"]
+
+    def test_todo_o_nada(self, client: TestClient, test_db, admin_user, admin_token, plan_action):
+        """
+        Prueba que un id ajeno al plan rechaza el lote completo sin escribir nada.
+        """
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        otro = models.PlanAccion(nombre_entidad="Otra", created_by=admin_user.id)
+        test_db.add(otro)
+        test_db.commit()
+        ajeno = self._seg(test_db, otro, "X")
+        propio = self._seg(test_db, plan_action, "I1")
+
+        url = f"/seguimiento/{plan_action.id}/seguimiento/bulk"
+        response = client.put(url, json={"guardar": [{"indicador": "Nuevo"}], "eliminar": [ajeno.id]}, headers=headers)
+        assert response.status_code == 404
+        assert test_db.query(models.Seguimiento).filter_by(plan_id=plan_action.id).count() == 1
+
+        ambos = {"guardar": [{"id": propio.id, "indicador": "I2"}], "eliminar": [propio.id]}
+        assert client.put(url, json=ambos, headers=headers).status_code == 400
+        assert client.put("/seguimiento/9999/seguimiento/bulk", json={}, headers=headers).status_code == 404
@@ -0,0 +1,125 @@
+"""
+Pruebas para /pqrds/stats (tabla resumen pqrd_resumen) y /pqrds/by_labels.
+"""
+
+from fastapi.testclient import TestClient
+from app import models, pqrd_stats
+
+
+def _pqrd(i: int, entidad: str, tipo: str, fecha: str) -> dict:
+    return {
+        "label": f"PQRD-{entidad[:3]}-{i}",
+        "tipo_gestion": tipo,
+        "dependencia": "Atención",
+        "entidad": entidad,
+        "fecha_ingreso": fecha,
+        "periodo": "",
+    }
+
+
+def _cargar(client: TestClient, token: str, pqrds: list):
+    response = client.post("/pqrds", json={"pqrds": pqrds}, headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+
+
+class TestPqrdStats:
+    """Suite de pruebas para las agregaciones de PQRDs."""
+
+    def test_stats_por_entidad_y_mes(self, client: TestClient, test_db, admin_user, admin_token):
+        """
+        Prueba que los conteos salen del resumen y se acumulan entre cargas.
+        """
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        _cargar(client, admin_token, [_pqrd(i, "Salud", "Queja", "2024-01-10") for i in range(3)])
+        _cargar(client, admin_token, [
+            _pqrd(10, "Salud", "Petición", "2024-01-20"),
+            _pqrd(11, "Salud", "Queja", "2024-02-01"),
+            _pqrd(12, "Hacienda", "Queja", "2024-01-05"),
+        ])
+
+        response = client.get("/pqrds/stats?group_by=entidad,tipo_gestion&period=month", headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert {"entidad": "Salud", "tipo_gestion": "Queja", "periodo": "2024-01", "total": 3} in data
+        assert {"entidad": "Salud", "tipo_gestion": "Queja", "periodo": "2024-02", "total": 1} in data
+        assert sum(r["total"] for r in data) == 6
+
+        response = client.get("/pqrds/stats?group_by=entidad&period=all", headers=headers)
+        assert response.json() == [
+            {"entidad": "Hacienda", "total": 1},
+            {"entidad": "Salud", "total": 5},
+        ]
+
+        response = client.get("/pqrds/stats?period=year&desde=2024-02", headers=headers)
+        assert response.json() == [{"periodo": "2024", "total": 1}]
+
+    def test_stats_tras_borrado(self, client: TestClient, test_db, admin_user, admin_token):
+        """
+        Prueba que eliminar todas las PQRDs vacía el resumen.
+        """
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        _cargar(client, admin_token, [_pqrd(i, "Salud", "Queja", "2024-01-10") for i in range(2)])
+        assert client.delete("/pqrds", headers=headers).status_code == 200
+
+        response = client.get("/pqrds/stats?period=all", headers=headers)
+        assert response.json() == [{"total": 0}]
+        assert test_db.query(models.PQRDResumen).count() == 0
+
+    def test_group_by_invalido(self, client: TestClient, test_db, admin_user, admin_token):
+        """
+        Prueba que un campo de agrupación desconocido devuelve 400.
+        """
+        response = client.get(
+            "/pqrds/stats?group_by=label",
+            headers={"Authorization": f"Bearer {admin_token}"}
+        )
+        assert response.status_code == 400
+
+    def test_reconstruir_coincide(self, client: TestClient, test_db, admin_user, admin_token):
+        """
+        Prueba que recalcular el resumen desde pqrds da los mismos conteos que el incremental.
+        """
+        _cargar(client, admin_token, [
+            _pqrd(1, "Salud", "Queja", "2024-01-10"),
+            _pqrd(2, "Salud", "Queja", "2024-03-10"),
+            _pqrd(3, "Hacienda", "Reclamo", "2023-12-31"),
+        ])
+        antes = pqrd_stats.consultar(test_db, list(pqrd_stats.GROUP_FIELDS))
+        test_db.commit()
+        with test_db.get_bind().begin() as conn:
+            pqrd_stats.reconstruir(conn)
+        test_db.expire_all()
+        assert pqrd_stats.consultar(test_db, list(pqrd_stats.GROUP_FIELDS)) == antes
+
+
+class TestPqrdLabels:
+    """Suite de pruebas para POST /pqrds/by_labels."""
+
+    def test_encontrados_y_faltantes(self, client: TestClient, test_db, admin_user, admin_token):
+        """
+        Prueba que se separan los labels encontrados de los faltantes, sin duplicados.
+        """
+        _cargar(client, admin_token, [_pqrd(i, "Salud", "Queja", "2024-01-10") for i in range(3)])
+        response = client.post(
+            "/pqrds/by_labels",
+            json={"labels": ["PQRD-Sal-2", "NO-EXISTE", "PQRD-Sal-0", "PQRD-Sal-2"]},
+            headers={"Authorization": f"Bearer {admin_token}"}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert [p["label"] for p in data["encontrados"]] == ["PQRD-Sal-2", "PQRD-Sal-0"]
+        assert data["encontrados"][0]["entidad"] == "Salud"
+        assert data["faltantes"] == ["NO-EXISTE"]
+
+    def test_demasiados_labels(self, client: TestClient, test_db, admin_user, admin_token):
+        """
+        Prueba que una petición por encima del tope devuelve 422.
+        """
+        from app.schemas import PQRD_LABELS_MAX
+
+        response = client.post(
+            "/pqrds/by_labels",
+            json={"labels": [f"L{i}" for i in range(PQRD_LABELS_MAX + 1)]},
+            headers={"Authorization": f"Bearer {admin_token}"}
+        )
+        assert response.status_code == 422
@@ -0,0 +1,81 @@
+"""
+Pruebas para POST /auth/refresh (rotación, reuso y revocación).
+"""
+
+from fastapi.testclient import TestClient
+
+from app import models
+
+
+def _login(client: TestClient, email: str = "admin@test.com", password: str = "admin123") -> dict:
+    response = client.post("/auth/token", data={"username": email, "password": password})
+    assert response.status_code == 200
+    return response.json()
+
+
+def _refresh(client: TestClient, token: str):
+    return client.post("/auth/refresh", json={"refresh_token": token})
+
+
+class TestRefreshTokens:
+    """Suite de pruebas para el flujo de refresh tokens."""
+
+    def test_rotacion(self, client: TestClient, test_db, admin_user):
+        """
+        Prueba que el refresh entrega un access token válido y rota el refresh token.
+        """
+        inicial = _login(client)
+        assert inicial["refresh_token"]
+
+        response = _refresh(client, inicial["refresh_token"])
+        assert response.status_code == 200
+        data = response.json()
+        assert data["token_type"] == "bearer"
+        assert data["refresh_token"] != inicial["refresh_token"]
+
+        me = client.get("/auth/me", headers={"Authorization": f"Bearer {data['access_token']}"})
+        assert me.json()["email"] == "admin@test.com"
+
+        # la cadena sigue: el token nuevo también rota
+        assert _refresh(client, data["refresh_token"]).status_code == 200
+        filas = test_db.query(models.RefreshToken).order_by(models.RefreshToken.id).all()
+        assert len(filas) == 3 and len({f.family for f in filas}) == 1
+        assert [f.revoked_at is None for f in filas] == [False, False, True]
+        assert filas[0].replaced_by == filas[1].jti
+
+    def test_reuso_revoca_la_familia(self, client: TestClient, test_db, admin_user):
+        """
+        Prueba que presentar un token ya rotado invalida toda la familia, no otros logins.
+        """
+        primero = _login(client)["refresh_token"]
+        otro_login = _login(client)["refresh_token"]
+        segundo = _refresh(client, primero).json()["refresh_token"]
+
+        assert _refresh(client, primero).status_code == 401
+        assert _refresh(client, segundo).status_code == 401
+        assert _refresh(client, otro_login).status_code == 200
+
+    def test_tokens_no_intercambiables(self, client: TestClient, test_db, admin_user):
+        """
+        Prueba que un access token no sirve para refrescar ni un refresh token como access token.
+        """
+        data = _login(client)
+        assert _refresh(client, data["access_token"]).status_code == 401
+        assert _refresh(client, "basura").status_code == 401
+
+        me = client.get("/auth/me", headers={"Authorization": f"Bearer {data['refresh_token']}"})
+        assert me.status_code == 401
+
+    def test_reset_password_revoca(self, client: TestClient, test_db, admin_user, admin_token, entidad_user):
+        """
+        Prueba que cambiar la contraseña revoca los refresh tokens del usuario y borrarlo los elimina.
+        """
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        refresh = _login(client, "entidad@test.com", "entidad123")["refresh_token"]
+
+        client.patch(f"/users/{entidad_user.id}/password", json={"new_password": "nueva-clave-123"}, headers=headers)
+        assert _refresh(client, refresh).status_code == 401
+
+        _login(client, "entidad@test.com", "nueva-clave-123")
+        assert client.delete(f"/users/{entidad_user.id}", headers=headers).status_code == 204
+        assert test_db.query(models.RefreshToken).filter_by(user_id=entidad_user.id).count() == 0
@@ -0,0 +1,88 @@
+"""
+Pruebas para GET /reports/{nombre_entidad} servido desde el catálogo en memoria.
+"""
+
+from fastapi.testclient import TestClient
+from app import models, table_versions as tv
+from app.reporte_catalog import ReporteCatalog, reporte_catalog
+
+
+def _reporte(entidad: str, indicador: str) -> dict:
+    return {"entidad": entidad, "indicador": indicador, "criterio": "C1", "accion": "A1", "insumo": None}
+
+
+class TestReportesPorEntidad:
+    """Suite de pruebas para el catálogo de reportes por entidad."""
+
+    def test_lookup_normalizado(self, client: TestClient, test_db, admin_user, admin_token):
+        """
+        Prueba que la búsqueda ignora mayúsculas y espacios y conserva el formato de respuesta.
+        """
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        client.post("/reports", json={"reportes": [
+            _reporte("Secretaría de Salud", "I1"),
+            _reporte("Secretaría de Salud", "I2"),
+            _reporte("Hacienda", "I3"),
+        ]}, headers=headers)
+
+        response = client.get("/reports/secretaría de salud", headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["entidad"] == "Secretaría de Salud"
+        assert [i["indicador"] for i in data["indicadores"]] == ["I1", "I2"]
+
+        assert client.get("/reports/HACIENDA", headers=headers).status_code == 200
+        assert client.get("/reports/Otra", headers=headers).status_code == 404
+        # Un solo build para las tres lecturas
+        assert reporte_catalog.stats()["builds"] == 1
+
+    def test_escrituras_invalidan(self, client: TestClient, test_db, admin_user, admin_token):
+        """
+        Prueba que cargar y borrar reportes se reflejan en la siguiente lectura.
+        """
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        assert client.get("/reports/Hacienda", headers=headers).status_code == 404
+
+        client.post("/reports", json={"reportes": [_reporte("Hacienda", "I1")]}, headers=headers)
+        assert client.get("/reports/Hacienda", headers=headers).status_code == 200
+
+        client.delete("/reports", headers=headers)
+        assert client.get("/reports/Hacienda", headers=headers).status_code == 404
+
+    def test_escritura_de_otro_worker(self, client: TestClient, test_db, admin_user, admin_token):
+        """
+        Prueba que una escritura que no invalida este catálogo (hecha por otro
+        worker) se ve en la siguiente lectura, con cuerpo y ETag consistentes.
+        """
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        client.post("/reports", json={"reportes": [_reporte("Hacienda", "I1")]}, headers=headers)
+        primera = client.get("/reports/Hacienda", headers=headers)
+
+        # Otro worker: inserta y sube la versión; nadie llama a invalidate()
+        test_db.add(models.Reporte(entidad="Hacienda", indicador="I2", criterio="C1", accion="A1"))
+        tv.bump(test_db, tv.REPORTES)
+        test_db.commit()
+
+        segunda = client.get("/reports/Hacienda", headers={**headers, "If-None-Match": primera.headers["etag"]})
+        assert segunda.status_code == 200
+        assert segunda.headers["etag"] != primera.headers["etag"]
+        assert [i["indicador"] for i in segunda.json()["indicadores"]] == ["I1", "I2"]
+
+    def test_dos_catalogos(self, test_db):
+        """
+        Prueba que dos catálogos (dos workers) se reconstruyen por versión y que
+        una lectura con versión vieja no reemplaza un catálogo más nuevo.
+        """
+        a, b = ReporteCatalog(), ReporteCatalog()
+        test_db.add(models.Reporte(entidad="Salud", indicador="I1", criterio="C", accion="A"))
+        test_db.commit()
+        assert a.get(test_db, "Salud", 1) == b.get(test_db, "Salud", 1)
+
+        test_db.add(models.Reporte(entidad="Salud", indicador="I2", criterio="C", accion="A"))
+        test_db.commit()
+        assert b"I2" in b.get(test_db, "Salud", 2)
+        assert b"I2" not in a.get(test_db, "Salud", 1)  # a sigue en la versión 1 (hit)
+        assert a.stats()["builds"] == 1
+
+        b.get(test_db, "Salud", 1)  # lectura atrasada: reconstruye pero no publica
+        assert b.stats()["version"] == 2
@@ -0,0 +1,70 @@
+"""
+Pruebas del arranque en frío: presupuesto de importación y carga diferida.
+"""
+
+import json
+import os
+import pathlib
+import subprocess
+import sys
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+# Presupuesto para `import app.main` en un proceso nuevo (ms); ajustable por CI
+STARTUP_IMPORT_BUDGET_MS = float(os.getenv("STARTUP_IMPORT_BUDGET_MS", "4000"))
+
+PROBE = """
+import json, sys, time
+t = time.perf_counter()
+import app.main
+ms = (time.perf_counter() - t) * 1000
+print(json.dumps({
+    "ms": ms,
+    "modulos": [m for m in ("jose", "passlib", "cryptography") if m in sys.modules],
+}))
+"""
+
+
+def _cold_import(tmp_path, lazy: bool) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'cold.db'}",
+        "UPLOAD_DIR": str(tmp_path / "uploads"),
+        "LAZY_IMPORTS": "true" if lazy else "false",
+        "PYTHONPATH": str(ROOT),
+    })
+    proc = subprocess.run(
+        [sys.executable, "-c", PROBE], env=env, cwd=ROOT,
+        capture_output=True, text=True, timeout=60,
+    )
+    assert proc.returncode == 0, proc.stderr
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+class TestColdStart:
+    """Suite de pruebas para la importación de app.main."""
+
+    def test_import_dentro_del_presupuesto(self, tmp_path):
+        """
+        Prueba que importar app.main en frío no supera STARTUP_IMPORT_BUDGET_MS.
+        """
+        result = _cold_import(tmp_path, lazy=True)
+        assert result["ms"] <= STARTUP_IMPORT_BUDGET_MS, (
+            f"import app.main tardó {result['ms']:.0f} ms "
+            f"(presupuesto {STARTUP_IMPORT_BUDGET_MS:.0f} ms); ver tools/profile_startup.py"
+        )
+
+    def test_modo_diferido_sin_efectos(self, tmp_path):
+        """
+        Prueba que en modo diferido no se cargan jose/passlib ni se crean directorios.
+        """
+        result = _cold_import(tmp_path, lazy=True)
+        assert result["modulos"] == []
+        assert not (tmp_path / "uploads").exists()
+
+    def test_modo_inmediato(self, tmp_path):
+        """
+        Prueba que LAZY_IMPORTS=false mantiene la carga inmediata.
+        """
+        result = _cold_import(tmp_path, lazy=False)
+        assert {"jose", "passlib"} <= set(result["modulos"])
@@ -0,0 +1,98 @@
+"""
+Pruebas para AUTH_STATELESS (principal desde claims) y la revocación por token_version.
+"""
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app import models, principal_cache as pc
+
+
+def _login(client: TestClient, email: str, password: str) -> str:
+    response = client.post("/auth/token", data={"username": email, "password": password})
+    assert response.status_code == 200
+    return response.json()["access_token"]
+
+
+def _selects_de_users(test_db, client: TestClient, url: str, token: str):
+    sentencias = []
+    engine = test_db.get_bind()
+
+    def _on_execute(conn, cursor, statement, *args):
+        if "FROM users" in statement:
+            sentencias.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _on_execute)
+    try:
+        response = client.get(url, headers={"Authorization": f"Bearer {token}"})
+    finally:
+        event.remove(engine, "before_cursor_execute", _on_execute)
+    return response, sentencias
+
+
+@pytest.fixture
+def stateless(monkeypatch):
+    monkeypatch.setattr(pc, "AUTH_STATELESS", True)
+
+
+class TestStatelessAuth:
+    """Suite de pruebas para el modo sin estado."""
+
+    def test_principal_desde_claims(self, client: TestClient, test_db, entidad_user, stateless):
+        """
+        Prueba que el principal sale de los claims y solo se lee token_version (una vez).
+        """
+        token = _login(client, "entidad@test.com", "entidad123")
+
+        response, primeras = _selects_de_users(test_db, client, "/auth/me", token)
+        assert response.json()["entidad"] == "Secretaría de Educación"
+        assert len(primeras) == 1 and "token_version" in primeras[0]
+        assert "hashed_password" not in primeras[0]
+
+        _, segundas = _selects_de_users(test_db, client, "/auth/me", token)
+        assert segundas == []
+
+    def test_cambios_revocan(self, client: TestClient, test_db, admin_user, entidad_user, stateless):
+        """
+        Prueba que cambiar permisos o contraseña invalida los tokens emitidos antes.
+        """
+        admin = {"Authorization": f"Bearer {_login(client, 'admin@test.com', 'admin123')}"}
+        token = _login(client, "entidad@test.com", "entidad123")
+        assert client.get("/auth/me", headers={"Authorization": f"Bearer {token}"}).status_code == 200
+
+        client.patch(f"/users/{entidad_user.id}/auditor", json={"entidad_auditor": True}, headers=admin)
+        assert client.get("/auth/me", headers={"Authorization": f"Bearer {token}"}).status_code == 401
+
+        nuevo = _login(client, "entidad@test.com", "entidad123")
+        assert client.get("/auth/me", headers={"Authorization": f"Bearer {nuevo}"}).json()["entidad_auditor"] is True
+
+        client.patch(f"/users/{entidad_user.id}/password", json={"new_password": "otra-clave-123"}, headers=admin)
+        assert client.get("/auth/me", headers={"Authorization": f"Bearer {nuevo}"}).status_code == 401
+
+    def test_usuario_borrado(self, client: TestClient, test_db, admin_user, entidad_user, stateless):
+        """
+        Prueba que el token de un usuario borrado deja de valer.
+        """
+        admin = {"Authorization": f"Bearer {_login(client, 'admin@test.com', 'admin123')}"}
+        token = _login(client, "entidad@test.com", "entidad123")
+        client.delete(f"/users/{entidad_user.id}", headers=admin)
+        assert client.get("/auth/me", headers={"Authorization": f"Bearer {token}"}).status_code == 401
+
+    def test_modo_por_defecto_no_revoca(self, client: TestClient, test_db, admin_user, entidad_user):
+        """
+        Prueba que sin AUTH_STATELESS el token sigue valiendo y ve el cambio; token_version igual sube.
+        """
+        admin_token = _login(client, "admin@test.com", "admin123")
+        token = _login(client, "entidad@test.com", "entidad123")
+        client.patch(
+            f"/users/{entidad_user.id}/perm",
+            json={"entidad_perm": "reportes_seguimiento"},
+            headers={"Authorization": f"Bearer {admin_token}"},
+        )
+        me = client.get("/auth/me", headers={"Authorization": f"Bearer {token}"})
+        assert me.status_code == 200
+        assert me.json()["entidad_perm"] == "reportes_seguimiento"
+
+        test_db.expire_all()
+        assert test_db.query(models.User).get(entidad_user.id).token_version == 1
@@ -237,3 +237,45 @@ class TestUsersEndpoints:
             headers={"Authorization": f"Bearer {entidad_token}"}
         )
         assert response.status_code == 403
+
+    def test_role_change_invalidates_cached_principal(self, client: TestClient, test_db, admin_user, admin_token, entidad_user, entidad_token):
+        """
+        Prueba que cambiar el rol invalida el principal cacheado del usuario.
+        """
+        headers = {"Authorization": f"Bearer {entidad_token}"}
+        assert client.get("/auth/me", headers=headers).json()["role"] == "entidad"
+        # Segunda llamada servida desde caché
+        assert client.get("/auth/me", headers=headers).json()["role"] == "entidad"
+
+        response = client.patch(
+            f"/users/{entidad_user.id}/role",
+            json={"role": "auditor"},
+            headers={"Authorization": f"Bearer {admin_token}"}
+        )
+        assert response.status_code == 200
+        assert client.get("/auth/me", headers=headers).json()["role"] == "auditor"
+
+    def test_auth_cache_stats(self, client: TestClient, test_db, admin_user, admin_token):
+        """
+        Prueba que las estadísticas de la caché exponen aciertos y fallos.
+        """
+        headers = {"Authorization": f"Bearer {admin_token}"}
+        client.get("/auth/me", headers=headers)
+        response = client.get("/stats/auth_cache", headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["misses"] >= 1
+        assert data["hits"] >= 1
+
+    def test_pool_stats(self, client: TestClient, test_db, admin_user, admin_token, entidad_token):
+        """
+        Prueba que las estadísticas del pool solo están disponibles para admin.
+        """
+        response = client.get("/stats/pool", headers={"Authorization": f"Bearer {admin_token}"})
+        assert response.status_code == 200
+        data = response.json()
+        for key in ("mode", "checked_out", "idle", "overflow", "wait_count"):
+            assert key in data
+
+        response = client.get("/stats/pool", headers={"Authorization": f"Bearer {entidad_token}"})
+        assert response.status_code == 403
@@ -0,0 +1,130 @@
+"""
+Benchmark: latencia del event loop durante subidas de evidencia en paralelo.
+
+Compara el handler histórico (Session síncrona usada dentro de un `async def`,
+bloquea el loop en cada query) con el actual `/files/upload` (AsyncSession).
+Cada INSERT en uploaded_files se ralentiza artificialmente con un trigger para
+simular una BD lenta; mientras tanto, un "ticker" mide cuánto se retrasa el loop.
+
+Uso:
+    python tools/bench_upload_concurrency.py [--uploads 50] [--db-delay-ms 50]
+"""
+import argparse
+import asyncio
+import os
+import pathlib
+import statistics
+import sys
+import tempfile
+import time
+
+TMP = pathlib.Path(tempfile.mkdtemp(prefix="bench_upload_"))
+os.environ["DATABASE_URL"] = f"sqlite:///{TMP / 'bench.db'}"
+os.environ["UPLOAD_DIR"] = str(TMP / "uploads")
+(TMP / "uploads").mkdir()
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+import httpx  # noqa: E402
+from fastapi import Depends, File, UploadFile  # noqa: E402
+from sqlalchemy import event, text  # noqa: E402
+
+from app import models  # noqa: E402
+from app.database import Base, SessionLocal, async_engine, engine  # noqa: E402
+from app.dependencies import get_current_user  # noqa: E402
+from app.main import app  # noqa: E402
+
+DB_DELAY = 0.05
+
+
+def _register_sleep(dbapi_connection, _record):
+    dbapi_connection.create_function("bench_sleep", 1, lambda s: time.sleep(s))
+
+
+event.listen(engine, "connect", _register_sleep)
+event.listen(async_engine.sync_engine, "connect", _register_sleep)
+
+
+def _fake_user():
+    return models.User(id=1, email="bench@demo.com", role=models.UserRole.admin, entidad="Bench")
+
+
+app.dependency_overrides[get_current_user] = _fake_user
+
+
+@app.post("/bench/legacy_upload", include_in_schema=False)
+async def legacy_upload(file: UploadFile = File(...), user: models.User = Depends(_fake_user)):
+    # Réplica del camino anterior: Session síncrona dentro de un handler async
+    data = await file.read()
+    db = SessionLocal()
+    try:
+        db.add(models.UploadedFile(
+            file_id=os.urandom(8).hex(),
+            original_filename=file.filename,
+            stored_filename=file.filename,
+            file_path=file.filename,
+            content_type=file.content_type,
+            file_size=len(data),
+        ))
+        db.commit()
+    finally:
+        db.close()
+    return {"ok": True}
+
+
+async def _ticker(samples: list, stop: asyncio.Event, interval: float = 0.005):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        samples.append((loop.time() - start - interval) * 1000)
+
+
+async def _run(path: str, uploads: int) -> dict:
+    samples: list = []
+    stop = asyncio.Event()
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        ticker = asyncio.create_task(_ticker(samples, stop))
+        start = time.perf_counter()
+        responses = await asyncio.gather(*[
+            client.post(path, files={"file": (f"e{i}.pdf", b"%PDF-1.4 " * 1024, "application/pdf")})
+            for i in range(uploads)
+        ])
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await ticker
+    assert all(r.status_code in (200, 201) for r in responses), [r.text for r in responses][:3]
+    samples.sort()
+    return {
+        "elapsed_s": elapsed,
+        "lag_p50_ms": statistics.median(samples),
+        "lag_p99_ms": samples[int(len(samples) * 0.99) - 1] if len(samples) > 1 else samples[0],
+        "lag_max_ms": samples[-1],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--uploads", type=int, default=50)
+    parser.add_argument("--db-delay-ms", type=float, default=DB_DELAY * 1000)
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text(f"""
+            CREATE TRIGGER bench_slow_insert AFTER INSERT ON uploaded_files
+            BEGIN SELECT bench_sleep({args.db_delay_ms / 1000}); END
+        """))
+
+    print(f"{args.uploads} subidas en paralelo, {args.db_delay_ms:.0f} ms por INSERT")
+    print(f"{'camino':<28}{'total s':>10}{'lag p50 ms':>12}{'lag p99 ms':>12}{'lag max ms':>12}")
+    for label, path in (("antes (Session síncrona)", "/bench/legacy_upload"),
+                        ("después (AsyncSession)", "/files/upload")):
+        r = asyncio.run(_run(path, args.uploads))
+        print(f"{label:<28}{r['elapsed_s']:>10.2f}{r['lag_p50_ms']:>12.1f}"
+              f"{r['lag_p99_ms']:>12.1f}{r['lag_max_ms']:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
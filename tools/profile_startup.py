@@ -0,0 +1,89 @@
+"""
+Perfil de arranque en frío: tiempo de importación por módulo y por paso del lifespan.
+
+Importa app.main en un proceso limpio con `python -X importtime`, agrupa por
+módulo y muestra los más caros; luego ejecuta el lifespan contra una SQLite
+temporal y muestra STARTUP_TIMINGS.
+
+Uso:
+    python tools/profile_startup.py [--top 25] [--eager]
+"""
+import argparse
+import asyncio
+import os
+import pathlib
+import subprocess
+import sys
+import tempfile
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+
+
+def _env(tmp: pathlib.Path, lazy: bool) -> dict:
+    env = dict(os.environ)
+    env.update({
+        "DATABASE_URL": f"sqlite:///{tmp / 'profile.db'}",
+        "UPLOAD_DIR": str(tmp / "uploads"),
+        "LAZY_IMPORTS": "true" if lazy else "false",
+        "PYTHONPATH": str(ROOT),
+    })
+    return env
+
+
+def import_profile(env: dict) -> list:
+    """[(módulo, propio_us, acumulado_us)] de `import app.main` en un proceso nuevo."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        env=env, cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def lifespan_profile(env: dict) -> dict:
+    os.environ.update(env)
+    sys.path.insert(0, str(ROOT))
+    from app.main import app
+    from app.startup import startup_stats
+
+    async def _run():
+        async with app.router.lifespan_context(app):
+            pass
+
+    asyncio.run(_run())
+    return startup_stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--top", type=int, default=25)
+    parser.add_argument("--eager", action="store_true", help="LAZY_IMPORTS=false")
+    args = parser.parse_args()
+
+    env = _env(pathlib.Path(tempfile.mkdtemp(prefix="profile_startup_")), lazy=not args.eager)
+    rows = import_profile(env)
+    total = next(c for name, _, c in rows if name == "app.main")
+
+    print(f"import app.main: {total / 1000:.1f} ms (LAZY_IMPORTS={env['LAZY_IMPORTS']})\n")
+    print(f"{'módulo':<50}{'propio ms':>12}{'acum. ms':>12}")
+    for name, self_us, cum_us in sorted(rows, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"{name[:49]:<50}{self_us / 1000:>12.1f}{cum_us / 1000:>12.1f}")
+
+    print(f"\n{'módulo de la app':<50}{'propio ms':>12}{'acum. ms':>12}")
+    for name, self_us, cum_us in sorted(rows, key=lambda r: r[2], reverse=True):
+        if name == "app" or name.startswith("app."):
+            print(f"{name:<50}{self_us / 1000:>12.1f}{cum_us / 1000:>12.1f}")
+
+    pasos = lifespan_profile(env)["pasos_ms"]
+    print(f"\n{'paso del lifespan':<50}{'ms':>12}")
+    for name, ms in pasos.items():
+        print(f"{name:<50}{ms:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
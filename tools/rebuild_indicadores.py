@@ -0,0 +1,30 @@
+"""
+Reconstruye indicador_entidad (indicadores con seguimiento por entidad) desde
+seguimiento + plan_accion. Útil como backfill o si la tabla quedó desalineada.
+
+Uso:
+    DATABASE_URL=... python tools/rebuild_indicadores.py
+"""
+import pathlib
+import sys
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+from app import models  # noqa: E402
+from app.database import engine  # noqa: E402
+from app.indicadores import reconstruir  # noqa: E402
+from app.table_versions import INDICADORES, bump  # noqa: E402
+
+
+def main():
+    with engine.begin() as conn:
+        models.IndicadorEntidad.__table__.create(conn, checkfirst=True)
+        models.TableVersion.__table__.create(conn, checkfirst=True)
+        filas = reconstruir(conn)
+        # invalida los ETag de /seguimiento/indicadores_usados
+        bump(conn, INDICADORES)
+    print(f"🔁 indicador_entidad reconstruida: {filas} pares (entidad, indicador)")
+
+
+if __name__ == "__main__":
+    main()